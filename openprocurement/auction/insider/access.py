@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Access checks of service endpoints, shared by the worker server and the
+insider-auctions routes of the auctions server.
+"""
+from functools import wraps
+
+from flask import abort, request
+
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def local_only(view):
+    """
+    Service endpoints are answered to the worker host only. Requests
+    proxied on behalf of someone else (X-Forwarded-For) are refused too.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.remote_addr not in LOCAL_ADDRESSES or \
+                'X-Forwarded-For' in request.headers or \
+                'X-Real-IP' in request.headers:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
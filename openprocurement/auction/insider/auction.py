@@ -1,28 +1,21 @@
 import logging
-from couchdb.json import use
 from requests import Session as RequestsSession
 from urlparse import urljoin
-from collections import defaultdict
-from gevent.queue import Queue
 from gevent.event import Event
 from gevent.lock import BoundedSemaphore
+from gevent import spawn
 
-from apscheduler.schedulers.gevent import GeventScheduler
 from couchdb import Database, Session
-from yaml import safe_dump as yaml_dump
+from yaml import dump as yaml_dump
 from datetime import datetime
-from dateutil.tz import tzlocal
-from functools import partial
-from openprocurement.auction.executor import AuctionsExecutor
-from openprocurement.auction.insider.server import run_server
 from openprocurement.auction.worker.mixins import RequestIDServiceMixin,\
     AuditServiceMixin, DateTimeServiceMixin, TIMEZONE
 from openprocurement.auction.insider.mixins import DutchDBServiceMixin,\
     DutchPostAuctionMixin, DutchAuctionPhase, SealedBidAuctionPhase,\
     BestBidAuctionPhase
-from openprocurement.auction.insider.constants import REQUEST_QUEUE_SIZE,\
+from openprocurement.auction.insider.constants import\
     REQUEST_QUEUE_TIMEOUT, DUTCH, PRESEALEDBID, SEALEDBID, PREBESTBID,\
-    BESTBID, END, PRESTARTED, BIDS_KEYS_FOR_COPY
+    BESTBID, END, PRESTARTED, BIDS_KEYS_FOR_COPY, SPOOL_REPLAY_TIMEOUT
 from openprocurement.auction.insider.journal import\
     AUCTION_WORKER_SERVICE_END_AUCTION,\
     AUCTION_WORKER_SERVICE_STOP_AUCTION_WORKER,\
@@ -32,23 +25,66 @@ from openprocurement.auction.insider.journal import\
     AUCTION_WORKER_SERVICE_AUCTION_NOT_FOUND,\
     AUCTION_WORKER_SERVICE_AUCTION_STATUS_CANCELED,\
     AUCTION_WORKER_SERVICE_AUCTION_RESCHEDULE
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.codec import install_codec,\
+    AuditDumper
+from openprocurement.auction.insider.clock import CLOCK
+from openprocurement.auction.insider.published import PublishedDocument
+from openprocurement.auction.insider.timeline import Timeline
+from openprocurement.auction.insider.watcher import ChangesWatcher
+from openprocurement.auction.insider.validators import BidValidator
+from openprocurement.auction.insider.recovery import AuctionJournal,\
+    restore_state
+from openprocurement.auction.insider.bids_queue import BidsQueue
+from openprocurement.auction.insider.blocking import BlockDetector
+from openprocurement.auction.insider.breaker import CircuitBreaker,\
+    DocumentSpool
 from openprocurement.auction.insider.utils import prepare_audit,\
-    update_auction_document, lock_bids, prepare_results_stage, normalize_audit,\
-    normalize_document
+    update_auction_document, lock_bids, prepare_results_stage, normalize_audit
 from openprocurement.auction.utils import delete_mapping, sorting_by_amount
 
 
 LOGGER = logging.getLogger('Auction Worker Insider')
-SCHEDULER = GeventScheduler(job_defaults={"misfire_grace_time": 100},
-                            executors={'default': AuctionsExecutor()},
-                            logger=LOGGER)
 
-SCHEDULER.timezone = TIMEZONE
+# stages whose time starts or ends a phase in the audit
+AUDIT_BOUNDS = (
+    (PRESEALEDBID, DUTCH, 'end'),
+    (SEALEDBID, SEALEDBID, 'start'),
+    (PREBESTBID, SEALEDBID, 'end'),
+    (BESTBID, BESTBID, 'start'),
+    (END, BESTBID, 'end'),
+)
 
-import simplejson
-use(encode=partial(simplejson.dumps, use_decimal=True),
-    decode=partial(simplejson.loads, use_decimal=True),
-    )
+
+def create_scheduler():
+    from apscheduler.schedulers.gevent import GeventScheduler
+    from openprocurement.auction.executor import AuctionsExecutor
+    scheduler = GeventScheduler(job_defaults={"misfire_grace_time": 100},
+                                executors={'default': AuctionsExecutor()},
+                                logger=LOGGER)
+    scheduler.timezone = TIMEZONE
+    return scheduler
+
+
+class LazyScheduler(object):
+    """
+    Scheduler created on first use, so commands which don't run an auction
+    don't import APScheduler
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._scheduler = None
+
+    def __getattr__(self, name):
+        if self._scheduler is None:
+            self._scheduler = self._factory()
+        return getattr(self._scheduler, name)
+
+
+SCHEDULER = LazyScheduler(create_scheduler)
+
+install_codec()
 
 
 class Auction(DutchDBServiceMixin,
@@ -80,9 +116,12 @@ class Auction(DutchDBServiceMixin,
         else:
             self.debug = False
         self.bids_actions = BoundedSemaphore()
+        self.clock = CLOCK
+        self.clock.resync()
         self.session = RequestsSession()
         self.features = {}  # bw
         self.worker_defaults = worker_defaults
+        self.codec = install_codec(worker_defaults.get('json_codec'))
         if self.worker_defaults.get('with_document_service', False):
             self.session_ds = RequestsSession()
         self._bids_data = {}
@@ -91,19 +130,42 @@ class Auction(DutchDBServiceMixin,
         self.audit = {}
         self.retries = 10
         self.mapping = {}
-        self._bids_data = defaultdict(list)
+        # results labels by bidder_id, shared by all stages of the bidder
+        self.bidder_labels = {}
+        self._bids_data = BidsData()
         self.has_critical_error = False
-        if REQUEST_QUEUE_SIZE == -1:
-            self.bids_queue = Queue()
-        else:
-            self.bids_queue = Queue(REQUEST_QUEUE_SIZE)
+        self.bids_queue = BidsQueue.from_config(worker_defaults)
 
         self.bidders_data = []
+        self.bid_validator = BidValidator({})
+        self.journal = AuctionJournal.for_auction(
+            worker_defaults, self.auction_doc_id, self.codec
+        )
+        self.db_breaker = CircuitBreaker.from_config(worker_defaults)
+        self.db_spool = DocumentSpool.for_auction(
+            worker_defaults, self.auction_doc_id, self.codec
+        )
+        self._spool_replayer = None
+        self.published = PublishedDocument(self.codec)
+        self.snapshot = None
+        self._timeline = None
+        self.server = None
+        self.changes_watcher = None
+        self.block_detector = None
+
+    @property
+    def timeline(self):
+        """ Stages of auction document by kind, rebuilt when they change """
+        self._timeline = Timeline.for_document(self.auction_document,
+                                               self._timeline)
+        return self._timeline
 
     def start_auction(self):
         self.generate_request_id()
         self.audit['timeline']['auction_start']['time']\
-            = datetime.now(tzlocal()).isoformat()
+            = self.clock.isoformat()
+        self.journal.set(('timeline', 'auction_start', 'time'),
+                         self.audit['timeline']['auction_start']['time'])
         LOGGER.info(
             '---------------- Start auction  ----------------',
             extra={"JOURNAL_REQUEST_ID": self.request_id,
@@ -117,6 +179,9 @@ class Auction(DutchDBServiceMixin,
                 self.auction_document['current_stage']
             ))
 
+    def update_bid_validator(self):
+        self.bid_validator = BidValidator(self.take_snapshot())
+
     @property
     def bidders_count(self):
         return len(self._bids_data.values())
@@ -133,59 +198,90 @@ class Auction(DutchDBServiceMixin,
             self.get_auction_info()
             self.audit = prepare_audit(self)
 
-        round_number = 0
-        SCHEDULER.add_job(
-            self.start_auction,
-            'date',
-            run_date=self.convert_datetime(
-                self.auction_document['stages'][0]['start']
-            ),
-            name="Start of Auction",
-            id="auction:start"
-        )
-        round_number += 1
+        self.journal.open(reset=True)
+        self.journal.mapping(self.mapping)
+        self.schedule_stages()
+        self.prepare_server()
 
-        for index, stage in enumerate(self.auction_document['stages'][1:], 1):
-            if stage['type'].startswith(DUTCH):
-                name = 'End of dutch stage: [{} -> {}]'.format(
-                    index - 1, index
-                )
-                id = 'auction:{}-{}'.format(DUTCH, index)
-                func = self.next_stage
-            elif stage['type'] == PRESEALEDBID:
-                name = 'End of dutch phase'
-                id = 'auction:{}'.format(PRESEALEDBID)
-                func = self.end_dutch
-            elif stage['type'] == SEALEDBID:
-                name = "Sealedbid phase"
-                func = self.switch_to_sealedbid
-                id = "auction:{}".format(SEALEDBID)
-            elif stage['type'] == PREBESTBID:
-                id = 'auction:{}'.format(PREBESTBID)
-                name = "End of sealedbid phase"
-                func = self.end_sealedbid
-            elif stage['type'] == BESTBID:
-                id = 'auction:{}'.format(BESTBID)
-                name = 'BestBid phase'
-                func = self.switch_to_bestbid
-            elif stage['type'] == END:
-                id = 'auction:{}'.format(END)
-                name = 'End of bestbid phase'
-                func = self.end_bestbid
+    def stage_job(self, index):
+        """ Name, id, function and arguments of the job of the stage """
+        kind = self.timeline.kinds[index]
+        if index == 0:
+            return "Start of Auction", "auction:start", self.start_auction, ()
+        args = (self.timeline.stages[index],)
+        if kind == DUTCH:
+            name = 'End of dutch stage: [{} -> {}]'.format(index - 1, index)
+            return name, 'auction:{}-{}'.format(DUTCH, index), \
+                self.next_stage, args
+        name, func = {
+            PRESEALEDBID: ('End of dutch phase', self.end_dutch),
+            SEALEDBID: ('Sealedbid phase', self.switch_to_sealedbid),
+            PREBESTBID: ('End of sealedbid phase', self.end_sealedbid),
+            BESTBID: ('BestBid phase', self.switch_to_bestbid),
+            END: ('End of bestbid phase', self.end_bestbid),
+        }[kind]
+        return name, 'auction:{}'.format(kind), func, args
 
+    def schedule_stages(self, first_stage=0):
+        timeline = self.timeline
+        for index in range(first_stage, len(timeline)):
+            name, id, func, args = self.stage_job(index)
             SCHEDULER.add_job(
                 func,
                 'date',
-                args=(stage,),
-                run_date=self.convert_datetime(
-                    self.auction_document['stages'][index]['start']
-                ),
+                args=args,
+                run_date=datetime.fromtimestamp(timeline.starts[index],
+                                                TIMEZONE),
                 name=name,
                 id=id
             )
 
-            round_number += 1
+    def due_stage(self, current_stage):
+        """ Index of the last stage which has started by the clock """
+        now = self.clock.time()
+        starts = self.timeline.starts
+        due = current_stage
+        for index in range(current_stage + 1, len(starts)):
+            if starts[index] is None or starts[index] > now:
+                break
+            due = index
+        return due
+
+    def catch_up_stages(self, current_stage):
+        """
+        Run stages which started while the worker was down, the scheduler
+        drops jobs which are more than misfire_grace_time late. Dutch steps
+        which passed are skipped, the amount jumps to the last due one.
+        Returns index of the stage the auction is on.
+        """
+        due = self.due_stage(current_stage)
+        timeline = self.timeline
+        index = current_stage + 1
+        while index <= due and \
+                self.auction_document.get('current_phase') != END:
+            if timeline.kinds[index] == DUTCH and index > 1:
+                last = index
+                while last < due and timeline.kinds[last + 1] == DUTCH:
+                    last += 1
+                if last > index:
+                    LOGGER.info("Skip dutch stages {} - {}".format(
+                        index, last - 1
+                    ))
+                    with lock_bids(self), update_auction_document(self):
+                        for skipped in range(index - 1, last - 1):
+                            self.auction_document['stages'][skipped].update(
+                                {'passed': True}
+                            )
+                        self.auction_document['current_stage'] = last - 1
+                    index = last
+            name, _, func, args = self.stage_job(index)
+            LOGGER.info("Run missed job: {}".format(name))
+            func(*args)
+            index += 1
+        return due
 
+    def prepare_server(self):
+        from openprocurement.auction.insider.server import run_server
         LOGGER.info(
             "Prepare server ...",
             extra={"JOURNAL_REQUEST_ID": self.request_id,
@@ -199,8 +295,137 @@ class Auction(DutchDBServiceMixin,
             LOGGER
         )
 
+    def resume_auction(self):
+        """
+        Restore worker state after a crash from auction document and local
+        journal and schedule only stages which have not started yet
+        """
+        self.generate_request_id()
+        if not self.get_auction_document():
+            LOGGER.info(
+                "Auction {} not found".format(self.auction_doc_id),
+                extra={
+                    'MESSAGE_ID': AUCTION_WORKER_SERVICE_AUCTION_NOT_FOUND
+                }
+            )
+            return False
+        spooled_document = self.db_spool.load()
+        if spooled_document:
+            LOGGER.info("Resume from spooled auction document")
+            spooled_document['_rev'] = self.auction_document.get('_rev')
+            self.auction_document = spooled_document
+        current_stage = self.auction_document['current_stage']
+        current_phase = self.auction_document.get('current_phase')
+        if current_stage < -1 or current_phase == END:
+            LOGGER.info("Auction {} can't be resumed on stage {}".format(
+                self.auction_doc_id, current_stage
+            ))
+            return False
+        if not self.journal.enabled:
+            LOGGER.warning("Journal is disabled, bids of current phase "
+                           "are not restored")
+        if self.debug:
+            self._auction_data = self.auction_document.get(
+                'test_auction_data', {}
+            )
+        self.get_auction_info()
+        self.audit = prepare_audit(self)
+        restore_state(self, self.journal.records())
+        self.journal.open()
+        self.update_bid_validator()
+        if current_phase == SEALEDBID:
+            self._end_sealedbid = Event()
+            spawn(self.add_bid)
+        current_stage = self.catch_up_stages(current_stage)
+        if self.auction_document.get('current_phase') == END:
+            LOGGER.info("Auction {} ended while the worker was down".format(
+                self.auction_doc_id
+            ))
+            return False
+        LOGGER.info("Resume auction {} on stage {}".format(
+            self.auction_doc_id, current_stage
+        ))
+        self.schedule_stages(current_stage + 1)
+        self.prepare_server()
+        return True
+
+    def watch_changes(self):
+        """ Follow changes of auction document made by other processes """
+        if self.worker_defaults.get('watch_changes', True):
+            self.changes_watcher = ChangesWatcher(
+                self.db, self.auction_doc_id, self.on_auction_change
+            ).start()
+
+    def monitor_hub(self):
+        """ Report greenlets which block the gevent hub for too long """
+        self.block_detector = BlockDetector.from_config(
+            self.worker_defaults, context=self.stage_context
+        )
+        if self.block_detector is not None:
+            self.block_detector.start()
+
+    def stage_context(self):
+        document = getattr(self, 'auction_document', None) or {}
+        return {'phase': document.get('current_phase'),
+                'stage': document.get('current_stage')}
+
+    def hub_metrics(self):
+        if self.block_detector is None:
+            return {}
+        return self.block_detector.metrics()
+
+    def on_auction_change(self, document):
+        if document.get('current_stage') in (-100, -101) and \
+                not self._end_auction_event.is_set():
+            self.stop_auction(document)
+
+    def stop_auction(self, document):
+        """
+        Auction was canceled or rescheduled by another process: stop jobs,
+        SSE streams and server at once. The document is not saved again.
+        """
+        if document['current_stage'] == -100:
+            status = 'canceled'
+            message_id = AUCTION_WORKER_SERVICE_AUCTION_CANCELED
+        else:
+            status = 'rescheduled'
+            message_id = AUCTION_WORKER_SERVICE_AUCTION_RESCHEDULE
+        LOGGER.info(
+            "Auction {} is {} outside of the worker, stop it".format(
+                self.auction_doc_id, status
+            ),
+            extra={"JOURNAL_REQUEST_ID": self.request_id,
+                   "MESSAGE_ID": message_id}
+        )
+        self.auction_document = document
+        SCHEDULER.remove_all_jobs()
+        if hasattr(self, '_end_sealedbid'):
+            self._end_sealedbid.set()
+        if self._spool_replayer is not None:
+            self._spool_replayer.kill(block=False)
+        self.db_spool.clear()
+        if self.server:
+            from openprocurement.auction.insider.server import\
+                close_event_sources
+            close_event_sources()
+            self.server.stop()
+        self.journal.close()
+        delete_mapping(self.worker_defaults, self.auction_doc_id)
+        self._end_auction_event.set()
+
     def wait_to_end(self):
         self._end_auction_event.wait()
+        if self.changes_watcher is not None:
+            self.changes_watcher.stop()
+        if self.block_detector is not None:
+            self.block_detector.stop()
+        if self.db_spool and \
+                not self.replay_spooled_document(SPOOL_REPLAY_TIMEOUT):
+            LOGGER.critical(
+                "Final auction document is not saved, it is left in "
+                "spool {}".format(self.db_spool.path),
+                extra={"JOURNAL_REQUEST_ID": self.request_id}
+            )
         LOGGER.info("Stop auction worker", extra={
             "JOURNAL_REQUEST_ID": self.request_id,
             "MESSAGE_ID": AUCTION_WORKER_SERVICE_STOP_AUCTION_WORKER
@@ -216,9 +441,10 @@ class Auction(DutchDBServiceMixin,
         for job in filter(filter_job, jobs):
             job.remove()
 
-    def approve_audit_info_on_announcement(self, approved={}):
+    def approve_audit_info_on_announcement(self, approved={},
+                                           results_time=None):
         self.audit['results'] = {
-            "time": datetime.now(tzlocal()).isoformat(),
+            "time": results_time or self.clock.isoformat(),
             "bids": []
         }
         for bid in self.auction_document['results']:
@@ -251,6 +477,7 @@ class Auction(DutchDBServiceMixin,
         )
         if self.server:
             self.server.stop()
+        self.journal.close()
         delete_mapping(self.worker_defaults,
                        self.auction_doc_id)
 
@@ -258,22 +485,27 @@ class Auction(DutchDBServiceMixin,
             "Clear mapping", extra={"JOURNAL_REQUEST_ID": self.request_id}
         )
         try:
+            # results of the audit and the document end at the same time
+            end_time = self.clock.isoformat()
             self.auction_document["current_stage"] = (len(
                 self.auction_document["stages"]) - 1)
             self.auction_document['current_phase'] = END
-            #normalized_document = normalize_document(self.auction_document)
-            #LOGGER.info()
-            self.approve_audit_info_on_announcement()
-            self.audit = normalize_audit(self.audit)
-            #LOGGER.debug(' '.join((
-            #    'Document in end_stage: \n', yaml_dump(dict(normalized_document))
-            #)), extra={"JOURNAL_REQUEST_ID": self.request_id})
+            self.update_bid_validator()
+            self.approve_audit_info_on_announcement(results_time=end_time)
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(' '.join((
+                    'Document in end_stage: \n',
+                    yaml_dump(self.auction_document, Dumper=AuditDumper)
+                )), extra={"JOURNAL_REQUEST_ID": self.request_id})
             LOGGER.info(
-                'Audit data: \n {}'.format(yaml_dump(self.audit)),
+                'Audit data: \n {}'.format(
+                    yaml_dump(self.audit, Dumper=AuditDumper)
+                ),
                 extra={"JOURNAL_REQUEST_ID": self.request_id}
             )
+            self.audit = normalize_audit(self.audit)
             LOGGER.info(self.audit)
-            self.auction_document['endDate'] = datetime.now(tzlocal()).isoformat()
+            self.auction_document['endDate'] = end_time
             if self.put_auction_data():
                 self.save_auction_document()
         except Exception as e:
@@ -294,7 +526,7 @@ class Auction(DutchDBServiceMixin,
                 }
             )
             self.auction_document["current_stage"] = -100
-            self.auction_document["endDate"] = datetime.now(tzlocal()).isoformat()
+            self.auction_document["endDate"] = self.clock.isoformat()
             LOGGER.info(
                 "Change auction {} status to 'canceled'".format(self.auction_doc_id),
                 extra={
@@ -329,17 +561,24 @@ class Auction(DutchDBServiceMixin,
                 }
             )
 
-    def post_audit(self):
+    def post_audit(self, auction_document=None):
         """
-            method that generate audit from auction document from db
+            method that generate audit from auction document from db,
+            backfill passes the document it has already read
         """
         self.generate_request_id()
-        auction_data = self.get_auction_document()
-        self._auction_data = {"data": auction_data}
+        if auction_document is None:
+            auction_document = self.get_auction_document()
+        else:
+            self.auction_document = auction_document
+        self._auction_data = {"data": auction_document}
         self.audit = prepare_audit(self)
-        self.audit['timeline']['auction_start']['time'] = self.auction_document["stages"][0]['start']
-        self.audit['timeline'][DUTCH]['timeline']['start'] = self.auction_document["stages"][1]['start']
-        for index, stage in enumerate(self.auction_document["stages"]):
+        timeline = self.timeline
+        stages = timeline.stages
+        self.audit['timeline']['auction_start']['time'] = stages[0]['start']
+        self.audit['timeline'][DUTCH]['timeline']['start'] = stages[1]['start']
+        for index in timeline.dutch_steps:
+            stage = stages[index]
             if stage.get('dutch_winner', False):
                 bid = {
                     'time': stage['time'],
@@ -348,23 +587,15 @@ class Auction(DutchDBServiceMixin,
                 }
                 self.audit['timeline'][DUTCH]['bids'].append(bid)  # Dutch winner
                 break
-            if stage["type"].startswith("dutch"):
-                turn = "turn_{}".format(index)
-                self.audit['timeline'][DUTCH][turn] = {
-                    'amount': stage['amount'],
-                    'time': stage['time'],
-                }
-        for stage in self.auction_document['stages']:
-            if stage['type'] == 'pre-sealedbid':
-                self.audit['timeline'][DUTCH]['timeline']['end'] = stage['time']
-            elif stage['type'] == 'sealedbid':
-                self.audit['timeline'][SEALEDBID]['timeline']['start'] = stage['time']
-            elif stage['type'] == 'pre-bestbid':
-                self.audit['timeline'][SEALEDBID]['timeline']['end'] = stage['time']
-            elif stage['type'] == 'bestbid':
-                self.audit['timeline'][BESTBID]['timeline']['start'] = stage['time']
-            elif stage['type'] == 'announcement':
-                self.audit['timeline'][BESTBID]['timeline']['end'] = stage['time']
+            turn = "turn_{}".format(index)
+            self.audit['timeline'][DUTCH][turn] = {
+                'amount': stage['amount'],
+                'time': stage['time'],
+            }
+        for kind, phase, bound in AUDIT_BOUNDS:
+            stage = timeline.stage(kind)
+            if stage is not None:
+                self.audit['timeline'][phase]['timeline'][bound] = stage['time']
         # Add sealedbid and bestbid bids
         for bid in self.auction_document['results']:
             if bid.get('amount', False) and not bid.get('dutch_winner', False):
@@ -372,11 +603,13 @@ class Auction(DutchDBServiceMixin,
             elif bid.get('dutch_winner', False) and bid['amount'] != self.audit['timeline'][DUTCH]['bids'][0]:
                 self.audit['timeline'][BESTBID]['bids'].append(bid)
         self.approve_audit_info_on_announcement()
-        self.audit = normalize_audit(self.audit)
         LOGGER.info(
-            'Audit data: \n {}'.format(yaml_dump(self.audit)),
+            'Audit data: \n {}'.format(
+                yaml_dump(self.audit, Dumper=AuditDumper)
+            ),
             extra={"JOURNAL_REQUEST_ID": self.request_id}
         )
+        self.audit = normalize_audit(self.audit)
         LOGGER.info(self.audit)
         if self.worker_defaults.get('with_document_service', False):
             self.upload_audit_file_with_document_service()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Backfill of audits for finished auctions.
+
+Auction documents are read from CouchDB a page at a time (ids from
+_all_docs, then documents of the page with one _all_docs?include_docs
+request) and their audits are rebuilt and uploaded by Auction.post_audit,
+as the prepare_audit command does, in a pool of greenlets. Uploads are
+started at most `rate` per second. After each page the id of its last
+document is written to the checkpoint file, so a stopped backfill resumes
+from the next page; auctions whose audit failed are listed there too.
+
+YAML of the audit is rendered by post_audit and the upload helpers, in the
+process which runs them. With processes > 1 the backfill forks a process
+per shard of auction ids, each with its own greenlet pool, share of the
+rate and checkpoint file (<checkpoint>.<shard>), so rendering is spread
+over CPUs.
+
+    auction_insider backfill <checkpoint> <auction_worker_config> \\
+        --since 2018-05-01 --until 2018-06-01 --processes 4
+"""
+import json
+import logging
+import os
+import time
+import traceback
+import zlib
+
+from itertools import izip
+
+from couchdb import Database, Session
+from dateutil.parser import parse as parse_date
+from gevent import sleep
+from gevent.pool import Pool
+from requests import Session as RequestsSession
+
+from openprocurement.auction.worker.mixins import TIMEZONE
+from openprocurement.auction.insider.auction import Auction
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+BACKFILL_PAGE = 100
+BACKFILL_CONCURRENCY = 10
+# audit uploads per second
+BACKFILL_RATE = 5
+
+
+def in_shard(doc_id, shard):
+    """
+    >>> [in_shard(doc_id, (0, 2)) for doc_id in ('c', 'd')]
+    [False, True]
+    >>> in_shard('a', (0, 1))
+    True
+    """
+    index, count = shard
+    return (zlib.crc32(doc_id) & 0xffffffff) % count == index
+
+
+def parse_period_date(value):
+    """
+    Bound of the backfill period, local time when zone is not given
+
+    >>> parse_period_date('2018-05-01').isoformat()
+    '2018-05-01T00:00:00+03:00'
+    >>> parse_period_date('2018-05-01T12:00:00Z').isoformat()
+    '2018-05-01T12:00:00+00:00'
+    """
+    if not value:
+        return None
+    date = parse_date(value)
+    if date.tzinfo is None:
+        date = TIMEZONE.localize(date)
+    return date
+
+
+def finished(document, since=None, until=None):
+    """ Dutch auction which has come to the end within [since, until) """
+    stages = document.get('stages')
+    if document.get('auction_type') != 'dutch' or not stages or \
+            document.get('current_stage') != len(stages) - 1 or \
+            not document.get('endDate'):
+        return False
+    end = parse_date(document['endDate'])
+    return (since is None or end >= since) and (until is None or end < until)
+
+
+class Throttle(object):
+    """
+    Lets calls through at most `rate` per second, greenlets which come
+    too early sleep until their turn
+    """
+
+    def __init__(self, rate, clock=time.time, sleep=sleep):
+        self.interval = 1.0 / rate if rate else 0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0
+
+    def wait(self):
+        now = self.clock()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            self.sleep(delay)
+
+
+class Checkpoint(object):
+    """ Backfill progress, kept in a local file replaced atomically """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {'last_doc_id': None, 'uploaded': 0, 'failed': []}
+        if os.path.exists(path):
+            with open(path) as stream:
+                self.state.update(json.load(stream))
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as stream:
+            json.dump(self.state, stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.rename(tmp_path, self.path)
+
+
+class Backfill(object):
+
+    def __init__(self, worker_defaults, checkpoint, db=None,
+                 since=None, until=None, concurrency=BACKFILL_CONCURRENCY,
+                 rate=BACKFILL_RATE, page_size=BACKFILL_PAGE, shard=(0, 1)):
+        self.worker_defaults = worker_defaults
+        self.checkpoint = checkpoint
+        if db is None:
+            db = Database(str(worker_defaults["COUCH_DATABASE"]),
+                          session=Session(retry_delays=range(10)))
+        self.db = db
+        self.since = since
+        self.until = until
+        self.pool = Pool(concurrency)
+        self.throttle = Throttle(rate)
+        self.page_size = page_size
+        self.shard = shard
+        # connections are reused by all auctions of the backfill
+        self.session = RequestsSession()
+        self.session_ds = RequestsSession()
+
+    def pages(self):
+        """
+        Finished auctions of the shard a page at a time, starting after
+        the checkpoint. Yields id of the last document of the page and
+        auction documents.
+        """
+        last_doc_id = self.checkpoint.state['last_doc_id']
+        while True:
+            options = {'limit': self.page_size}
+            if last_doc_id is not None:
+                options['startkey'] = last_doc_id
+            doc_ids = [row.id for row in self.db.view('_all_docs', **options)
+                       if row.id != last_doc_id]
+            if not doc_ids:
+                return
+            last_doc_id = doc_ids[-1]
+            keys = [doc_id for doc_id in doc_ids
+                    if not doc_id.startswith('_design/') and
+                    in_shard(doc_id, self.shard)]
+            documents = []
+            if keys:
+                for row in self.db.view('_all_docs', keys=keys,
+                                        include_docs=True):
+                    document = row.doc
+                    if document is not None and \
+                            finished(document, self.since, self.until):
+                        documents.append(document)
+            yield last_doc_id, documents
+
+    def upload(self, document):
+        """ Rebuild and upload audit of the auction, False on failure """
+        self.throttle.wait()
+        try:
+            auction = Auction(document['_id'],
+                              worker_defaults=self.worker_defaults)
+            auction.session = self.session
+            auction.session_ds = self.session_ds
+            auction.post_audit(document)
+        except Exception as e:
+            LOGGER.error("Audit of auction {} is not uploaded: {}".format(
+                document['_id'], e))
+            return False
+        return True
+
+    def run(self):
+        state = self.checkpoint.state
+        for last_doc_id, documents in self.pages():
+            uploads = self.pool.imap(self.upload, documents)
+            for document, uploaded in izip(documents, uploads):
+                if uploaded:
+                    state['uploaded'] += 1
+                else:
+                    state['failed'].append(document['_id'])
+            state['last_doc_id'] = last_doc_id
+            self.checkpoint.save()
+            LOGGER.info("Backfill: {} audits uploaded, {} failed, last "
+                        "auction {}".format(state['uploaded'],
+                                            len(state['failed']),
+                                            last_doc_id))
+        return state
+
+
+def run_backfill(checkpoint_path, worker_defaults, since=None, until=None,
+                 concurrency=BACKFILL_CONCURRENCY, processes=1,
+                 rate=BACKFILL_RATE):
+    """
+    Backfill audits of auctions finished within [since, until). Returns
+    True when all audits of the period were uploaded.
+    """
+    options = {
+        'since': parse_period_date(since),
+        'until': parse_period_date(until),
+        'concurrency': concurrency,
+        'rate': float(rate) / processes,
+    }
+    if processes == 1:
+        state = Backfill(worker_defaults, Checkpoint(checkpoint_path),
+                         **options).run()
+        return not state['failed']
+    children = []
+    for index in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                state = Backfill(
+                    worker_defaults,
+                    Checkpoint('{}.{}'.format(checkpoint_path, index)),
+                    shard=(index, processes), **options
+                ).run()
+                status = int(bool(state['failed']))
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        children.append(pid)
+    statuses = [os.waitpid(pid, 0)[1] for pid in children]
+    return not any(statuses)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left, insort
+from itertools import count
+
+from openprocurement.auction.insider.money import to_cents, CANCEL_BID_CENTS
+
+
+class Bid(object):
+    """
+    Compact bid record shared by Auction._bids_data and the audit timeline.
+
+    Supports the dict protocol used by phase mixins and templates
+    (``bid['amount']``, ``bid.get``, ``**bid``) and compares equal to the
+    dict it was created from. Fields which were never set are not part
+    of the record, like missing keys of a dict.
+    """
+    __slots__ = ('bidder_id', 'bidder_name', 'amount', 'time',
+                 'dutch_winner')
+
+    def __init__(self, **fields):
+        for name, value in fields.iteritems():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, bid):
+        if isinstance(bid, cls):
+            return bid
+        return cls(**bid)
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def __contains__(self, name):
+        return name in self.__slots__ and hasattr(self, name)
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def get(self, name, default=None):
+        if name not in self.__slots__:
+            return default
+        return getattr(self, name, default)
+
+    def to_dict(self):
+        return dict((name, getattr(self, name)) for name in self.keys())
+
+    def for_json(self):
+        return self.to_dict()
+
+    def __eq__(self, other):
+        if isinstance(other, Bid):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Bid({!r})'.format(self.to_dict())
+
+
+class BidsData(dict):
+    """
+    Bids history (bidder_id -> list of bids) with a live leaderboard.
+
+    Latest bid of every bidder is kept in a list ordered by amount, so the
+    top bid, number of valid bids and ordered results are available at any
+    moment without copying and sorting the whole history.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BidsData, self).__init__(*args, **kwargs)
+        self._sequence = count()
+        self._latest = {}
+        self._ranking = []
+        self.valid_bids_count = 0
+        for bids in self.values():
+            for bid in bids:
+                self._rank(bid)
+
+    def __missing__(self, bidder_id):
+        bids = self[bidder_id] = []
+        return bids
+
+    def _rank(self, bid):
+        bidder_id = bid['bidder_id']
+        if bidder_id in self._latest:
+            key = self._latest[bidder_id][0]
+            del self._ranking[bisect_left(self._ranking, key)]
+            if key[0] != CANCEL_BID_CENTS:
+                self.valid_bids_count -= 1
+        cents = to_cents(bid.get('amount') or 0)
+        key = (cents, next(self._sequence), bidder_id)
+        insort(self._ranking, key)
+        self._latest[bidder_id] = (key, bid)
+        if key[0] != CANCEL_BID_CENTS:
+            self.valid_bids_count += 1
+
+    def add(self, bid):
+        """
+        Store bid as a Bid record in bidder history and update leaderboard.
+        Returns the record, so it can be shared with the audit.
+        """
+        bid = Bid.from_dict(bid)
+        self[bid.bidder_id].append(bid)
+        self._rank(bid)
+        return bid
+
+    def latest(self, bidder_id):
+        return self._latest[bidder_id][1]
+
+    def top(self):
+        """ Highest latest bid, the earliest one of equal bids """
+        if self._ranking:
+            first = bisect_left(self._ranking, (self._ranking[-1][0],))
+            return self._latest[self._ranking[first][2]][1]
+
+    def latest_bids(self):
+        """ Latest bid of every bidder ordered by amount, then by time """
+        return [self._latest[key[2]][1] for key in self._ranking]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Queue of sealed bids between the bid requests and the bids worker.
+
+By default the queue is unbounded and keeps every bid, like a gevent
+Queue. In bounded mode (`bids_queue: {size: N}` in the worker config) it
+holds at most N pending bids and refuses more with QueueFull, which the
+form handler turns into a retryable error. Bounded mode coalesces bids of
+a bidder by default: a newer bid of a bidder joins the pending one in its
+place instead of taking a slot of its own. The bids worker still gets
+every bid, to record all of them in the audit.
+"""
+from collections import OrderedDict
+from itertools import count
+from time import time
+
+from gevent.event import Event
+
+from openprocurement.auction.insider.constants import REQUEST_QUEUE_SIZE
+
+
+QUEUE_FULL_RETRY_AFTER = 1
+
+
+class QueueFull(Exception):
+    """ Bids queue is full, the bid may be sent again later """
+
+
+class BidsQueue(object):
+
+    def __init__(self, maxsize=None, coalesce=False, clock=time):
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("Bids queue size must be positive, "
+                             "None for unbounded queue: {}".format(maxsize))
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.clock = clock
+        self._pending = OrderedDict()  # key: (bids, enqueued at)
+        self._sequence = count()
+        self._ready = Event()
+        self.accepted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+        self.processed = 0
+
+    @classmethod
+    def from_config(cls, worker_defaults):
+        config = worker_defaults.get('bids_queue', {})
+        size = config.get('size', REQUEST_QUEUE_SIZE)
+        if size is None or size == REQUEST_QUEUE_SIZE:
+            return cls()
+        return cls(maxsize=size, coalesce=config.get('coalesce', True))
+
+    def put(self, bid):
+        key = bid['bidder_id'] if self.coalesce else next(self._sequence)
+        if key in self._pending:
+            self._pending[key][0].append(bid)
+            self.coalesced += 1
+            return
+        if self.maxsize is not None and len(self._pending) >= self.maxsize:
+            self.rejected += 1
+            raise QueueFull()
+        self._pending[key] = ([bid], self.clock())
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._ready.set()
+
+    def get_bids(self):
+        """
+        Bids of the oldest pending entry in the order they were put, the
+        bid which decides is the last one. Waits for a bid when there is
+        none.
+        """
+        while not self._pending:
+            self._ready.clear()
+            self._ready.wait()
+        bids, enqueued = self._pending.popitem(last=False)[1]
+        wait = self.clock() - enqueued
+        self.waited += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.processed += 1
+        return bids
+
+    def get(self):
+        """ The latest bid of the oldest pending entry """
+        return self.get_bids()[-1]
+
+    def qsize(self):
+        return len(self._pending)
+
+    def empty(self):
+        return not self._pending
+
+    def metrics(self):
+        return {
+            'depth': len(self._pending),
+            'max_depth': self.max_depth,
+            'maxsize': self.maxsize,
+            'accepted': self.accepted,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'mean_wait': self.waited / self.processed
+            if self.processed else 0.0,
+            'max_wait': self.max_wait,
+        }
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Detector of gevent hub blocks.
+
+A heartbeat greenlet wakes up every interval and notes the time. A native
+thread watches the note: when it gets older than the threshold the hub is
+blocked by some greenlet, and the thread takes the stack of the worker
+thread and the current phase and stage at once, while the offender still
+runs. When the heartbeat wakes up again it knows how long the block lasted
+and records it.
+"""
+import logging
+import sys
+import traceback
+
+from time import time
+
+from gevent import spawn, sleep
+
+from openprocurement.auction.insider.profiler import start_new_thread,\
+    get_ident, native_sleep
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+BLOCK_THRESHOLD = 0.1
+BLOCK_HISTORY = 5
+
+
+class BlockDetector(object):
+
+    def __init__(self, threshold=BLOCK_THRESHOLD, interval=None,
+                 context=dict, history=BLOCK_HISTORY):
+        self.threshold = threshold
+        self.interval = interval if interval is not None else threshold / 2
+        self.context = context
+        self.history = history
+        self.thread_id = get_ident()
+        self.running = False
+        self.beat = None
+        self.blocks = 0
+        self.blocked = 0.0
+        self.worst = []
+        self._pending = None
+        self._greenlet = None
+
+    @classmethod
+    def from_config(cls, worker_defaults, context=dict):
+        """ None when disabled with `block_detector: {enabled: false}` """
+        config = worker_defaults.get('block_detector', {})
+        if not config.get('enabled', True):
+            return None
+        return cls(threshold=config.get('threshold', BLOCK_THRESHOLD),
+                   interval=config.get('interval'), context=context)
+
+    def start(self):
+        self.running = True
+        self.beat = time()
+        self._greenlet = spawn(self.heartbeat)
+        start_new_thread(self.monitor, ())
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+
+    def heartbeat(self):
+        while self.running:
+            sleep(self.interval)
+            expected = self.beat + self.interval
+            self.beat = time()
+            late = self.beat - expected
+            pending, self._pending = self._pending, None
+            if late >= self.threshold:
+                stack, context = pending or (None, self.context())
+                self.record(late, stack, context)
+
+    def monitor(self):
+        while self.running:
+            native_sleep(self.interval)
+            if self._pending is None and \
+                    time() - self.beat > self.threshold:
+                self.inspect()
+
+    def inspect(self):
+        """ Stack and context of the worker thread while it is blocked """
+        frame = sys._current_frames().get(self.thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else None
+        try:
+            context = self.context()
+        except Exception:
+            context = {}
+        self._pending = (stack, context)
+
+    def record(self, duration, stack, context):
+        self.blocks += 1
+        self.blocked += duration
+        block = dict(context, duration=duration, time=self.beat, stack=stack)
+        self.worst.append(block)
+        self.worst.sort(key=lambda block: block['duration'], reverse=True)
+        del self.worst[self.history:]
+        LOGGER.warning(
+            "Gevent hub was blocked for {:.3f}s, phase {} stage {}:\n{}".format(
+                duration, context.get('phase'), context.get('stage'),
+                ''.join(stack or ['stack is unknown\n'])
+            )
+        )
+
+    def metrics(self):
+        return {
+            'threshold': self.threshold,
+            'blocks': self.blocks,
+            'blocked': self.blocked,
+            'worst': self.worst[0]['duration'] if self.worst else 0.0,
+            'worst_blocks': self.worst,
+        }
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+
+from time import time
+
+from gevent import get_hub
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+FAILURE_THRESHOLD = 3
+LATENCY_THRESHOLD = 5.0
+RESET_TIMEOUT = 30.0
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of the CouchDB layer.
+
+    Trips after failure_threshold consecutive failed or slower than
+    latency_threshold seconds calls. While open calls are not allowed,
+    after reset_timeout seconds a single trial call is allowed (half-open),
+    its success closes the breaker. Other calls are refused until the trial
+    call records its result; a trial call which never does is replaced by
+    a new one after reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD,
+                 latency_threshold=LATENCY_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, clock=time):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    @classmethod
+    def from_config(cls, worker_defaults):
+        config = worker_defaults.get('db_breaker', {})
+        return cls(
+            failure_threshold=config.get(
+                'failure_threshold', FAILURE_THRESHOLD
+            ),
+            latency_threshold=config.get(
+                'latency_threshold', LATENCY_THRESHOLD
+            ),
+            reset_timeout=config.get('reset_timeout', RESET_TIMEOUT)
+        )
+
+    def available(self):
+        """ Whether allow() would let a call through, without calling it """
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.reset_timeout
+        if self.state == HALF_OPEN:
+            return self.clock() - self.trial_started >= self.reset_timeout
+        return True
+
+    def allow(self):
+        """ Let the call through, when half-open it becomes the trial call """
+        if not self.available():
+            return False
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            LOGGER.info("CouchDB circuit breaker is half-open")
+        if self.state == HALF_OPEN:
+            self.trial_started = self.clock()
+        return True
+
+    def record(self, started, success):
+        """ Register result of the call started at `started` """
+        if success and self.clock() - started <= self.latency_threshold:
+            if self.state != CLOSED:
+                LOGGER.info("CouchDB circuit breaker is closed")
+            self.state = CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or \
+                self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+                LOGGER.warning(
+                    "CouchDB circuit breaker is open after {} "
+                    "failures".format(self.failures)
+                )
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def metrics(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+        }
+
+
+class DocumentSpool(object):
+    """
+    Latest auction document which was not saved to CouchDB.
+
+    Saves are full document states, so only the last one is kept: in memory
+    and, when path is given, in a local file replaced atomically.
+    """
+
+    def __init__(self, path, codec):
+        self.path = path
+        self.codec = codec
+        self.document = None
+        self.size = 0
+
+    @classmethod
+    def for_auction(cls, worker_defaults, auction_doc_id, codec):
+        spool_dir = worker_defaults.get('spool_dir') or \
+            worker_defaults.get('journal_dir')
+        path = None
+        if spool_dir:
+            path = os.path.join(spool_dir, '{}.spool'.format(auction_doc_id))
+        return cls(path, codec)
+
+    def __nonzero__(self):
+        return self.document is not None
+
+    def put(self, document):
+        data = self.codec.dumps(document)
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self.document = document
+        self.size = len(data)
+        if self.path:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as spool:
+                spool.write(data)
+                spool.flush()
+                # fsync blocks the process, wait for it in the hub threadpool
+                get_hub().threadpool.apply(os.fsync, (spool.fileno(),))
+            os.rename(tmp_path, self.path)
+
+    def load(self):
+        """ Document spooled by previous run of the worker """
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'rb') as spool:
+                data = spool.read()
+            self.document = self.codec.loads(data)
+            self.size = len(data)
+        return self.document
+
+    def clear(self):
+        self.document = None
+        self.size = 0
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def metrics(self):
+        return {
+            'spooled': self.document is not None,
+            'spool_size': self.size,
+        }
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Cancel and reschedule of many auctions at once.
+
+Documents of a batch are read with a single _all_docs?include_docs request
+and written back with a single _bulk_docs request, so a batch of lots costs
+two CouchDB round trips instead of a worker process per auction. Documents
+which were changed in between (conflict) are read and written again, only
+them.
+"""
+import logging
+
+from couchdb import Database, Session
+from couchdb.http import ResourceConflict
+
+from openprocurement.auction.insider.clock import CLOCK
+from openprocurement.auction.insider.codec import install_codec
+from openprocurement.auction.insider.journal import\
+    AUCTION_WORKER_SERVICE_AUCTION_CANCELED,\
+    AUCTION_WORKER_SERVICE_AUCTION_NOT_FOUND,\
+    AUCTION_WORKER_SERVICE_AUCTION_STATUS_CANCELED,\
+    AUCTION_WORKER_SERVICE_AUCTION_RESCHEDULE
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+BULK_SIZE = 100
+BULK_RETRIES = 5
+
+
+def cancel(document):
+    """ Same change as Auction.cancel_auction """
+    LOGGER.info(
+        "Auction {} canceled".format(document['_id']),
+        extra={'MESSAGE_ID': AUCTION_WORKER_SERVICE_AUCTION_CANCELED}
+    )
+    document["current_stage"] = -100
+    document["endDate"] = CLOCK.isoformat()
+    LOGGER.info(
+        "Change auction {} status to 'canceled'".format(document['_id']),
+        extra={'MESSAGE_ID': AUCTION_WORKER_SERVICE_AUCTION_STATUS_CANCELED}
+    )
+
+
+def reschedule(document):
+    """ Same change as Auction.reschedule_auction """
+    LOGGER.info(
+        "Auction {} has not started and will be rescheduled".format(
+            document['_id']),
+        extra={'MESSAGE_ID': AUCTION_WORKER_SERVICE_AUCTION_RESCHEDULE}
+    )
+    document["current_stage"] = -101
+
+
+UPDATES = {
+    'bulk_cancel': cancel,
+    'bulk_reschedule': reschedule,
+}
+
+
+def bulk_update(db, auction_doc_ids, update, retries=BULK_RETRIES):
+    """
+    Apply `update` to auction documents and save them with _bulk_docs.
+    Returns {auction_doc_id: new rev}, None for auctions which were not
+    found or not saved.
+    """
+    results = {}
+    pending = list(auction_doc_ids)
+    attempts = retries
+    while pending and attempts:
+        documents = []
+        for row in db.view('_all_docs', keys=pending, include_docs=True):
+            document = row.doc
+            if document is None:
+                LOGGER.info("Auction {} not found".format(row.key), extra={
+                    'MESSAGE_ID': AUCTION_WORKER_SERVICE_AUCTION_NOT_FOUND
+                })
+                results[row.key] = None
+                continue
+            update(document)
+            documents.append(document)
+        pending = []
+        if not documents:
+            break
+        for success, doc_id, rev in db.update(documents):
+            if success:
+                results[doc_id] = rev
+            elif isinstance(rev, ResourceConflict):
+                pending.append(doc_id)
+            else:
+                LOGGER.error("Error while save document {}: {}".format(
+                    doc_id, rev))
+                results[doc_id] = None
+        if pending:
+            LOGGER.warning("Conflicts on {} documents, retry".format(
+                len(pending)))
+        attempts -= 1
+    for doc_id in pending:
+        LOGGER.error("Auction {} is not saved after {} conflicts".format(
+            doc_id, retries))
+        results[doc_id] = None
+    return results
+
+
+def run_bulk_command(cmd, auction_doc_ids, worker_defaults):
+    """ Cancel or reschedule auctions in batches of BULK_SIZE """
+    install_codec(worker_defaults.get('json_codec'))
+    db = Database(str(worker_defaults["COUCH_DATABASE"]),
+                  session=Session(retry_delays=range(10)))
+    auction_doc_ids = sorted(set(auction_doc_ids))
+    results = {}
+    for start in range(0, len(auction_doc_ids), BULK_SIZE):
+        results.update(bulk_update(
+            db, auction_doc_ids[start:start + BULK_SIZE], UPDATES[cmd]
+        ))
+    failed = [doc_id for doc_id, rev in results.items() if rev is None]
+    LOGGER.info("{}: {} of {} auctions updated".format(
+        cmd, len(results) - len(failed), len(results)))
+    return results
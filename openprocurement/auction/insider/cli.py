@@ -1,20 +1,36 @@
 # -*- coding: utf-8 -*-
-from gevent import monkey
-monkey.patch_all()
-
 import argparse
 import logging.config
 import json
-import yaml
 import sys
+import yaml
 import os
 
-from openprocurement.auction.insider.auction import Auction,\
-    SCHEDULER
 from openprocurement.auction.worker import constants as C
 
 
-def main():
+# run, resume and backfill work on gevent, short commands (cancel,
+# reschedule, ...) don't pay for patching
+GEVENT_COMMANDS = ('run', 'resume', 'backfill')
+# take comma separated auction ids, or '-' to read them from stdin
+BULK_COMMANDS = ('bulk_cancel', 'bulk_reschedule')
+
+
+def load_worker(cmd):
+    """
+    Import worker stack for the command. Server and scheduler are imported
+    lazily by the auction, only commands which run it patch gevent. Has to
+    be called before logging is configured, so handlers get gevent locks.
+    """
+    if cmd in GEVENT_COMMANDS:
+        from gevent import monkey
+        if not monkey.is_module_patched('socket'):
+            monkey.patch_all()
+    from openprocurement.auction.insider.auction import Auction, SCHEDULER
+    return Auction, SCHEDULER
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description='---- Auction ----')
     parser.add_argument('cmd', type=str, help='')
     parser.add_argument('auction_doc_id', type=str, help='auction_doc_id')
@@ -35,23 +51,60 @@ def main():
             C.PLANNING_PARTIAL_CRON
         ]
     )
+    # backfill takes checkpoint file in place of auction_doc_id
+    parser.add_argument('--since', type=str,
+                        help='Backfill auctions finished from the date')
+    parser.add_argument('--until', type=str,
+                        help='Backfill auctions finished before the date')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Backfill uploads at once in a process')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Backfill processes')
+    parser.add_argument('--rate', type=float, default=5,
+                        help='Backfill uploads per second')
+    return parser.parse_args(argv)
 
-    args = parser.parse_args()
-
-    if os.path.isfile(args.auction_worker_config):
-        worker_defaults = yaml.load(open(args.auction_worker_config))
-        if args.with_api_version:
-            worker_defaults['resource_api_version'] = args.with_api_version
-        if args.cmd != 'cleanup':
-            worker_defaults['handlers']['journal']['TENDER_ID'] = args.auction_doc_id
 
-        worker_defaults['handlers']['journal']['TENDERS_API_VERSION'] = worker_defaults['resource_api_version']
-        worker_defaults['handlers']['journal']['TENDERS_API_URL'] = worker_defaults['resource_api_server']
-        logging.config.dictConfig(worker_defaults)
-    else:
+def read_worker_defaults(path):
+    if not os.path.isfile(path):
         print("Auction worker defaults config not exists!!!")
         sys.exit(1)
+    return yaml.load(open(path))
+
 
+def configure(args, worker_defaults):
+    """ Apply command line overrides to config and set up logging """
+    if args.with_api_version:
+        worker_defaults['resource_api_version'] = args.with_api_version
+    if args.cmd != 'cleanup':
+        worker_defaults['handlers']['journal']['TENDER_ID'] = args.auction_doc_id
+
+    worker_defaults['handlers']['journal']['TENDERS_API_VERSION'] = worker_defaults['resource_api_version']
+    worker_defaults['handlers']['journal']['TENDERS_API_URL'] = worker_defaults['resource_api_server']
+    logging.config.dictConfig(worker_defaults)
+    return worker_defaults
+
+
+def auction_doc_ids(value, stream=sys.stdin):
+    if value == '-':
+        return [line.strip() for line in stream if line.strip()]
+    return [doc_id for doc_id in value.split(',') if doc_id]
+
+
+def run_command(args, worker_defaults):
+    if args.cmd in BULK_COMMANDS:
+        from openprocurement.auction.insider.bulk import run_bulk_command
+        run_bulk_command(args.cmd, auction_doc_ids(args.auction_doc_id),
+                         worker_defaults)
+        return
+    if args.cmd == 'backfill':
+        from openprocurement.auction.insider.backfill import run_backfill
+        if not run_backfill(args.auction_doc_id, worker_defaults,
+                            since=args.since, until=args.until,
+                            concurrency=args.concurrency,
+                            processes=args.processes, rate=args.rate):
+            sys.exit(1)
+        return
     if args.auction_info_from_db:
         auction_data = {'mode': 'test'}
     elif args.auction_info:
@@ -59,14 +112,24 @@ def main():
     else:
         auction_data = None
 
+    Auction, SCHEDULER = load_worker(args.cmd)
     auction = Auction(args.auction_doc_id,
                       worker_defaults=worker_defaults,
                       auction_data=auction_data)
     if args.cmd == 'run':
         SCHEDULER.start()
         auction.schedule_auction()
+        auction.watch_changes()
+        auction.monitor_hub()
         auction.wait_to_end()
         SCHEDULER.shutdown()
+    elif args.cmd == 'resume':
+        SCHEDULER.start()
+        if auction.resume_auction():
+            auction.watch_changes()
+            auction.monitor_hub()
+            auction.wait_to_end()
+        SCHEDULER.shutdown()
     elif args.cmd == 'planning':
         auction.prepare_auction_document()
     elif args.cmd == 'announce':
@@ -79,6 +142,15 @@ def main():
         auction.post_audit()
 
 
+def main():
+    args = parse_args()
+    if args.cmd not in BULK_COMMANDS:
+        load_worker(args.cmd)
+    worker_defaults = configure(
+        args, read_worker_defaults(args.auction_worker_config)
+    )
+    run_command(args, worker_defaults)
+
 
 if __name__ == "__main__":
     main()
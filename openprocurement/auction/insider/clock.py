@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Clock of the auction worker.
+
+Wall time is read once, when the clock is created, and advanced by
+monotonic time after that, so timestamps of an auction never go backwards
+when system time is stepped. UTC offset of the zone is looked up once an
+hour and ISO timestamps are formatted from it, instead of building an
+aware datetime and asking the zone for every timestamp.
+
+Monotonic time is time.monotonic on Python 3 and the `monotonic` package
+(clock extra) on Python 2; without it wall time is used.
+"""
+import time
+
+from datetime import datetime, timedelta
+
+from dateutil.tz import tzlocal
+
+try:
+    from time import monotonic
+except ImportError:  # python 2
+    try:
+        from monotonic import monotonic
+    except ImportError:
+        monotonic = time.time
+
+
+def format_offset(offset):
+    """
+    >>> format_offset(timedelta(hours=3))
+    '+03:00'
+    >>> format_offset(timedelta(hours=-9, minutes=-30))
+    '-09:30'
+    """
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return '{}{:02d}:{:02d}'.format(sign, *divmod(abs(minutes), 60))
+
+
+class Clock(object):
+
+    def __init__(self, tz=None, wall=time.time, monotonic=monotonic):
+        self.tz = tz or tzlocal()
+        self._wall = wall
+        self._monotonic = monotonic
+        self._origin = None
+        self._hour = None
+        self._offset = None
+        self.resync()
+
+    def resync(self):
+        """
+        Read wall time again. The module clock is created on import, so
+        worker processes forked by the zygote resync it when they start.
+        """
+        self._origin = self._wall() - self._monotonic()
+        self._hour = None
+
+    def time(self):
+        """ Seconds since the epoch """
+        return self._origin + self._monotonic()
+
+    def now(self):
+        return datetime.fromtimestamp(self.time(), self.tz)
+
+    def utcoffset(self, timestamp):
+        """ UTC offset and its ISO suffix, zones change offsets on hours """
+        hour = int(timestamp // 3600)
+        if hour != self._hour:
+            offset = datetime.fromtimestamp(timestamp, self.tz).utcoffset()
+            self._offset = (offset, format_offset(offset))
+            self._hour = hour
+        return self._offset
+
+    def isoformat(self, timestamp=None):
+        """ Same string as now().isoformat() """
+        if timestamp is None:
+            timestamp = self.time()
+        offset, suffix = self.utcoffset(timestamp)
+        return (datetime.utcfromtimestamp(timestamp) + offset).isoformat() \
+            + suffix
+
+
+class VirtualClock(Clock):
+    """
+    Clock which stands still until it is moved, for tests
+
+    >>> from dateutil.tz import tzutc
+    >>> clock = VirtualClock(1500000000, tzutc())
+    >>> clock.isoformat()
+    '2017-07-14T02:40:00+00:00'
+    >>> clock.advance(0.5)
+    >>> clock.isoformat()
+    '2017-07-14T02:40:00.500000+00:00'
+    """
+
+    def __init__(self, timestamp=0, tz=None):
+        super(VirtualClock, self).__init__(tz)
+        self.current = timestamp
+
+    def time(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += seconds
+
+    def set(self, timestamp):
+        self.current = timestamp
+
+
+CLOCK = Clock()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import logging
+import simplejson
+
+from decimal import Decimal
+from functools import partial
+from couchdb.json import use
+from yaml import SafeDumper
+
+from openprocurement.auction.insider.bids import Bid
+from openprocurement.auction.insider.money import Money
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+DEFAULT_CODEC = 'simplejson'
+
+
+class SimpleJSONCodec(object):
+    """ Default codec. Decimal amounts are written as raw JSON numbers """
+    name = 'simplejson'
+
+    def __init__(self):
+        self.dumps = partial(
+            simplejson.dumps, use_decimal=True, for_json=True
+        )
+        self.loads = partial(simplejson.loads, use_decimal=True)
+
+
+class _RawNumber(object):
+    """ Decimal which ujson writes verbatim, through __json__ """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __json__(self):
+        return str(self.value)
+
+
+_SCALARS = frozenset([str, unicode, int, long, bool, float, type(None)])
+
+
+def _raw_numbers(obj):
+    """
+    Wrap amounts for ujson, which would write Decimal through float.
+    Only containers on the way to an amount are copied, the rest of the
+    document is passed to ujson as is.
+    """
+    if isinstance(obj, dict):
+        copy = None
+        for key, value in obj.iteritems():
+            if type(value) in _SCALARS:
+                continue
+            raw = _raw_numbers(value)
+            if raw is not value:
+                if copy is None:
+                    copy = dict(obj)
+                copy[key] = raw
+        return obj if copy is None else copy
+    if isinstance(obj, (list, tuple)):
+        copy = None
+        for index, value in enumerate(obj):
+            if type(value) in _SCALARS:
+                continue
+            raw = _raw_numbers(value)
+            if raw is not value:
+                if copy is None:
+                    copy = list(obj)
+                copy[index] = raw
+        return obj if copy is None else copy
+    if isinstance(obj, Decimal):
+        return _RawNumber(obj)
+    if isinstance(obj, Money):
+        return _RawNumber(obj.to_decimal())
+    if isinstance(obj, Bid):
+        return _raw_numbers(obj.to_dict())
+    return obj
+
+
+class UJSONCodec(object):
+    """
+    Codec with ujson encoder. Amounts are written as raw JSON numbers,
+    the same as SimpleJSONCodec does, so stored documents don't depend on
+    the codec. ujson can't parse numbers to Decimal, so documents are
+    decoded with simplejson to keep amounts lossless. Wrapping amounts
+    costs about what ujson saves, so encoding is on par with simplejson,
+    while its compact output is cheaper to decode (see bench_codec).
+    """
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError('ujson codec requires the ujson package')
+        self.loads = partial(simplejson.loads, use_decimal=True)
+
+    def dumps(self, obj, **kwargs):
+        return ujson.dumps(_raw_numbers(obj), ensure_ascii=False)
+
+
+CODECS = {
+    SimpleJSONCodec.name: SimpleJSONCodec,
+    UJSONCodec.name: UJSONCodec,
+}
+
+
+def get_codec(name=None):
+    name = name or DEFAULT_CODEC
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError('Unknown json codec: {}'.format(name))
+    except ImportError as e:
+        LOGGER.warning("{}. Fallback to {}".format(e, DEFAULT_CODEC))
+        return CODECS[DEFAULT_CODEC]()
+
+
+def install_codec(name=None):
+    """ Select codec and use it as couchdb-python json backend """
+    codec = get_codec(name)
+    use(encode=codec.dumps, decode=codec.loads)
+    return codec
+
+
+class AuditDumper(SafeDumper):
+    """
+    SafeDumper for the audit and auction document, which renders amounts
+    as strings straight from the live objects. Pass it explicitly:
+    yaml.dump(audit, Dumper=AuditDumper)
+    """
+
+
+def represent_amount(dumper, amount):
+    return dumper.represent_str(str(amount))
+
+
+def represent_bid(dumper, bid):
+    data = bid.to_dict()
+    if 'amount' in data:
+        data['amount'] = str(data['amount'])
+    return dumper.represent_dict(data)
+
+
+AuditDumper.add_representer(Decimal, represent_amount)
+AuditDumper.add_representer(Money, represent_amount)
+AuditDumper.add_representer(Bid, represent_bid)
@@ -5,6 +5,10 @@ BIDS_KEYS_FOR_COPY = ("bidder_id", "amount", "time", "dutch_winner")
 PROCUREMENT_METHOD_TYPE = 'dgfInsider'
 REQUEST_QUEUE_SIZE = -1
 REQUEST_QUEUE_TIMEOUT = 32
+DB_RETRY_BACKOFF = 0.1
+DB_RETRY_MAX_BACKOFF = 2.0
+SPOOL_REPLAY_INTERVAL = 1.0
+SPOOL_REPLAY_TIMEOUT = 600
 # DUTCH_TIMEDELTA = timedelta(hours=5, minutes=15)
 
 DUTCH_ROUNDS = 81
@@ -31,3 +35,6 @@ END_DUTCH_PAUSE = timedelta(seconds=30)
 SEALEDBID_TIMEDELTA = timedelta(minutes=10)
 BESTBID_TIMEDELTA = timedelta(minutes=5)
 END_PHASE_PAUSE = timedelta(seconds=20)
+# dutch steps of time compressed sandbox auctions are not shorter, rounds
+# which don't fit are dropped
+MIN_DUTCH_STEP = timedelta(seconds=1)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from couchdb.design import ViewDefinition
+
+
+# Start and end of every auction keyed by auction id, computed like
+# by_startDate and by_endDate views of openprocurement.auction, so planning
+# checks are keyed lookups instead of reading all rows of a date.
+planned_view = ViewDefinition(
+    'insider',
+    'planned',
+    ''' function(doc) {
+            if (doc._id.indexOf('_design/') === 0) { return; }
+            var start = -1;
+            var end = -1;
+            if (doc.stages && doc.stages.length) {
+                start = new Date(doc.stages[0]['start']).getTime();
+                end = start;
+            }
+            if (doc.endDate) {
+                end = new Date(doc.endDate).getTime();
+            }
+            emit(doc._id, [start, end]);
+        }
+    '''
+)
+
+
+def sync_design(db):
+    """ Push planning views to the auctions database """
+    ViewDefinition.sync_many(db, [planned_view])
+
+
+def planned_auctions(db, auction_ids):
+    """
+    Start and end timestamps (ms) of already planned auctions by their id,
+    resolved with a single multi-key view request. The view is pushed by
+    the plugin when the data bridge loads it (see includeme.dutch).
+    """
+    return dict(
+        (row.key, tuple(row.value))
+        for row in planned_view(db, keys=list(auction_ids))
+    )
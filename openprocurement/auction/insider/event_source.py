@@ -10,10 +10,39 @@ from openprocurement.auction.event_source import (
 from openprocurement.auction.utils import (
     prepare_extra_journal_fields, get_bidder_id
 )
+from openprocurement.auction.insider.ratelimit import check_rate_limit,\
+    EVENT_SOURCE
 
 
 sse = Blueprint('sse', __name__)
 
+
+class CodecSseStream(SseStream):
+    """
+    SseStream which encodes event data with the auction json codec,
+    the same as CouchDB documents and /postbid responses
+    """
+
+    def __init__(self, queue, codec, timeout=0, **kwargs):
+        super(CodecSseStream, self).__init__(queue, timeout=timeout, **kwargs)
+        self.queue = queue
+        self.codec = codec
+        self.retry = 0 if timeout else 2000
+
+    def __iter__(self):
+        events = PySse(default_retry=self.retry)
+        for data in events:
+            yield data.encode('u8')
+        while True:
+            message = self.queue.get()
+            if message['event'] == 'StopSSE':
+                return
+            events.add_message(message['event'],
+                               self.codec.dumps(message['data']))
+            for data in events:
+                yield data.encode('u8')
+
+
 @sse.route("/set_sse_timeout", methods=['POST'])
 def set_sse_timeout():
     current_app.logger.info(
@@ -39,6 +68,17 @@ def set_sse_timeout():
 
 @sse.route("/event_source")
 def event_source():
+    retry_after = check_rate_limit(current_app, session, EVENT_SOURCE)
+    if retry_after:
+        # an empty stream, the browser reconnects after the retry delay
+        response = Response(
+            iter([''.join(PySse(int(retry_after * 1000)))]),
+            direct_passthrough=True,
+            mimetype='text/event-stream',
+            content_type='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     current_app.logger.debug(
         'Handle event_source request with session {}'.format(repr(dict(session))),
         extra=prepare_extra_journal_fields(request.headers)
@@ -53,7 +93,8 @@ def event_source():
                 if bidder_info['id'] == bidder:
                     valid_bidder = True
                     break
-            if current_app.config['auction'].auction_document.get('current_phase', '') in ['dutch', 'pre-started', 'pre-sealedbid']:
+            snapshot = current_app.config['auction'].snapshot or {}
+            if snapshot.get('current_phase', '') in ['dutch', 'pre-started', 'pre-sealedbid']:
                 valid_bidder = True
             if valid_bidder:
                 if bidder not in current_app.auction_bidders:
@@ -101,8 +142,9 @@ def event_source():
                         "ClientsList"
                     )
                 response = Response(
-                    SseStream(
+                    CodecSseStream(
                         current_app.auction_bidders[bidder]["channels"][client_hash],
+                        current_app.config['auction'].codec,
                         bidder_id=bidder,
                         client_id=client_hash,
                         timeout=session.get("sse_timeout", 0)
@@ -1,16 +1,18 @@
 # -*- coding: utf-8 -*-
 from flask import request, session, current_app as app
-from decimal import ROUND_HALF_UP, Decimal
+from decimal import ROUND_HALF_UP
 
 from wtforms import Form, StringField, DecimalField
 from wtforms.validators import ValidationError, DataRequired
-from datetime import datetime
-from pytz import timezone
 import wtforms_json
 
 from openprocurement.auction.utils import prepare_extra_journal_fields
 from openprocurement.auction.insider.constants import DUTCH, SEALEDBID, BESTBID
+from openprocurement.auction.insider.bids_queue import QueueFull,\
+    QUEUE_FULL_RETRY_AFTER
 from openprocurement.auction.insider.utils import lock_bids, get_dutch_winner
+from openprocurement.auction.insider.money import Money, to_cents,\
+    CANCEL_BID_CENTS
 
 
 wtforms_json.init()
@@ -33,9 +35,7 @@ def validate_bid_value(form, field):
             current_amount = form.document['stages'][current_stage].get(
                 'amount',
             )
-            if not isinstance(current_amount, Decimal):
-                current_amount = Decimal(str(current_amount))
-            if current_amount != field.data:
+            if to_cents(current_amount) != to_cents(field.data):
                 message = u"Passed value doesn't match"\
                           " current amount={}".format(current_amount)
                 raise ValidationError(message)
@@ -46,23 +46,20 @@ def validate_bid_value(form, field):
     elif phase == BESTBID:
         # TODO: one percent step validation
         winner = get_dutch_winner(form.document)
-        current_amount = winner.get('amount')
-        if not isinstance(current_amount, Decimal):
-            current_amount = Decimal(str(current_amount))
-        if field.data != Decimal('-1') and (field.data <= current_amount):
+        current_cents = to_cents(winner.get('amount'))
+        bid_cents = to_cents(field.data)
+        if bid_cents != CANCEL_BID_CENTS and bid_cents <= current_cents:
             message = u'Bid value can\'t be less or equal current amount'
             raise ValidationError(message)
         return True
     elif phase == SEALEDBID:
-        if field.data <= Decimal('0.0') and field.data != Decimal('-1'):
+        bid_cents = to_cents(field.data)
+        if bid_cents <= 0 and bid_cents != CANCEL_BID_CENTS:
             message = u'To low value'
             raise ValidationError(message)
         winner = get_dutch_winner(form.document)
-        dutch_winner_value = winner.get('amount')
-
-        if not isinstance(dutch_winner_value, Decimal):
-            dutch_winner_value = Decimal(str(dutch_winner_value))
-        if field.data != Decimal('-1') and (field.data <= dutch_winner_value):
+        dutch_winner_cents = to_cents(winner.get('amount'))
+        if bid_cents != CANCEL_BID_CENTS and bid_cents <= dutch_winner_cents:
             message = u'Bid value can\'t be less or equal current amount'
             raise ValidationError(message)
         return True
@@ -119,35 +116,48 @@ class BidsForm(Form):
     )
 
 
-def form_handler():
-    auction = app.config['auction']
-    raw_data = request.json
+def validate_form(auction, raw_data):
+    """ Validate bid with WTForms based app.bids_form """
     if 'bid' in raw_data:
         raw_data['bid'] = str(raw_data['bid'])
     form = app.bids_form.from_json(raw_data)
     form.auction = auction
     form.document = auction.auction_document
-    current_time = datetime.now(timezone('Europe/Kiev'))
-    current_phase = form.document.get('current_phase')
-    current_stage = form.document.get('current_stage')
+    stage = form.document.get('current_stage')
     if not form.validate():
+        return form.data, form.errors, stage
+    return form.data, {}, stage
+
+
+def form_handler():
+    auction = app.config['auction']
+    raw_data = request.json
+    document = auction.auction_document
+    if app.bids_form is None:
+        data, errors, current_stage = auction.bid_validator.validate(raw_data)
+    else:
+        data, errors, current_stage = validate_form(auction, raw_data)
+    current_time = auction.clock.isoformat()
+    currency = document.get('value', {}).get('currency')
+    current_phase = document.get('current_phase')
+    if errors:
         app.logger.info(
             "Bidder {} with client_id {} wants place bid {} in {} on phase {} "
             "with errors {}".format(
                 request.json.get('bidder_id', 'None'),
                 session.get('client_id', ''),
                 request.json.get('bid', 'None'),
-                current_time.isoformat(),
+                current_time,
                 current_phase,
-                repr(form.errors)
+                repr(errors)
             ), extra=prepare_extra_journal_fields(
                 request.headers
             )
         )
-        return {'status': 'failed', 'errors': form.errors}
+        return {'status': 'failed', 'errors': errors}
     if current_phase == DUTCH:
         with lock_bids(auction):
-            bidder_id = form.data['bidder_id']
+            bidder_id = data['bidder_id']
             if bidder_id not in auction.mapping:
                 auction.get_auction_info()
                 if bidder_id not in auction.mapping:
@@ -155,21 +165,21 @@ def form_handler():
                         "CRITICAL! Bad bidder, that not registered in API")  # XXX TODO create a way to ban this user
                     return {"status": "failed", "errors": [["Bad bidder!"]]}
             ok = auction.add_dutch_winner({
-                'amount': form.data['bid'],
-                'time': current_time.isoformat(),
-                'bidder_id': form.data['bidder_id'],
+                'amount': Money.from_amount(data['bid'], currency),
+                'time': current_time,
+                'bidder_id': data['bidder_id'],
                 'current_stage': current_stage
             })
             if not isinstance(ok, Exception):
                 app.logger.info(
                     "Bidder {} with client {} has won"
                     " dutch on value {}".format(
-                        form.data['bidder_id'],
+                        data['bidder_id'],
                         session.get('client_id'),
-                        form.data['bid']
+                        data['bid']
                     )
                 )
-                return {"status": "ok", "data": form.data}
+                return {"status": "ok", "data": data}
             else:
                 app.logger.info(
                     "Bidder {} with client_id {} wants place"
@@ -178,7 +188,7 @@ def form_handler():
                         request.json.get('bidder_id', 'None'),
                         session.get('client_id'),
                         request.json.get('bid', 'None'),
-                        current_time.isoformat(),
+                        current_time,
                         repr(ok)
                     ),
                     extra=prepare_extra_journal_fields(request.headers)
@@ -190,29 +200,33 @@ def form_handler():
             if hasattr(auction, '_end_sealedbid'):
                 if not auction._end_sealedbid.is_set():
                     auction.bids_queue.put({
-                        'amount': form.data['bid'],
-                        'time': current_time.isoformat(),
-                        'bidder_id': form.data['bidder_id']
+                        'amount': Money.from_amount(data['bid'], currency),
+                        'time': current_time,
+                        'bidder_id': data['bidder_id']
                     })
-                    return {"status": "ok", "data": form.data}
+                    return {"status": "ok", "data": data}
             return {"status": "failed", "errors": ['Forbidden']}
+        except QueueFull:
+            return {"status": "failed",
+                    "errors": [["Too many bids, please retry"]],
+                    "retry_after": QUEUE_FULL_RETRY_AFTER}
         except Exception as e:
             return {"status": "failed", "errors": [repr(e)]}
     elif current_phase == BESTBID:
         ok = auction.add_bestbid({
-            'amount': form.data['bid'],
-            'time': current_time.isoformat(),
-            'bidder_id': form.data['bidder_id']
+            'amount': Money.from_amount(data['bid'], currency),
+            'time': current_time,
+            'bidder_id': data['bidder_id']
         })
         if not isinstance(ok, Exception):
             app.logger.info(
                 "Bidder {} with client {} has won dutch on value {}".format(
-                    form.data['bidder_id'],
+                    data['bidder_id'],
                     session.get('client_id'),
-                    form.data['bid']
+                    data['bid']
                 )
             )
-            return {"status": "ok", "data": form.data}
+            return {"status": "ok", "data": data}
         else:
             app.logger.info(
                 "Bidder {} with client_id {} wants place"
@@ -221,7 +235,7 @@ def form_handler():
                     request.json.get('bidder_id', 'None'),
                     session.get('client_id'),
                     request.json.get('bid', 'None'),
-                    current_time.isoformat(),
+                    current_time,
                     repr(ok)
                 ),
                 extra=prepare_extra_journal_fields(request.headers)
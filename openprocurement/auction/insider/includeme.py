@@ -6,6 +6,7 @@ from openprocurement.auction.interfaces import (
     IFeedItem, IAuctionDatabridge, IAuctionsChronograph, IAuctionsServer
 )
 
+from openprocurement.auction.insider.design import sync_design
 from openprocurement.auction.insider.interfaces import IDutchAuction
 from openprocurement.auction.insider.planning import InsiderPlanning
 from openprocurement.auction.insider.views import includeme as _includeme
@@ -17,6 +18,9 @@ LOGGER = logging.getLogger(__name__)
 def dutch(components, procurement_method_types):
     for procurement_method_type in procurement_method_types:
         includeme(components, procurement_method_type)
+    bridge = components.queryUtility(IAuctionDatabridge)
+    if bridge is not None:
+        sync_design(bridge.db)
     server = components.queryUtility(IAuctionsServer)
     _includeme(server)
 
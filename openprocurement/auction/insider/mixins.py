@@ -1,16 +1,12 @@
 # -*- coding: utf-8 -*-
 import logging
 import sys
-import simplejson
 
 from copy import deepcopy
-from couchdb.json import use
-from couchdb.http import HTTPError, RETRYABLE_ERRORS
-from datetime import datetime
-from dateutil.tz import tzlocal
+from couchdb.http import HTTPError, ResourceConflict, RETRYABLE_ERRORS
 from gevent import spawn, sleep
 from gevent.event import Event
-from functools import partial
+from time import time
 
 from openprocurement.auction.utils import get_tender_data
 from openprocurement.auction.worker.mixins import DBServiceMixin,\
@@ -21,15 +17,13 @@ from openprocurement.auction.worker.journal import\
     AUCTION_WORKER_API_AUCTION_RESULT_NOT_APPROVED as API_NOT_APPROVED,\
     AUCTION_WORKER_SERVICE_END_FIRST_PAUSE
 from openprocurement.auction.insider import utils
+from openprocurement.auction.insider.snapshot import snapshot
 from openprocurement.auction.insider.constants import DUTCH,\
-    SEALEDBID, PREBESTBID, PRESEALEDBID, BESTBID
+    SEALEDBID, PREBESTBID, PRESEALEDBID, BESTBID, END, SPOOL_REPLAY_INTERVAL
 
 
 LOGGER = logging.getLogger("Auction Worker Insider")
 
-use(encode=partial(simplejson.dumps, use_decimal=True),
-    decode=partial(simplejson.loads, use_decimal=True))
-
 
 class DutchDBServiceMixin(DBServiceMixin):
     """ Mixin class to work with couchdb"""
@@ -94,9 +88,17 @@ class DutchDBServiceMixin(DBServiceMixin):
                     = len(self.mapping.keys()) + 1
         return self._auction_data
 
+    def take_snapshot(self):
+        """
+        Read-only copy of the live document for readers which don't take
+        the bids lock: the bid validator, /event_source and rate limits
+        """
+        self.snapshot = snapshot(self.auction_document, self.snapshot)
+        return self.snapshot
+
     def prepare_public_document(self):
-        public_document = deepcopy(dict(self.auction_document))
-        return public_document
+        """ Take a snapshot of the document, its shallow copy is saved """
+        return dict(self.take_snapshot())
 
     def prepare_auction_document(self):
         self.generate_request_id()
@@ -112,7 +114,17 @@ class DutchDBServiceMixin(DBServiceMixin):
             )
 
         self.get_auction_info(prepare=True)
-        if self.worker_defaults.get('sandbox_mode', False):
+        time_compression = float(
+            self.worker_defaults.get('time_compression') or 0
+        )
+        if self.worker_defaults.get('sandbox_mode', False) and \
+                time_compression:
+            # full shape auction, all stages time_compression times shorter
+            self.auction_document = utils.prepare_auction_document(
+                self,
+                time_compression=time_compression
+            )
+        elif self.worker_defaults.get('sandbox_mode', False):
             self.auction_document = utils.prepare_auction_document(
                 self,
                 fast_forward=True
@@ -142,10 +154,16 @@ class DutchDBServiceMixin(DBServiceMixin):
             LOGGER.warn("Auction {} not exists".format(self.auction_doc_id))
  
     def get_auction_document(self, force=False):
+        if not self.db_breaker.allow():
+            LOGGER.warning("CouchDB is unavailable, use auction document "
+                           "from memory")
+            return getattr(self, 'auction_document', None)
         retries = self.retries
         while retries:
+            started = time()
             try:
                 public_document = self.db.get(self.auction_doc_id)
+                self.db_breaker.record(started, True)
                 if public_document:
                     LOGGER.info("Get auction document {0[_id]} with rev {0[_rev]}".format(public_document),
                                 extra={"JOURNAL_REQUEST_ID": self.request_id})
@@ -156,7 +174,8 @@ class DutchDBServiceMixin(DBServiceMixin):
                     elif public_document['_rev'] != self.auction_document['_rev']:
                         LOGGER.warning("Rev error")
                         self.auction_document["_rev"] = public_document["_rev"]
-                    LOGGER.debug(simplejson.dumps(self.auction_document, indent=4))
+                    if LOGGER.isEnabledFor(logging.DEBUG):
+                        LOGGER.debug(self.codec.dumps(self.auction_document))
                 return public_document
 
             except HTTPError, e:
@@ -167,21 +186,40 @@ class DutchDBServiceMixin(DBServiceMixin):
                     LOGGER.error("Error while get document: {}".format(e))
                 else:
                     LOGGER.critical("Unhandled error: {}".format(e))
+            self.db_breaker.record(started, False)
+            if not self.db_breaker.allow():
+                return getattr(self, 'auction_document', None)
             retries -= 1
+            utils.retry_sleep(self, self.retries - retries)
 
     def save_auction_document(self):
         public_document = self.prepare_public_document()
         retries = 10
         while retries:
+            if not self.db_breaker.allow():
+                return self.spool_auction_document(public_document)
+            started = time()
             try:
                 response = self.db.save(public_document)
                 if len(response) == 2:
+                    self.db_breaker.record(started, True)
                     LOGGER.info("Saved auction document {0} with rev {1}".format(*response))
                     self.auction_document['_rev'] = response[1]
+                    self.published.update(
+                        dict(public_document, _rev=response[1])
+                    )
+                    if self.db_spool:
+                        self.db_spool.clear()
+                        LOGGER.info("Spooled auction document is saved")
                     return response
+            except ResourceConflict, e:
+                self.db_breaker.record(started, True)
+                LOGGER.error("Error while save document: {}".format(e))
             except HTTPError, e:
+                self.db_breaker.record(started, False)
                 LOGGER.error("Error while save document: {}".format(e))
             except Exception, e:
+                self.db_breaker.record(started, False)
                 ecode = e.args[0]
                 if ecode in RETRYABLE_ERRORS:
                     LOGGER.error("Error while save document: {}".format(e))
@@ -190,8 +228,42 @@ class DutchDBServiceMixin(DBServiceMixin):
             if "_rev" in public_document:
                 LOGGER.debug("Retry save document changes")
             saved_auction_document = self.get_auction_document(force=True)
-            public_document["_rev"] = saved_auction_document["_rev"]
+            if saved_auction_document:
+                public_document["_rev"] = saved_auction_document["_rev"]
             retries -= 1
+        return self.spool_auction_document(public_document)
+
+    def spool_auction_document(self, public_document):
+        LOGGER.warning(
+            "Auction document is not saved, spool it until CouchDB recovers",
+            extra={"JOURNAL_REQUEST_ID": self.request_id}
+        )
+        self.db_spool.put(public_document)
+        self.published.update(public_document)
+        if self._spool_replayer is None or self._spool_replayer.ready():
+            self._spool_replayer = spawn(self.replay_spooled_document)
+
+    def replay_spooled_document(self, timeout=None):
+        """
+        Save the latest auction state as soon as CouchDB recovers.
+        Returns True when nothing is left in the spool.
+        """
+        started = time()
+        while self.db_spool:
+            if timeout is not None and time() - started >= timeout:
+                break
+            if self.db_breaker.available():
+                with utils.lock_bids(self):
+                    if self.db_spool:
+                        self.save_auction_document()
+            if self.db_spool:
+                sleep(SPOOL_REPLAY_INTERVAL)
+        return not self.db_spool
+
+    def db_metrics(self):
+        metrics = self.db_breaker.metrics()
+        metrics.update(self.db_spool.metrics())
+        return metrics
 
 
 class DutchPostAuctionMixin(PostAuctionServiceMixin):
@@ -242,6 +314,16 @@ class DutchAuctionPhase(object):
     def next_stage(self, stage):
 
         with utils.lock_bids(self), utils.update_auction_document(self):
+            if self.auction_document.get('current_phase') in (PRESEALEDBID,
+                                                              END):
+                # a dutch winner ended the phase while the document
+                # was being read
+                LOGGER.info("Dutch phase has ended, skip stage {}".format(
+                    stage['type']
+                ))
+                return
+            if stage['type'].startswith(DUTCH):
+                self.auction_document['current_phase'] = DUTCH
             run_time = utils.update_stage(self)
             stage_index = self.auction_document['current_stage']
             self.auction_document['stages'][stage_index - 1].update({
@@ -255,9 +337,11 @@ class DutchAuctionPhase(object):
                 self.auction_document['stages'][stage_index]['time']\
                     = run_time
                 if stage_index == 1:
-                    self.auction_document['current_phase'] = DUTCH
                     self.audit['timeline'][DUTCH]['timeline']['start']\
                         = run_time
+                    self.journal.set(
+                        ('timeline', DUTCH, 'timeline', 'start'), run_time
+                    )
 
                 old = self.auction_document['stages'][stage_index - 1].get(
                     'amount', ''
@@ -271,6 +355,10 @@ class DutchAuctionPhase(object):
                     'amount': stage['amount'],
                     'time': run_time,
                 }
+                self.journal.set(
+                    ('timeline', DUTCH, turn),
+                    self.audit['timeline'][DUTCH][turn]
+                )
 
             else:
                 self.end_dutch()
@@ -278,12 +366,10 @@ class DutchAuctionPhase(object):
     def approve_dutch_winner(self, bid):
         try:
             bid['dutch_winner'] = True
-            for lst in [
-                    self.audit['timeline'][DUTCH]['bids'],
-                    self._bids_data[bid['bidder_id']]
-                    ]:
-                lst.append(bid)
-            return deepcopy(bid)
+            bid = self._bids_data.add(bid)
+            self.audit['timeline'][DUTCH]['bids'].append(bid)
+            self.journal.bid(DUTCH, bid)
+            return bid
         except Exception as e:
             LOGGER.warn("Unable to post dutch winner. Error: {}".format(
                 e
@@ -309,7 +395,9 @@ class DutchAuctionPhase(object):
                         "step has already ended.")
                 bid = self.approve_dutch_winner(bid)
                 if bid:
-                    result = utils.prepare_results_stage(**bid)
+                    result = utils.prepare_results_stage(
+                        labels=self.bidder_labels, **bid
+                    )
                     self.auction_document['stages'][current_stage].update(
                         result
                     )
@@ -331,10 +419,12 @@ class DutchAuctionPhase(object):
             '---------------- End dutch phase ----------------',
         )
         self.audit['timeline'][DUTCH]['timeline']['end']\
-            = datetime.now(tzlocal()).isoformat()
+            = self.clock.isoformat()
+        self.journal.set(('timeline', DUTCH, 'timeline', 'end'),
+                         self.audit['timeline'][DUTCH]['timeline']['end'])
         stage_index = self.auction_document['current_stage']
 
-        if self.auction_document['stages'][stage_index]['type'].startswith('dutch'):
+        if self.timeline.kinds[stage_index] == DUTCH:
             self.auction_document['stages'][stage_index].update({
                 'passed': True
             })
@@ -345,10 +435,9 @@ class DutchAuctionPhase(object):
             self.end_auction()
             return
         self.auction_document['current_phase'] = PRESEALEDBID
-        for index, stage in enumerate(self.auction_document['stages']):
-            if stage['type'] == 'pre-sealedbid':
-                self.auction_document['current_stage'] = index
-                break
+        self.auction_document['current_stage'] = \
+            self.timeline.index(PRESEALEDBID)
+        self.update_bid_validator()
 
 
 class SealedBidAuctionPhase(object):
@@ -358,8 +447,9 @@ class SealedBidAuctionPhase(object):
         while True:
             if self.bids_queue.empty() and self._end_sealedbid.is_set():
                 break
-            bid = self.bids_queue.get()
-            if bid:
+            # coalesced bids of a bidder come together, all of them are
+            # recorded, the last one decides
+            for bid in self.bids_queue.get_bids():
                 LOGGER.info(
                     "Adding bid {bidder_id} with value {amount}"
                     " on {time}".format(**bid)
@@ -369,32 +459,32 @@ class SealedBidAuctionPhase(object):
                         "Bid {bidder_id} marked for cancellation"
                         " on {time}".format(**bid)
                     )
-                for lst in [
-                    self._bids_data[bid['bidder_id']],
-                    self.audit['timeline'][SEALEDBID]['bids']
-                ]:
-                    lst.append(bid)
-            sleep(0.1)
+                bid = self._bids_data.add(bid)
+                self.audit['timeline'][SEALEDBID]['bids'].append(bid)
+                self.journal.bid(SEALEDBID, bid)
         LOGGER.info("Bids queue done. Breaking worker")
 
     def switch_to_sealedbid(self, stage):
         with utils.lock_bids(self), utils.update_auction_document(self):
             self._end_sealedbid = Event()
-            run_time = utils.update_stage(self)
             self.auction_document['current_phase'] = SEALEDBID
+            run_time = utils.update_stage(self)
             self.get_auction_info()
             self.audit['timeline'][SEALEDBID]['timeline']['start'] =\
                 run_time
+            self.journal.mapping(self.mapping)
+            self.journal.set(
+                ('timeline', SEALEDBID, 'timeline', 'start'), run_time
+            )
             spawn(self.add_bid)
             LOGGER.info("Swithed auction to {} phase".format(SEALEDBID))
 
     def approve_audit_info_on_sealedbid(self, run_time):
         self.audit['timeline'][SEALEDBID]['timeline']['end']\
             = run_time
+        self.journal.set(('timeline', SEALEDBID, 'timeline', 'end'), run_time)
 
     def end_sealedbid(self, stage):
-        def get_amount(bid):
-            return bid['amount']
         with utils.update_auction_document(self):
 
             self._end_sealedbid.set()
@@ -405,12 +495,16 @@ class SealedBidAuctionPhase(object):
                 sleep(0.1)
             LOGGER.info("Done processing bids queue")
             self.auction_document['results'] = utils.prepare_auction_results(self, self._bids_data)
-            if len([bid for bid in self.auction_document['results'] if str(bid['amount']) != '-1']) < 2:
+            if self._bids_data.valid_bids_count < 2:
                 LOGGER.info("No bids on sealedbid phase. End auction now!")
                 self.end_auction()
                 return
             # find sealedbid winner in auction_document
-            max_bid = max(self.auction_document['results'], key=get_amount)
+            winner_id = self._bids_data.top()['bidder_id']
+            max_bid = next(
+                result for result in reversed(self.auction_document['results'])
+                if result['bidder_id'] == winner_id
+            )
             LOGGER.info("Approved sealedbid winner {bidder_id} with amount {amount}".format(
                 **max_bid
                 ))
@@ -419,8 +513,8 @@ class SealedBidAuctionPhase(object):
             self.auction_document['stages'][self.auction_document['current_stage']].update(
                 max_bid
             )
-            self.approve_audit_info_on_sealedbid(utils.update_stage(self))
             self.auction_document['current_phase'] = PREBESTBID
+            self.approve_audit_info_on_sealedbid(utils.update_stage(self))
 
 
 class BestBidAuctionPhase(object):
@@ -432,16 +526,15 @@ class BestBidAuctionPhase(object):
                 " on {time}".format(**bid)
             )
             bid['dutch_winner'] = True
-            for lst in [
-                self._bids_data[bid['bidder_id']],
-                self.audit['timeline'][BESTBID]['bids']
-            ]:
-                lst.append(bid)
+            bid = self._bids_data.add(bid)
+            self.audit['timeline'][BESTBID]['bids'].append(bid)
+            self.journal.bid(BESTBID, bid)
             return True
         return False
 
     def approve_audit_info_on_bestbid(self, run_time):
         self.audit['timeline'][BESTBID]['timeline']['end'] = run_time
+        self.journal.set(('timeline', BESTBID, 'timeline', 'end'), run_time)
 
     def add_bestbid(self, bid):
         try:
@@ -463,7 +556,11 @@ class BestBidAuctionPhase(object):
     def switch_to_bestbid(self, stage):
         with utils.lock_bids(self), utils.update_auction_document(self):
             self.auction_document['current_phase'] = BESTBID
-            self.audit['timeline'][BESTBID]['timeline']['start'] = utils.update_stage(self)
+            run_time = utils.update_stage(self)
+            self.audit['timeline'][BESTBID]['timeline']['start'] = run_time
+            self.journal.set(
+                ('timeline', BESTBID, 'timeline', 'start'), run_time
+            )
 
     def end_bestbid(self, stage):
         with utils.update_auction_document(self):
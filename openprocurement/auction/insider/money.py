@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+
+
+CENTS_IN_UNIT = 100
+CANCEL_BID_CENTS = -100
+PLACES = 2
+_CENTS_QUANTUM = Decimal('1')
+INVALID_AMOUNT = "Invalid amount: {}"
+
+
+def to_cents(amount):
+    """
+    Convert amount (Money, int, Decimal, str or float) to integer cents.
+    Fractions of a cent are rounded half up, the same as the bid form
+    field does.
+
+    >>> to_cents('35000.10')
+    3500010
+    >>> to_cents(Decimal('-1'))
+    -100
+    >>> to_cents('35000.005')
+    3500001
+    """
+    return _to_cents_places(amount)[0]
+
+
+def _to_cents_places(amount):
+    """ Integer cents and the number of decimal places (up to 2) of amount """
+    if isinstance(amount, Money):
+        return amount.cents, amount.places
+    if isinstance(amount, (int, long)):
+        return amount * CENTS_IN_UNIT, 0
+    amount = str(amount)
+    parsed = _parse_cents(amount)
+    if parsed is not None:
+        return parsed
+    try:
+        value = Decimal(amount)
+        cents = (value * CENTS_IN_UNIT).quantize(_CENTS_QUANTUM,
+                                                 rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(INVALID_AMOUNT.format(amount))
+    if not value.is_finite():
+        raise ValueError(INVALID_AMOUNT.format(amount))
+    return int(cents), min(max(-value.as_tuple().exponent, 0), PLACES)
+
+
+def _parse_cents(amount):
+    """
+    Integer parsing of plain fixed-point strings, which is much cheaper
+    than Decimal arithmetic. Returns None for anything else (exponent,
+    whitespace, NaN...), those are handled by Decimal.
+    """
+    sign = 1
+    if amount[:1] == '-':
+        sign = -1
+        amount = amount[1:]
+    units, _, fraction = amount.partition('.')
+    if not units.isdigit() or fraction and not fraction.isdigit():
+        return None
+    cents = int(units) * CENTS_IN_UNIT + int((fraction + '00')[:2])
+    if fraction[2:3] >= '5':
+        # half up, away from zero as the sign is applied afterwards
+        cents += 1
+    return sign * cents, min(len(fraction), PLACES)
+
+
+def from_cents(cents):
+    """
+    Decimal with two decimal places
+
+    >>> from_cents(3500001)
+    Decimal('35000.01')
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents, places=PLACES):
+    """
+    String representation used on API, CouchDB and audit boundaries,
+    the same as str() of the Decimal amount with that many decimal places.
+
+    >>> format_cents(3500000)
+    '35000.00'
+    >>> format_cents(-100, 0)
+    '-1'
+    """
+    return str(from_cents(cents).quantize(_CENTS_QUANTUM.scaleb(-places)))
+
+
+@total_ordering
+class Money(object):
+    """
+    Immutable amount stored as integer cents. Amounts keep the number of
+    decimal places they were given with, so they are rendered the same
+    as the Decimal amounts were: '35000.00', '0.1' or '-1'.
+    """
+    __slots__ = ('cents', 'currency', 'places')
+
+    def __init__(self, cents, currency=None, places=PLACES):
+        self.cents = cents
+        self.currency = currency
+        self.places = places
+
+    @classmethod
+    def from_amount(cls, amount, currency=None):
+        cents, places = _to_cents_places(amount)
+        return cls(cents, currency, places)
+
+    def to_decimal(self):
+        return from_cents(self.cents).quantize(
+            _CENTS_QUANTUM.scaleb(-self.places)
+        )
+
+    def for_json(self):
+        return self.to_decimal()
+
+    def __str__(self):
+        return format_cents(self.cents, self.places)
+
+    def __repr__(self):
+        return "Money('{}', {!r})".format(self, self.currency)
+
+    def __nonzero__(self):
+        return self.cents != 0
+
+    def __hash__(self):
+        # same as hash of the equal int or Decimal
+        if self.cents % CENTS_IN_UNIT == 0:
+            return hash(self.cents // CENTS_IN_UNIT)
+        return hash(from_cents(self.cents))
+
+    def _operands(self, other):
+        # Decimals are compared exactly, fractions of a cent included;
+        # floats are not compared, their hash can't match the Decimal one
+        if isinstance(other, Money):
+            return self.cents, other.cents
+        if isinstance(other, (int, long)):
+            return self.cents, other * CENTS_IN_UNIT
+        if isinstance(other, Decimal):
+            return from_cents(self.cents), other
+        return None
+
+    def __eq__(self, other):
+        operands = self._operands(other)
+        if operands is None:
+            return NotImplemented
+        return operands[0] == operands[1]
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __lt__(self, other):
+        operands = self._operands(other)
+        if operands is None:
+            # total_ordering derives the other comparisons from __lt__
+            # and can't pass NotImplemented on
+            raise TypeError("unorderable types: Money() < {}()".format(
+                type(other).__name__
+            ))
+        return operands[0] < operands[1]
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
@@ -4,19 +4,49 @@ from datetime import datetime
 from time import mktime, time
 
 from openprocurement.auction.core import Planning
-from openprocurement.auction.design import startDate_view, endDate_view
 from openprocurement.auction.systemd_msgs_ids import \
     DATA_BRIDGE_PLANNING_TENDER_ALREADY_PLANNED as ALREADY_PLANNED,\
     DATA_BRIDGE_PLANNING_TENDER_SKIP
 
+from openprocurement.auction.insider.design import planned_auctions
+
 
 LOGGER = logging.getLogger('Openprocurement Auction')
 
+PLANNING_STATUSES = ("active.tendering", "active.auction")
+
+
+def start_date_key(start_date):
+    """ Key of the auction start date in startDate_view (ms) """
+    return (mktime(start_date.timetuple()) +
+            start_date.microsecond / 1E6) * 1000
+
 
 class InsiderPlanning(Planning):
 
     def __iter__(self):
-        if self.item['status'] in ["active.tendering", "active.auction"]:
+        planned = None
+        if self.needs_lookup():
+            planned = planned_auctions(
+                self.bridge.db, [self.item['id']]
+            ).get(self.item['id'])
+        for command in self.commands(planned):
+            yield command
+
+    def needs_lookup(self):
+        """ Whether planning of the item depends on the auctions database """
+        if self.item['status'] == "cancelled":
+            return True
+        period = self.item.get('auctionPeriod', {})
+        return self.item['status'] in PLANNING_STATUSES and \
+            'startDate' in period and 'endDate' not in period
+
+    def commands(self, planned):
+        """
+        Planning commands for the feed item. `planned` is (start, end) of
+        the auction document in ms, or None when it is not planned yet.
+        """
+        if self.item['status'] in PLANNING_STATUSES:
             if 'auctionPeriod' in self.item \
                     and 'startDate' in self.item['auctionPeriod'] \
                     and 'endDate' not in self.item['auctionPeriod']:
@@ -24,11 +54,6 @@ class InsiderPlanning(Planning):
                 start_date = iso8601.parse_date(
                     self.item['auctionPeriod']['startDate'])
                 start_date = start_date.astimezone(self.bridge.tz)
-                auctions_start_in_date = startDate_view(
-                    self.bridge.db,
-                    key=(mktime(start_date.timetuple()) +
-                         start_date.microsecond / 1E6) * 1000
-                )
                 if datetime.now(self.bridge.tz) > start_date:
                     LOGGER.info(
                         "Auction {} start date in past. "
@@ -38,9 +63,8 @@ class InsiderPlanning(Planning):
                         }
                     )
                     raise StopIteration
-                elif not self.bridge.re_planning and \
-                        [row.id for row in auctions_start_in_date.rows
-                         if row.id == self.item['id']]:
+                elif not self.bridge.re_planning and planned and \
+                        planned[0] == start_date_key(start_date):
                     LOGGER.info(
                         "Auction {} already planned on same date".format(self.item['id']),
                         extra={
@@ -50,10 +74,7 @@ class InsiderPlanning(Planning):
                     raise StopIteration
                 yield ("planning", str(self.item['id']), "")
         if self.item['status'] == "cancelled":
-            future_auctions = endDate_view(
-                self.bridge.db, startkey=time() * 1000
-            )
-            if self.item["id"] in [i.id for i in future_auctions]:
+            if planned and planned[1] >= time() * 1000:
                 LOGGER.info('Auction {0} selected for cancellation'.format(
                     self.item['id']))
                 yield ('cancel', self.item['id'], "")
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand diagnostics of a running worker.
+
+SamplingProfiler reads the frame of the worker thread from a native thread
+every few milliseconds, so it sees whatever greenlet (or the hub) holds the
+CPU without tracing every call. greenlet_stacks dumps the stacks of all
+greenlets and memory_report counts live objects and measures the big
+structures of the auction. Python 2 has no tracemalloc, top allocations
+are reported only where it is available and tracing.
+"""
+import gc
+import sys
+import types
+import traceback
+
+from collections import Counter, deque
+
+from gevent import monkey
+from greenlet import greenlet, getcurrent
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+
+PROFILE_SECONDS = 10
+PROFILE_MAX_SECONDS = 120
+PROFILE_INTERVAL = 0.005
+PROFILE_DEPTH = 64
+REPORT_LIMIT = 20
+
+# native thread and sleep even when the worker is monkey patched
+start_new_thread = monkey.get_original('thread', 'start_new_thread')
+get_ident = monkey.get_original('thread', 'get_ident')
+native_sleep = monkey.get_original('time', 'sleep')
+native_time = monkey.get_original('time', 'time')
+
+OPAQUE = (type, types.ModuleType, types.FunctionType, types.MethodType,
+          types.BuiltinFunctionType, types.FrameType, types.CodeType)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return '{} ({}:{})'.format(code.co_name, code.co_filename,
+                               code.co_firstlineno)
+
+
+def collapse(frame, depth=PROFILE_DEPTH):
+    """ Stack of the frame as 'outer;...;inner' labels """
+    labels = []
+    while frame is not None and len(labels) < depth:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler(object):
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else get_ident()
+        self.samples = Counter()
+        self.total = 0
+        self.started = None
+        self.deadline = None
+        self.running = False
+
+    def start(self, seconds=PROFILE_SECONDS):
+        self.started = native_time()
+        self.deadline = self.started + min(seconds, PROFILE_MAX_SECONDS)
+        self.running = True
+        start_new_thread(self._sample, ())
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            self.samples[collapse(frame)] += 1
+            self.total += 1
+
+    def _sample(self):
+        try:
+            while self.running and native_time() < self.deadline:
+                self.sample()
+                native_sleep(self.interval)
+        finally:
+            self.running = False
+
+    def report(self, limit=REPORT_LIMIT):
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in self.samples.items():
+            labels = stack.split(';')
+            own[labels[-1]] += count
+            for label in set(labels):
+                cumulative[label] += count
+        return {
+            'running': self.running,
+            'started': self.started,
+            'interval': self.interval,
+            'samples': self.total,
+            'own': own.most_common(limit),
+            'cumulative': cumulative.most_common(limit),
+            'stacks': self.samples.most_common(limit),
+        }
+
+
+def greenlet_stacks():
+    """ Formatted stack of every live greenlet """
+    current = getcurrent()
+    stacks = []
+    for obj in gc.get_objects():
+        if not isinstance(obj, greenlet) or obj.dead:
+            continue
+        frame = sys._getframe() if obj is current else obj.gr_frame
+        if frame is None:
+            continue
+        stacks.append({
+            'greenlet': repr(obj),
+            'stack': traceback.format_stack(frame),
+        })
+    return stacks
+
+
+def deep_size(obj):
+    """
+    Bytes held by the object and everything it refers to,
+    classes, modules and functions are not followed
+
+    >>> deep_size([]) == sys.getsizeof([])
+    True
+    >>> item = 'x' * 100
+    >>> deep_size([item, item]) == sys.getsizeof([0, 0]) + sys.getsizeof(item)
+    True
+    """
+    seen = set()
+    pending = [obj]
+    size = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, OPAQUE):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            pending.extend(obj)
+        if hasattr(obj, '__dict__'):
+            pending.append(obj.__dict__)
+        slots = getattr(type(obj), '__slots__', ())
+        if isinstance(slots, basestring):
+            slots = (slots,)
+        for slot in slots:
+            if hasattr(obj, slot):
+                pending.append(getattr(obj, slot))
+    return size
+
+
+def object_counts(limit=REPORT_LIMIT):
+    """ Most common types among the objects tracked by gc """
+    return Counter(
+        type(obj).__name__ for obj in gc.get_objects()
+    ).most_common(limit)
+
+
+def top_allocations(limit=REPORT_LIMIT):
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+    statistics = tracemalloc.take_snapshot().statistics('lineno')
+    return [(str(stat.traceback), stat.size, stat.count)
+            for stat in statistics[:limit]]
+
+
+def memory_report(auction, app, limit=REPORT_LIMIT):
+    channels = [
+        channel
+        for bidder_data in app.auction_bidders.values()
+        for channel in bidder_data['channels'].values()
+    ]
+    return {
+        'objects': object_counts(limit),
+        'allocations': top_allocations(limit),
+        'sizes': {
+            'auction_document': deep_size(auction.auction_document),
+            '_bids_data': deep_size(auction._bids_data),
+            'audit': deep_size(auction.audit),
+            'logins_cache': deep_size(app.logins_cache),
+        },
+        'lengths': {
+            '_bids_data': len(auction._bids_data),
+            'logins_cache': len(app.logins_cache),
+            'sse_channels': len(channels),
+            'sse_queued': sum(channel.qsize() for channel in channels),
+        },
+    }
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+The auction document as the worker serves it to frontends.
+
+Every save of the auction document publishes it here, tagged with its
+revision and a sequence number of the worker. The document is serialized
+on the first GET /auction after a change and the body is kept until the
+next one, so polling clients are answered from memory with the ready body
+or 304 Not Modified, without reads from CouchDB, and saves nobody reads
+are not serialized at all.
+"""
+
+
+class PublishedDocument(object):
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.sequence = 0
+        self.document = None
+        self.etag = None
+        self._body = None
+
+    def update(self, document):
+        """ Publish the document, it must not be changed afterwards """
+        self.sequence += 1
+        self.document = document
+        self.etag = '{}-{}'.format(document.get('_rev', ''), self.sequence)
+        self._body = None
+
+    @property
+    def body(self):
+        if self._body is None and self.document is not None:
+            self._body = self.codec.dumps(self.document)
+        return self._body
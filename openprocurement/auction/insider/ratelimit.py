@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Token bucket rate limits of bidder requests.
+
+Every (endpoint, phase, bidder, client) has a bucket of `burst` tokens
+refilled at `rate` tokens per second; a request takes one token or is
+refused. Budgets depend on the endpoint and the current phase: bids are
+let through generously in dutch, where the first click wins, SSE
+reconnects are limited tighter. The check uses the signed session only,
+so a refused request costs no OAuth lookup, form parsing or logging.
+"""
+from collections import Counter
+from time import time
+
+from openprocurement.auction.insider.constants import DUTCH
+
+
+POSTBID = 'postbid'
+EVENT_SOURCE = 'event_source'
+DEFAULT = 'default'
+
+# endpoint: {phase: (rate per second, burst)}
+RATE_LIMITS = {
+    POSTBID: {DEFAULT: (1.0, 5), DUTCH: (5.0, 20)},
+    EVENT_SOURCE: {DEFAULT: (0.2, 3)},
+}
+
+
+class RateLimiter(object):
+
+    def __init__(self, limits=RATE_LIMITS, clock=time):
+        self.limits = limits
+        self.clock = clock
+        self.buckets = {}
+        self.allowed = Counter()
+        self.rejected = Counter()
+
+    @classmethod
+    def from_config(cls, worker_defaults):
+        """
+        None when disabled with `rate_limits: {enabled: false}`, budgets
+        given in the config replace the default ones of the same phase
+        """
+        config = worker_defaults.get('rate_limits', {})
+        if not config.get('enabled', True):
+            return None
+        limits = {}
+        for endpoint, budgets in RATE_LIMITS.items():
+            limits[endpoint] = dict(budgets)
+            for phase, budget in config.get(endpoint, {}).items():
+                limits[endpoint][phase] = tuple(budget)
+        return cls(limits)
+
+    def budget(self, endpoint, phase):
+        budgets = self.limits[endpoint]
+        return budgets.get(phase, budgets[DEFAULT])
+
+    def take(self, endpoint, phase, *key):
+        """
+        Take a token of the bucket, returns 0 when the request is allowed
+        or seconds to wait for the next token
+
+        >>> clock = [0.0]
+        >>> limiter = RateLimiter({'postbid': {'default': (1.0, 2)}},
+        ...                       clock=lambda: clock[0])
+        >>> [limiter.take('postbid', None, 'bidder') for _ in range(3)]
+        [0, 0, 1.0]
+        >>> clock[0] += 0.5
+        >>> limiter.take('postbid', None, 'bidder')
+        0.5
+        >>> limiter.take('postbid', None, 'other')
+        0
+        """
+        rate, burst = self.budget(endpoint, phase)
+        now = self.clock()
+        bucket = (endpoint, phase) + key
+        tokens, updated = self.buckets.get(bucket, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[bucket] = (tokens, now)
+            self.rejected[endpoint] += 1
+            return (1 - tokens) / rate
+        self.buckets[bucket] = (tokens - 1, now)
+        self.allowed[endpoint] += 1
+        return 0
+
+    def metrics(self):
+        return {
+            'allowed': dict(self.allowed),
+            'rejected': dict(self.rejected),
+            'buckets': len(self.buckets),
+        }
+
+
+def check_rate_limit(app, session, endpoint):
+    """ RateLimiter.take for the bidder client of the session """
+    if app.rate_limiter is None or 'client_id' not in session:
+        return 0
+    phase = (app.config['auction'].snapshot or {}).get('current_phase')
+    return app.rate_limiter.take(endpoint, phase,
+                                 session.get('login_bidder_id'),
+                                 session['client_id'])
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+
+from openprocurement.auction.insider.money import Money
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+SYNC_EVERY = 16
+
+
+class AuctionJournal(object):
+    """
+    Append-only local journal of accepted bids, audit timeline changes and
+    bidders mapping, one JSON record per line.
+
+    Every record is flushed to the OS at once, so it survives a crash of
+    the worker process. fsync is batched: after SYNC_EVERY bids and on
+    every phase transition. Journal without path is disabled.
+    """
+
+    def __init__(self, path, codec, sync_every=SYNC_EVERY):
+        self.path = path
+        self.codec = codec
+        self.sync_every = sync_every
+        self._file = None
+        self._pending = 0
+
+    @classmethod
+    def for_auction(cls, worker_defaults, auction_doc_id, codec):
+        journal_dir = worker_defaults.get('journal_dir')
+        path = None
+        if journal_dir:
+            path = os.path.join(
+                journal_dir, '{}.journal'.format(auction_doc_id)
+            )
+        return cls(path, codec)
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def open(self, reset=False):
+        """
+        Open journal for appending. Broken tail record left by a crash in
+        the middle of a write is cut off, reset starts an empty journal.
+        """
+        if not self.enabled:
+            return
+        self.close()
+        if reset or not os.path.exists(self.path):
+            self._file = open(self.path, 'wb')
+        else:
+            _, size = self._read()
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(size)
+            self._file.seek(size)
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def write(self, record, sync=False):
+        if self._file is None:
+            return
+        line = self.codec.dumps(record)
+        if isinstance(line, unicode):
+            line = line.encode('utf-8')
+        self._file.write(line + '\n')
+        self._file.flush()
+        self._pending += 1
+        if sync or self._pending >= self.sync_every:
+            self.sync()
+
+    def set(self, path, value):
+        self.write({'op': 'set', 'path': list(path), 'value': value},
+                   sync=True)
+
+    def bid(self, phase, bid):
+        self.write({'op': 'bid', 'phase': phase, 'bid': bid})
+
+    def mapping(self, mapping):
+        self.write({'op': 'mapping', 'value': mapping}, sync=True)
+
+    def _read(self):
+        records = []
+        size = 0
+        if not self.enabled or not os.path.exists(self.path):
+            return records, size
+        with open(self.path, 'rb') as journal:
+            for line in journal:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    records.append(self.codec.loads(line))
+                except ValueError:
+                    break
+                size += len(line)
+        return records, size
+
+    def records(self):
+        """ Complete records of the journal """
+        return self._read()[0]
+
+
+def restore_state(auction, records):
+    """
+    Apply journal records to bids history, audit and mapping of the
+    auction, in the same way phase mixins have done before the crash
+    """
+    currency = auction.auction_document.get('value', {}).get('currency')
+    for record in records:
+        if record['op'] == 'mapping':
+            auction.mapping.update(record['value'])
+        elif record['op'] == 'set':
+            target = auction.audit
+            for key in record['path'][:-1]:
+                target = target.setdefault(key, {})
+            target[record['path'][-1]] = record['value']
+        elif record['op'] == 'bid':
+            bid = dict(record['bid'])
+            if 'amount' in bid:
+                bid['amount'] = Money.from_amount(bid['amount'], currency)
+            auction.audit['timeline'][record['phase']]['bids'].append(
+                auction._bids_data.add(bid)
+            )
+    LOGGER.info("Restored {} journal records".format(len(records)))
@@ -1,6 +1,10 @@
 import os
 import iso8601
 
+from functools import wraps
+from hmac import compare_digest
+from math import ceil
+
 from urlparse import urljoin
 from flask_oauthlib.client import OAuth
 from flask import (
@@ -12,14 +16,17 @@ from flask import (
 from gevent.pywsgi import WSGIServer
 from gevent import spawn
 
-from datetime import datetime
 from pytz import timezone as tz
-from dateutil.tz import tzlocal
 
 from openprocurement.auction.worker.server import _LoggerStream,\
     AuctionsWSGIHandler
-from openprocurement.auction.insider.forms import BidsForm, form_handler
+from openprocurement.auction.insider.access import local_only
+from openprocurement.auction.insider.forms import form_handler
 from openprocurement.auction.insider.constants import INVALIDATE_GRANT
+from openprocurement.auction.insider.ratelimit import RateLimiter,\
+    check_rate_limit, POSTBID
+from openprocurement.auction.insider.profiler import SamplingProfiler,\
+    PROFILE_SECONDS, greenlet_stacks, memory_report
 from openprocurement.auction.helpers.system import get_lisener
 from openprocurement.auction.utils import create_mapping,\
     prepare_extra_journal_fields, get_bidder_id
@@ -35,6 +42,18 @@ app.auction_bidders = {}
 app.register_blueprint(sse)
 app.secret_key = os.urandom(24)
 app.logins_cache = {}
+app.profiler = None
+app.rate_limiter = None
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+
+def json_response(data):
+    """ Encode response body with the auction json codec """
+    return app.response_class(
+        app.config['auction'].codec.dumps(data),
+        mimetype='application/json'
+    )
 
 
 @app.route('/login')
@@ -126,7 +145,7 @@ def check_authorization():
         bidder_data = get_bidder_id(app, session)
         if bidder_data:
             grant_timeout = iso8601.parse_date(bidder_data[u'expires'])\
-                            - datetime.now(tzlocal())
+                            - app.config['auction'].clock.now()
             if grant_timeout > INVALIDATE_GRANT:
                 app.logger.info(
                     "Bidder {} with client_id {}"
@@ -171,11 +190,18 @@ def logout():
 
 @app.route('/postbid', methods=['POST'])
 def post_bid():
+    retry_after = check_rate_limit(app, session, POSTBID)
+    if retry_after:
+        response = json_response({'status': 'failed',
+                                  'errors': [['Too many requests']]})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(int(ceil(retry_after)))
+        return response
     if 'remote_oauth' in session and 'client_id' in session:
         bidder_data = get_bidder_id(app, session)
         if bidder_data and bidder_data['bidder_id']\
            == request.json['bidder_id']:
-            return jsonify(app.form_handler())
+            return json_response(app.form_handler())
         else:
             app.logger.warning(
                 "Client with client id: {} and bidder_id {}"
@@ -205,11 +231,119 @@ def kickclient():
     abort(401)
 
 
+def admin_only(view):
+    """
+    Admin endpoints also need the admin token of the worker in the
+    X-Admin-Token header: requests of the shared proxy come from the
+    worker host too.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config.get('admin_token')
+        if not token or not compare_digest(
+                str(request.headers.get(ADMIN_TOKEN_HEADER, '')), str(token)):
+            abort(403)
+        return view(*args, **kwargs)
+    return local_only(wrapper)
+
+
+def prepare_admin_token(auction):
+    """
+    Admin token from the worker config. Without one a random token is
+    made and written to <auction_doc_id>.admin in journal_dir, readable
+    by the worker user only.
+    """
+    token = auction.worker_defaults.get('admin_token')
+    if token:
+        return token
+    token = os.urandom(16).encode('hex')
+    token_dir = auction.worker_defaults.get('journal_dir')
+    if token_dir:
+        path = os.path.join(token_dir,
+                            '{}.admin'.format(auction.auction_doc_id))
+        with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                               0o600), 'w') as token_file:
+            token_file.write(token)
+    return token
+
+
+@app.route('/health')
+@local_only
+def health():
+    auction = app.config['auction']
+    rate_limits = app.rate_limiter.metrics() \
+        if app.rate_limiter is not None else {}
+    return json_response({'db': auction.db_metrics(),
+                          'hub': auction.hub_metrics(),
+                          'rate_limits': rate_limits,
+                          'bids_queue': auction.bids_queue.metrics()})
+
+
+@app.route('/auction')
+def auction_document():
+    """ Public auction document from memory, 304 when it is not changed """
+    published = app.config['auction'].published
+    if published.etag is None:
+        abort(404)
+    if request.if_none_match.contains(published.etag):
+        # not modified, the body is not serialized for it
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(published.body,
+                                      mimetype='application/json')
+    response.set_etag(published.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@admin_only
+def admin_profile():
+    """
+    POST starts sampling for ?seconds=N, DELETE stops it,
+    GET returns what is sampled so far
+    """
+    if request.method == 'POST':
+        if app.profiler is not None and app.profiler.running:
+            return json_response({'status': 'running'}), 409
+        try:
+            seconds = float(request.args.get('seconds', PROFILE_SECONDS))
+        except ValueError:
+            abort(400)
+        app.profiler = SamplingProfiler().start(seconds)
+        return json_response({'status': 'started'}), 202
+    if app.profiler is None:
+        abort(404)
+    if request.method == 'DELETE':
+        app.profiler.stop()
+    return json_response(app.profiler.report())
+
+
+@app.route('/admin/stacks')
+@admin_only
+def admin_stacks():
+    return json_response({'greenlets': greenlet_stacks()})
+
+
+@app.route('/admin/memory')
+@admin_only
+def admin_memory():
+    return json_response(memory_report(app.config['auction'], app))
+
+
+def close_event_sources():
+    """ Ask every SSE stream of the worker to finish """
+    with app.app_context():
+        for bidder, bidder_data in app.auction_bidders.items():
+            for client_id in bidder_data['channels'].keys():
+                send_event_to_client(bidder, client_id, '', event='StopSSE')
+
+
 def run_server(auction,
                mapping_expire_time,
                logger,
                timezone='Europe/Kiev',
-               bids_form=BidsForm,
+               bids_form=None,
                form_handler=form_handler,
                cookie_path='insider-auctions'):
     app.config.update(auction.worker_defaults)
@@ -227,6 +361,8 @@ def run_server(auction,
     app.oauth = OAuth(app)
     app.bids_form = bids_form
     app.form_handler = form_handler
+    app.rate_limiter = RateLimiter.from_config(auction.worker_defaults)
+    app.config['admin_token'] = prepare_admin_token(auction)
     app.remote_oauth = app.oauth.remote_app(
         'remote',
         consumer_key=app.config['OAUTH_CLIENT_ID'],
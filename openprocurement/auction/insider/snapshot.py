@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Immutable snapshots of the auction document.
+
+Phase methods update the live auction document in place under the bids
+lock. Every stage switch and every save takes a snapshot of it: a
+read-only copy which shares with the previous snapshot every value that
+did not change, so only changed stages, results and fields are copied.
+Readers (the bid validator, /event_source, rate limits) take the current
+snapshot without the lock, and the saved document is a shallow copy of
+the snapshot instead of a deep copy of the live document.
+"""
+from copy import deepcopy
+from decimal import Decimal
+
+from openprocurement.auction.insider.money import Money
+
+
+IMMUTABLE = (str, unicode, int, long, bool, float, type(None), Decimal, Money)
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError('{} is read-only'.format(type(self).__name__))
+
+
+class FrozenDict(dict):
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = \
+        update = _readonly
+
+    def __deepcopy__(self, memo):
+        return dict((key, deepcopy(value, memo))
+                    for key, value in self.iteritems())
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = \
+        __imul__ = append = extend = insert = pop = remove = reverse = \
+        sort = _readonly
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value):
+    """
+    Read-only copy of the value
+
+    >>> frozen = freeze({'stages': [{'type': 'pause'}]})
+    >>> frozen['stages'][0]['type'] = 'dutch_1'
+    Traceback (most recent call last):
+    ...
+    TypeError: FrozenDict is read-only
+    """
+    if isinstance(value, (FrozenDict, FrozenList)) or \
+            type(value) in IMMUTABLE:
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item))
+                          for key, item in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(item) for item in value)
+    return deepcopy(value)
+
+
+def _share(value, previous):
+    """ `previous` when it is equal to the value, the frozen value if not """
+    if type(value) in IMMUTABLE:
+        return value
+    if isinstance(value, list) and isinstance(previous, FrozenList):
+        return FrozenList(
+            previous[index] if index < len(previous) and
+            previous[index] == item else freeze(item)
+            for index, item in enumerate(value)
+        )
+    if previous is not None and previous == value:
+        return previous
+    return freeze(value)
+
+
+def snapshot(document, previous=None):
+    """
+    Frozen copy of the document which shares unchanged values,
+    list items included, with the previous snapshot
+
+    >>> first = snapshot({'stages': [{'type': 'pause'}, {'type': 'dutch_1'}]})
+    >>> second = snapshot({'stages': [{'type': 'pause'}, {'type': 'dutch_1',
+    ...                                                   'passed': True}]},
+    ...                   first)
+    >>> second['stages'][0] is first['stages'][0]
+    True
+    >>> second['stages'][1] is first['stages'][1]
+    False
+    """
+    previous = previous or {}
+    return FrozenDict(
+        (key, _share(value, previous.get(key)))
+        for key, value in document.iteritems()
+    )
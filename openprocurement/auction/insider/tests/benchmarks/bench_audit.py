@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of audit upload at the end of the auction: deepcopy normalization
+followed by yaml.safe_dump against copying only bids and dutch turns.
+Peak memory is measured in forked children.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_audit
+"""
+import os
+import resource
+import timeit
+
+from copy import deepcopy
+from decimal import Decimal
+
+import yaml
+
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.utils import normalize_audit
+
+
+TURNS = 81
+BIDDERS = 200
+REBIDS = 5
+ROUNDS = 20
+
+
+def make_audit():
+    bids_data = BidsData()
+    timeline = {
+        'dutch': {'bids': []}, 'sealedbid': {'bids': []},
+        'bestbid': {'bids': []}
+    }
+    for turn in range(1, TURNS + 1):
+        timeline['dutch']['turn_{}'.format(turn)] = {
+            'amount': Decimal(35000 - turn * 350),
+            'time': '2017-01-01T00:00:00+02:00'
+        }
+    for index in range(BIDDERS * REBIDS):
+        timeline['sealedbid']['bids'].append(bids_data.add({
+            'bidder_id': '{:032x}'.format(index % BIDDERS),
+            'amount': Decimal(35000 + index),
+            'time': '2017-01-01T00:00:00+02:00'
+        }))
+    return {'id': 'audit', 'results': {'bids': bids_data.latest_bids()},
+            'timeline': timeline}
+
+
+def legacy_normalize(audit):
+    """ normalize_audit before user-031 """
+    def normalize_bid(bid):
+        bid = bid.to_dict()
+        bid['amount'] = str(bid['amount'])
+        return bid
+
+    deepcopy(audit)
+    audit['results']['bids'] = map(normalize_bid, audit['results']['bids'])
+    for phase in ['dutch', 'sealedbid', 'bestbid']:
+        audit['timeline'][phase]['bids'] = map(
+            normalize_bid, audit['timeline'][phase]['bids']
+        )
+    for key in audit['timeline']['dutch'].keys():
+        if key.startswith('turn'):
+            audit['timeline']['dutch'][key]['amount'] = str(
+                audit['timeline']['dutch'][key]['amount']
+            )
+    return audit
+
+
+def legacy(audit):
+    return yaml.safe_dump(legacy_normalize(audit))
+
+
+def current(audit):
+    return yaml.safe_dump(normalize_audit(audit))
+
+
+def cpu_time(func):
+    # legacy path changes the audit, so every round gets a fresh one
+    timings = []
+    for _ in range(ROUNDS):
+        audit = make_audit()
+        timings.append(timeit.timeit(lambda: func(audit), number=1))
+    return min(timings)
+
+
+def peak_rss(func):
+    """ Growth of peak RSS (KB) of a forked child running func """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        audit = make_audit()
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        func(audit)
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(write_end, str(after - before))
+        os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 64)
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    return int(result)
+
+
+def main():
+    assert yaml.safe_load(legacy(make_audit())) == \
+        yaml.safe_load(current(make_audit()))
+    for name, func in [('deepcopy', legacy), ('bids copy', current)]:
+        cpu = cpu_time(func)
+        print('{:10} {:8.2f} ms  peak +{} KB'.format(
+            name, cpu * 1000, peak_rss(func)))
+
+
+if __name__ == '__main__':
+    main()
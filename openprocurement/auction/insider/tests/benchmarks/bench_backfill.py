@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Audit backfill of 300 finished auctions against stand-ins of CouchDB (2 ms
+round trips) and of the audit upload (50 ms): post_audit one auction after
+another, as prepare_audit does in a process per auction, against Backfill
+with pages of 100 and 10 uploads at once, in one process and in 4 forked
+shard processes. Process startup is left out, see bench_startup for it.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_backfill
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import logging  # noqa
+import os  # noqa
+import shutil  # noqa
+import tempfile  # noqa
+import time  # noqa
+
+import yaml  # noqa
+
+from couchdb.client import Row  # noqa
+
+from openprocurement.auction.insider.auction import Auction  # noqa
+from openprocurement.auction.insider.backfill import Backfill,\
+    Checkpoint  # noqa
+
+
+AUCTIONS = 300
+BIDDERS = 20
+ROUND_TRIP = 0.002
+UPLOAD = 0.05
+PROCESSES = 4
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'data',
+                      'auction_worker_insider.yaml')
+
+
+def make_document(doc_id):
+    stages = [{'type': 'pause', 'start': '2018-05-10T10:00:00+03:00'}]
+    for turn in range(1, 81):
+        stages.append({'type': 'dutch_{}'.format(turn),
+                       'start': '2018-05-10T10:05:00+03:00',
+                       'time': '2018-05-10T10:05:00+03:00',
+                       'amount': 35000 - turn * 350})
+    stages.append({'type': 'pre-sealedbid',
+                   'time': '2018-05-10T11:00:00+03:00'})
+    stages.append({'type': 'announcement',
+                   'time': '2018-05-10T12:00:00+03:00'})
+    results = [{'bidder_id': '{:032x}'.format(index), 'amount': 30000 + index,
+                'time': '2018-05-10T11:10:00+03:00'}
+               for index in range(BIDDERS)]
+    return {'_id': doc_id, 'auction_type': 'dutch', 'stages': stages,
+            'current_stage': len(stages) - 1, 'results': results,
+            'endDate': '2018-05-10T12:00:00+03:00'}
+
+
+class RemoteCouchDB(object):
+
+    def __init__(self, doc_ids):
+        self.documents = dict((doc_id, make_document(doc_id))
+                              for doc_id in doc_ids)
+
+    def get(self, doc_id):
+        time.sleep(ROUND_TRIP)
+        return self.documents[doc_id]
+
+    def view(self, name, keys=None, include_docs=False, limit=None,
+             startkey=None):
+        time.sleep(ROUND_TRIP)
+        if keys is not None:
+            return [Row(id=key, key=key, doc=self.documents[key])
+                    for key in keys]
+        doc_ids = [doc_id for doc_id in sorted(self.documents)
+                   if startkey is None or doc_id >= startkey][:limit]
+        return [Row(id=doc_id, key=doc_id) for doc_id in doc_ids]
+
+
+def upload(auction, doc_id=None):
+    time.sleep(UPLOAD)
+
+
+def one_by_one(db, worker_defaults, directory):
+    for doc_id in sorted(db.documents):
+        auction = Auction(doc_id, worker_defaults=worker_defaults)
+        auction.post_audit(db.get(doc_id))
+
+
+def backfill(db, worker_defaults, directory):
+    checkpoint = Checkpoint(os.path.join(directory, 'backfill.json'))
+    Backfill(worker_defaults, checkpoint, db=db, rate=0).run()
+
+
+def sharded(db, worker_defaults, directory):
+    children = []
+    for index in range(PROCESSES):
+        pid = os.fork()
+        if pid == 0:
+            checkpoint = Checkpoint(
+                os.path.join(directory, 'backfill.{}'.format(index)))
+            Backfill(worker_defaults, checkpoint, db=db, rate=0,
+                     shard=(index, PROCESSES)).run()
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def main():
+    logging.disable(logging.ERROR)
+    Auction.upload_audit_file_without_document_service = upload
+    with open(CONFIG) as stream:
+        worker_defaults = yaml.safe_load(stream)
+    doc_ids = ['{:032x}'.format(index) for index in range(AUCTIONS)]
+    directory = tempfile.mkdtemp()
+    try:
+        for name, func in [('one by one', one_by_one),
+                           ('backfill', backfill),
+                           ('4 shards', sharded)]:
+            db = RemoteCouchDB(doc_ids)
+            started = time.time()
+            func(db, worker_defaults, directory)
+            print('{:10} {:8.2f} s'.format(name, time.time() - started))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
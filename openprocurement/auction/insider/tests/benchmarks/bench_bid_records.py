@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Memory used by bids of a sealedbid phase with many re-bids: a dict per bid
+stored in _bids_data and the audit against one shared Bid record.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_bid_records
+"""
+import gc
+import sys
+
+from decimal import Decimal
+
+from openprocurement.auction.insider.bids import Bid
+
+
+BIDDERS = 1000
+REBIDS = 20
+
+
+def sizeof(objects):
+    seen = set()
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (dict, Bid)):
+            stack.extend(obj.values() if isinstance(obj, dict)
+                         else obj.to_dict().values())
+    return total
+
+
+def bids():
+    for index in range(BIDDERS * REBIDS):
+        yield {'bidder_id': '{:032x}'.format(index % BIDDERS),
+               'amount': Decimal(35000 + index),
+               'time': '2017-01-01T00:00:{:02}+02:00'.format(index % 60)}
+
+
+def main():
+    gc.collect()
+    dicts = list(bids())
+    # dict in history and a copy in audit, as approve_dutch_winner and
+    # prepare_auction_results did with deepcopy
+    legacy = sizeof(dicts) + sizeof([dict(bid) for bid in dicts])
+    records = [Bid.from_dict(bid) for bid in bids()]
+    shared = sizeof(records)
+    print('{} bids'.format(len(dicts)))
+    print('dicts:   {:10} bytes'.format(legacy))
+    print('records: {:10} bytes'.format(shared))
+
+
+if __name__ == '__main__':
+    main()
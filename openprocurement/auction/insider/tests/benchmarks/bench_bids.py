@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+End of sealedbid phase results at 10k bidders: latest bid lookup in the
+history of every bidder with full sort against the live leaderboard.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_bids
+"""
+import random
+import timeit
+
+from collections import defaultdict
+from decimal import Decimal
+
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.utils import prepare_auction_results
+
+
+BIDDERS = 10000
+REBIDS = 3
+
+
+class Auction(object):
+    def __init__(self, bidders):
+        self.mapping = dict(
+            (bidder_id, index) for index, bidder_id in enumerate(bidders, 1)
+        )
+
+
+def main():
+    rnd = random.Random(10000)
+    bidders = ['{:032x}'.format(index) for index in range(BIDDERS)]
+    bids = [
+        {'bidder_id': bidder_id,
+         'amount': Decimal(rnd.randint(35000, 10 ** 6)),
+         'time': '2017-01-01T00:00:00+02:00'}
+        for _ in range(REBIDS) for bidder_id in bidders
+    ]
+    auction = Auction(bidders)
+
+    history = defaultdict(list)
+    leaderboard = BidsData()
+    add_leaderboard = timeit.timeit(
+        lambda: [leaderboard.add(bid) for bid in bids], number=1
+    )
+    for bid in bids:
+        history[bid['bidder_id']].append(bid)
+
+    legacy = timeit.timeit(
+        lambda: prepare_auction_results(auction, dict(history)), number=1
+    )
+    live = timeit.timeit(
+        lambda: prepare_auction_results(auction, leaderboard), number=1
+    )
+    print('bids consumed into leaderboard: {:.3f}s ({} bids)'.format(
+        add_leaderboard, len(bids)))
+    print('results from history:           {:.3f}s'.format(legacy))
+    print('results from leaderboard:       {:.3f}s'.format(live))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Cancel of 500 auctions against a CouchDB stand-in with 2 ms round trips:
+a get and a save per auction, as cancel_auction does in a process per
+auction, against batches of _all_docs and _bulk_docs requests. Process
+startup is left out, see bench_startup for it.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_bulk
+"""
+import logging
+import time
+
+from couchdb.client import Row
+
+from openprocurement.auction.insider.bulk import bulk_update, cancel,\
+    BULK_SIZE
+
+
+AUCTIONS = 500
+ROUND_TRIP = 0.002
+
+
+class RemoteCouchDB(object):
+
+    def __init__(self, doc_ids):
+        self.documents = dict(
+            (doc_id, {'_id': doc_id, '_rev': '1', 'current_stage': 3})
+            for doc_id in doc_ids
+        )
+        self.requests = 0
+
+    def request(self):
+        self.requests += 1
+        time.sleep(ROUND_TRIP)
+
+    def get(self, doc_id):
+        self.request()
+        return dict(self.documents[doc_id])
+
+    def save(self, document):
+        self.request()
+        self.documents[document['_id']] = document
+        return document['_id'], '2'
+
+    def view(self, name, keys=(), include_docs=False):
+        self.request()
+        return [Row(id=key, key=key, doc=dict(self.documents[key]))
+                for key in keys]
+
+    def update(self, documents):
+        self.request()
+        for document in documents:
+            self.documents[document['_id']] = document
+        return [(True, document['_id'], '2') for document in documents]
+
+
+def one_by_one(db, doc_ids):
+    for doc_id in doc_ids:
+        document = db.get(doc_id)
+        cancel(document)
+        db.save(document)
+
+
+def bulk(db, doc_ids):
+    for start in range(0, len(doc_ids), BULK_SIZE):
+        bulk_update(db, doc_ids[start:start + BULK_SIZE], cancel)
+
+
+def main():
+    logging.disable(logging.INFO)
+    doc_ids = ['{:032x}'.format(index) for index in range(AUCTIONS)]
+    for name, func in [('one by one', one_by_one), ('bulk', bulk)]:
+        db = RemoteCouchDB(doc_ids)
+        started = time.time()
+        func(db, doc_ids)
+        elapsed = time.time() - started
+        assert all(document['current_stage'] == -100
+                   for document in db.documents.values())
+        print('{:10} {:8.3f} s  {:5} requests'.format(
+            name, elapsed, db.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of a bid timestamp: datetime.now with a zone object built per call, as
+form_handler and update_stage did, against the auction clock.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_clock
+"""
+import timeit
+
+from datetime import datetime
+
+from dateutil.tz import tzlocal
+from pytz import timezone
+
+from openprocurement.auction.insider.clock import CLOCK
+
+
+NUMBER = 100000
+
+
+def main():
+    for name, func in [
+        ('tzlocal', lambda: datetime.now(tzlocal()).isoformat()),
+        ('pytz', lambda: datetime.now(timezone('Europe/Kiev')).isoformat()),
+        ('clock', CLOCK.isoformat),
+    ]:
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=3))
+        print('{:8} {:8.2f} us'.format(name, elapsed / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
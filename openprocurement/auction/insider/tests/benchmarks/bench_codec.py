@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Compare json codecs on the functional tender fixture and a full auction
+document.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_codec
+"""
+import os
+import timeit
+
+from decimal import Decimal
+
+from openprocurement.auction.insider.codec import CODECS, get_codec
+from openprocurement.auction.insider.constants import DUTCH_ROUNDS,\
+    PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END
+from openprocurement.auction.insider.utils import calculate_next_amount,\
+    prepare_results_stage
+
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+TENDER_FILE = os.path.join(PWD, '..', 'functional', 'data',
+                           'tender_insider.json')
+NUMBER = 1000
+
+
+def full_auction_document(initial_value=Decimal('35000'), bidders=10):
+    amount = initial_value
+    stages = [{'start': '', 'type': 'pause'}]
+    for index in range(DUTCH_ROUNDS):
+        stages.append({'start': '2017-01-01T00:00:00+02:00',
+                       'amount': amount,
+                       'type': 'dutch_{}'.format(index),
+                       'time': '2017-01-01T00:00:00+02:00'})
+        amount = calculate_next_amount(initial_value, amount)
+    for name in (PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END):
+        stages.append({'start': '2017-01-01T00:00:00+02:00',
+                       'type': name, 'time': ''})
+    results = [
+        prepare_results_stage(
+            bidder_id='{:032x}'.format(index), bidder_name=index,
+            amount=initial_value + index, time='2017-01-01T00:00:00+02:00'
+        )
+        for index in range(bidders)
+    ]
+    return {'_id': 'a' * 32, 'stages': stages, 'results': results,
+            'value': {'amount': initial_value, 'currency': 'UAH'},
+            'initial_value': initial_value, 'current_stage': 1}
+
+
+def main():
+    with open(TENDER_FILE) as _file:
+        raw_tender = _file.read()
+    for name in sorted(CODECS):
+        try:
+            codec = CODECS[name]()
+        except ImportError as e:
+            print('{}: skipped ({})'.format(name, e))
+            continue
+        document = full_auction_document()
+        tender = codec.loads(raw_tender)
+        for label, obj in (('tender', tender), ('document', document)):
+            raw = codec.dumps(obj)
+            encode = timeit.timeit(lambda: codec.dumps(obj), number=NUMBER)
+            decode = timeit.timeit(lambda: codec.loads(raw), number=NUMBER)
+            print('{:<10} {:<8} encode {:8.1f}us decode {:8.1f}us'.format(
+                name, label, encode / NUMBER * 1e6, decode / NUMBER * 1e6
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Bid value validation throughput: Decimal(str(x)) comparisons against
+integer cents.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_money
+"""
+import timeit
+
+from decimal import Decimal
+
+from openprocurement.auction.insider.money import to_cents,\
+    CANCEL_BID_CENTS
+
+
+NUMBER = 100000
+DUTCH_WINNER_AMOUNT = 33250.0
+BID = Decimal('35000.00')
+
+
+def validate_decimal(bid, winner_amount):
+    if not isinstance(winner_amount, Decimal):
+        winner_amount = Decimal(str(winner_amount))
+    return bid != Decimal('-1') and bid <= winner_amount
+
+
+def validate_cents(bid, winner_cents):
+    bid_cents = to_cents(bid)
+    return bid_cents != CANCEL_BID_CENTS and bid_cents <= winner_cents
+
+
+def main():
+    winner_cents = to_cents(DUTCH_WINNER_AMOUNT)
+    for name, func in (
+        ('decimal', lambda: validate_decimal(BID, DUTCH_WINNER_AMOUNT)),
+        ('cents', lambda: validate_cents(BID, winner_cents)),
+    ):
+        seconds = timeit.timeit(func, number=NUMBER)
+        print('{:<8} {:10.0f} validations/s'.format(name, NUMBER / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Time to restore worker state from the journal of an auction with all 81
+dutch turns and 1000 sealed bids, and cost of journaling a bid.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_recovery
+"""
+import os
+import shutil
+import tempfile
+import timeit
+
+from decimal import Decimal
+
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.codec import get_codec
+from openprocurement.auction.insider.money import Money
+from openprocurement.auction.insider.recovery import AuctionJournal,\
+    restore_state
+
+
+TURNS = 81
+BIDS = 1000
+ROUNDS = 20
+
+
+class State(object):
+
+    def __init__(self):
+        self.auction_document = {'value': {'currency': 'UAH'}}
+        self.audit = {'timeline': dict(
+            (phase, {'bids': [], 'timeline': {}})
+            for phase in ('dutch', 'sealedbid', 'bestbid')
+        )}
+        self.mapping = {}
+        self._bids_data = BidsData()
+
+
+def write_journal(journal):
+    journal.open(reset=True)
+    journal.mapping(dict(('{:032x}'.format(i), i) for i in range(100)))
+    for turn in range(1, TURNS + 1):
+        journal.set(('timeline', 'dutch', 'turn_{}'.format(turn)), {
+            'amount': Decimal(35000 - turn * 350),
+            'time': '2017-01-01T00:00:00+02:00'
+        })
+    for index in range(BIDS):
+        journal.bid('sealedbid', {
+            'bidder_id': '{:032x}'.format(index % 100),
+            'amount': Money(3500000 + index, 'UAH'),
+            'time': '2017-01-01T00:00:00+02:00'
+        })
+    journal.close()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        journal = AuctionJournal(os.path.join(directory, 'bench.journal'),
+                                 get_codec())
+        write = min(timeit.repeat(lambda: write_journal(journal),
+                                  number=1, repeat=5))
+        restore = min(timeit.repeat(
+            lambda: restore_state(State(), journal.records()),
+            number=1, repeat=ROUNDS
+        ))
+        print('{} records, {} bytes'.format(
+            len(journal.records()), os.path.getsize(journal.path)))
+        print('write:   {:8.2f} ms ({:.1f} us per record)'.format(
+            write * 1000, write * 1e6 / (BIDS + TURNS + 1)))
+        print('restore: {:8.2f} ms'.format(restore * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
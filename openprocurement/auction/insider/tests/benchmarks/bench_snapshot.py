@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Public document of a save on a full auction document: deepcopy of the
+whole document, as prepare_public_document did, against a snapshot which
+shares unchanged stages with the previous one (one stage changed, as
+update_stage does on every dutch step).
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_snapshot
+"""
+import timeit
+
+from copy import deepcopy
+
+from openprocurement.auction.insider.snapshot import snapshot
+from openprocurement.auction.insider.tests.benchmarks.bench_codec import\
+    full_auction_document
+
+
+NUMBER = 200
+
+
+def main():
+    document = full_auction_document()
+    previous = [snapshot(document)]
+
+    def step():
+        document['current_stage'] = document.get('current_stage', 0) + 1
+        stage = document['stages'][document['current_stage'] %
+                                   len(document['stages'])]
+        stage['time'] = str(document['current_stage'])
+
+    def copied():
+        step()
+        return deepcopy(document)
+
+    def shared():
+        step()
+        previous[0] = snapshot(document, previous[0])
+        return dict(previous[0])
+
+    for name, func in [('deepcopy', copied), ('snapshot', shared)]:
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER
+        print('{:10} {:10.1f} us per save'.format(name, elapsed * 1e6))
+
+
+if __name__ == '__main__':
+    main()
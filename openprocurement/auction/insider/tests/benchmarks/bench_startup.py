@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Startup time of auction_insider commands: a fresh interpreter imports cli
+and loads the worker stack for the command, against loading everything
+for every command as cli did before.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_startup
+"""
+import os
+import subprocess
+import sys
+import time
+
+
+ROUNDS = 5
+COMMANDS = ('cancel', 'reschedule', 'planning', 'announce', 'run')
+
+LAZY = '''
+import sys
+sys.argv[1:] = [{cmd!r}]
+from openprocurement.auction.insider import cli
+cli.load_worker({cmd!r})
+'''
+
+EAGER = '''
+from gevent import monkey
+monkey.patch_all()
+from openprocurement.auction.insider import cli
+from openprocurement.auction.insider.auction import SCHEDULER
+from openprocurement.auction.insider import server
+SCHEDULER.state
+'''
+
+
+def startup(code):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.time()
+        subprocess.check_call([sys.executable, '-c', code], env=env)
+        timings.append(time.time() - started)
+    return sorted(timings)[ROUNDS // 2]
+
+
+def main():
+    eager = startup(EAGER)
+    print('{:12} {:8.0f} ms'.format('all (eager)', eager * 1000))
+    for cmd in COMMANDS:
+        print('{:12} {:8.0f} ms'.format(
+            cmd, startup(LAZY.format(cmd=cmd)) * 1000))
+
+
+if __name__ == '__main__':
+    main()
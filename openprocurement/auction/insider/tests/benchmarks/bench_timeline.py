@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Stage lookups on a full auction document (81 dutch steps): scans over
+stages by type string, as end_dutch and post_audit did, against the
+timeline of the document, which is built once and then indexed.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_timeline
+"""
+import timeit
+
+from openprocurement.auction.insider.constants import DUTCH_ROUNDS,\
+    PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END
+from openprocurement.auction.insider.timeline import Timeline
+
+
+NUMBER = 20000
+STAGES = (
+    [{'type': 'pause', 'start': '2017-07-14T05:40:00+03:00'}] +
+    [{'type': 'dutch_{}'.format(index), 'start': '2017-07-14T05:45:00+03:00'}
+     for index in range(DUTCH_ROUNDS)] +
+    [{'type': kind, 'start': '2017-07-14T12:30:00+03:00'}
+     for kind in (PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END)]
+)
+
+
+def scan():
+    for kind in (PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END):
+        for index, stage in enumerate(STAGES):
+            if stage['type'] == kind:
+                break
+
+
+TIMELINE = Timeline(STAGES)
+
+
+def indexed():
+    for kind in (PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END):
+        TIMELINE.index(kind)
+
+
+def main():
+    build = min(timeit.repeat(lambda: Timeline(STAGES), number=200,
+                              repeat=3)) / 200
+    starts = min(timeit.repeat(lambda: Timeline(STAGES).starts, number=200,
+                               repeat=3)) / 200
+    print('timeline build {:10.1f} us, with starts {:.1f} us (once per '
+          'document)'.format(build * 1e6, starts * 1e6))
+    for name, func in [('scan', scan), ('timeline', indexed)]:
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER
+        print('{:14} {:10.2f} us per 5 phase lookups'.format(
+            name, elapsed * 1e6))
+
+
+if __name__ == '__main__':
+    main()
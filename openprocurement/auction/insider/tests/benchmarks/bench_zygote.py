@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Time to ready of 200 auction workers started at the same moment: fresh
+auction_insider processes against workers forked by the zygote. A worker
+is ready when the insider stack is imported, its config is parsed and
+logging is configured, i.e. right before it schedules jobs.
+
+    python -m openprocurement.auction.insider.tests.benchmarks.bench_zygote
+"""
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import yaml
+
+from openprocurement.auction.insider.zygote import request
+
+
+WORKERS = 200
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'data',
+                      'auction_worker_insider.yaml')
+
+COLD = '''
+import sys
+sys.argv[1:] = ['run', 'UA-{index}', {config!r}]
+from openprocurement.auction.insider import cli
+from openprocurement.auction.insider.tests.benchmarks.bench_zygote import\\
+    ready
+args = cli.parse_args()
+cli.load_worker(args.cmd)
+from openprocurement.auction.insider import server
+ready(None, sys.argv[1:])
+'''
+
+SERVE = '''
+from gevent import monkey
+monkey.patch_all()
+from openprocurement.auction.insider.tests.benchmarks.bench_zygote import\\
+    ready
+from openprocurement.auction.insider.zygote import Zygote
+Zygote({socket_path!r}, handler=ready).serve()
+'''
+
+
+class NullJournalHandler(logging.NullHandler):
+    """ Journal handler stand-in, takes journal fields as kwargs """
+
+    def __init__(self, **fields):
+        logging.NullHandler.__init__(self)
+
+
+def ready(zygote, argv):
+    from openprocurement.auction.insider import cli
+    args = cli.parse_args(argv)
+    if zygote is None:
+        worker_defaults = cli.read_worker_defaults(args.auction_worker_config)
+    else:
+        worker_defaults = zygote.worker_defaults(args.auction_worker_config)
+    cli.configure(args, worker_defaults)
+
+
+def make_config(directory):
+    with open(CONFIG) as stream:
+        config = yaml.load(stream)
+    config['handlers']['journal']['class'] = \
+        __name__ + '.NullJournalHandler'
+    path = os.path.join(directory, 'worker.yaml')
+    with open(path, 'w') as stream:
+        yaml.safe_dump(config, stream)
+    return path
+
+
+def cold_start(env, config):
+    started = time.time()
+    processes = [
+        subprocess.Popen([sys.executable, '-c',
+                          COLD.format(index=index, config=config)], env=env)
+        for index in range(WORKERS)
+    ]
+    assert all(process.wait() == 0 for process in processes)
+    return time.time() - started
+
+
+def zygote_start(env, config, directory):
+    socket_path = os.path.join(directory, 'zygote.sock')
+    zygote = subprocess.Popen(
+        [sys.executable, '-c', SERVE.format(socket_path=socket_path)],
+        env=env
+    )
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+        statuses = []
+
+        def start(index):
+            statuses.append(request(
+                socket_path, ['run', 'UA-{}'.format(index), config]
+            ))
+        threads = [threading.Thread(target=start, args=(index,))
+                   for index in range(WORKERS)]
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert statuses == [0] * WORKERS
+        return time.time() - started
+    finally:
+        zygote.kill()
+        zygote.wait()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        config = make_config(directory)
+        print('{} workers'.format(WORKERS))
+        print('fresh processes: {:8.2f} s'.format(cold_start(env, config)))
+        print('zygote forks:    {:8.2f} s'.format(
+            zygote_start(env, config, directory)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
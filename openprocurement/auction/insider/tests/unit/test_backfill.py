@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import json
+
+from copy import deepcopy
+
+from couchdb.client import Row
+
+from openprocurement.auction.insider.auction import Auction
+from openprocurement.auction.insider.backfill import Backfill, Checkpoint,\
+    Throttle, parse_period_date
+from openprocurement.auction.insider.tests.unit.conftest import\
+    worker_defaults
+
+
+class PagedDB(object):
+    """ Auctions database stand-in for paged and keyed _all_docs """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.requests = []
+
+    def view(self, name, keys=None, include_docs=False, limit=None,
+             startkey=None):
+        if keys is not None:
+            self.requests.append(('keys', list(keys)))
+            return [Row(id=key, key=key,
+                        doc=deepcopy(self.documents.get(key)))
+                    for key in keys]
+        doc_ids = [doc_id for doc_id in sorted(self.documents)
+                   if startkey is None or doc_id >= startkey][:limit]
+        self.requests.append(('page', startkey))
+        return [Row(id=doc_id, key=doc_id) for doc_id in doc_ids]
+
+
+def auction_document(doc_id, current_stage=2,
+                     end_date='2018-05-10T12:00:00+03:00'):
+    return {
+        '_id': doc_id,
+        'auction_type': 'dutch',
+        'stages': [{}, {}, {}],
+        'current_stage': current_stage,
+        'endDate': end_date,
+    }
+
+
+def make_db():
+    return PagedDB({
+        'a': auction_document('a'),
+        'b': auction_document('b', current_stage=1, end_date=None),
+        'c': auction_document('c', current_stage=-100),
+        'd': auction_document('d', end_date='2018-06-01T00:00:00+03:00'),
+        'e': auction_document('e'),
+        '_design/auctions': {'_id': '_design/auctions'},
+    })
+
+
+def backfill(db, path, **options):
+    options.setdefault('page_size', 2)
+    return Backfill(worker_defaults, Checkpoint(path), db=db,
+                    since=parse_period_date('2018-05-01'),
+                    until=parse_period_date('2018-06-01'),
+                    rate=0, **options)
+
+
+def test_backfill_uploads_finished_auctions(mocker, tmpdir):
+    post_audit = mocker.patch.object(Auction, 'post_audit', autospec=True)
+    path = str(tmpdir.join('backfill.json'))
+    db = make_db()
+
+    state = backfill(db, path).run()
+
+    assert sorted(call[0][1]['_id'] for call in post_audit.call_args_list) \
+        == ['a', 'e']
+    assert state == {'last_doc_id': 'e', 'uploaded': 2, 'failed': []}
+    with open(path) as stream:
+        assert json.load(stream) == state
+    # design documents are paged, not read
+    assert ['_design/auctions'] not in [keys for _, keys in db.requests]
+
+
+def test_backfill_resumes_after_checkpoint(mocker, tmpdir):
+    post_audit = mocker.patch.object(Auction, 'post_audit', autospec=True)
+    path = tmpdir.join('backfill.json')
+    path.write(json.dumps({'last_doc_id': 'b', 'uploaded': 1, 'failed': []}))
+
+    state = backfill(make_db(), str(path)).run()
+
+    assert [call[0][1]['_id'] for call in post_audit.call_args_list] == ['e']
+    assert state['uploaded'] == 2
+
+
+def test_backfill_records_failed_auctions(mocker, tmpdir):
+    def post_audit(auction, document):
+        if document['_id'] == 'a':
+            raise ValueError('No bids')
+    mocker.patch.object(Auction, 'post_audit', autospec=True,
+                        side_effect=post_audit)
+
+    state = backfill(make_db(), str(tmpdir.join('backfill.json'))).run()
+
+    assert state['uploaded'] == 1
+    assert state['failed'] == ['a']
+
+
+def test_backfill_shards_split_auctions(mocker, tmpdir):
+    post_audit = mocker.patch.object(Auction, 'post_audit', autospec=True)
+    uploaded = []
+    for index in range(3):
+        post_audit.reset_mock()
+        backfill(make_db(), str(tmpdir.join('backfill.{}'.format(index))),
+                 shard=(index, 3)).run()
+        uploaded.extend(call[0][1]['_id']
+                        for call in post_audit.call_args_list)
+    assert sorted(uploaded) == ['a', 'e']
+
+
+def test_throttle():
+    now = [100.0]
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    throttle = Throttle(4, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        throttle.wait()
+    assert sleeps == [0.25, 0.25]
+
+
+def test_post_audit_uses_given_document(auction, mocker):
+    get_auction_document = mocker.patch.object(auction,
+                                               'get_auction_document')
+    upload = mocker.patch.object(
+        auction, 'upload_audit_file_without_document_service')
+    document = {
+        '_id': auction.auction_doc_id,
+        'stages': [
+            {'type': 'pause', 'start': '2018-05-10T10:00:00+03:00'},
+            {'type': 'dutch_0', 'start': '2018-05-10T10:05:00+03:00',
+             'time': '2018-05-10T10:05:00+03:00', 'amount': 1000},
+            {'type': 'dutch_1', 'time': '2018-05-10T10:10:00+03:00',
+             'amount': 990, 'dutch_winner': True},
+            {'type': 'pre-sealedbid', 'time': '2018-05-10T10:11:00+03:00'},
+        ],
+        'results': [{'bidder_id': 'bidder', 'amount': 990,
+                     'time': '2018-05-10T10:10:00+03:00',
+                     'dutch_winner': True}],
+    }
+
+    auction.post_audit(document)
+
+    assert not get_auction_document.called
+    assert upload.called
+    assert auction.audit['timeline']['dutch']['bids'][0]['amount'] == '990'
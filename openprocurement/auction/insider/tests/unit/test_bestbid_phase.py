@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import pytest
 
+from openprocurement.auction.insider.bids import BidsData
 from openprocurement.auction.insider.constants import BESTBID
 
 
@@ -168,7 +169,7 @@ def test_end_bestbid(auction, mocker):
         ]
     }
 
-    auction._bids_data = {
+    auction._bids_data = BidsData({
         'test_bidder_id': [{
             'bidder_id': 'test_bidder_id',
             'time': '',
@@ -179,7 +180,7 @@ def test_end_bestbid(auction, mocker):
             'time': '',
             'amount': 480000.0,
         }],
-    }
+    })
 
     auction.end_bestbid(1)
 
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+import pytest
+import yaml
+
+from openprocurement.auction.insider.bids import Bid, BidsData
+from openprocurement.auction.insider.utils import prepare_auction_results,\
+    prepare_results_stage, normalize_audit
+
+
+def bid(bidder_id, amount, time=''):
+    return {'bidder_id': bidder_id, 'amount': amount, 'time': time}
+
+
+def test_bids_data_history_and_leaderboard():
+    bids_data = BidsData()
+    assert bids_data.top() is None
+    assert bids_data['missing'] == []
+
+    bids_data.add(bid('a', Decimal('350')))
+    bids_data.add(bid('b', 400.0))
+    bids_data.add(bid('c', 375))
+    assert bids_data.valid_bids_count == 3
+    assert bids_data.top()['bidder_id'] == 'b'
+
+    # re-bid and cancellation
+    bids_data.add(bid('a', Decimal('500')))
+    bids_data.add(bid('b', -1))
+    assert bids_data.valid_bids_count == 2
+    assert bids_data.top()['bidder_id'] == 'a'
+    assert [b['bidder_id'] for b in bids_data.latest_bids()] == ['b', 'c', 'a']
+    assert bids_data.latest('b')['amount'] == -1
+    assert bids_data['a'] == [
+        bid('a', Decimal('350')), bid('a', Decimal('500'))
+    ]
+
+
+def test_bids_data_ties_keep_bids_order():
+    bids_data = BidsData()
+    bids_data.add(bid('a', 400))
+    bids_data.add(bid('b', 400))
+    assert [b['bidder_id'] for b in bids_data.latest_bids()] == ['a', 'b']
+    assert bids_data.top()['bidder_id'] == 'a'
+    bids_data.add(bid('c', 300))
+    assert bids_data.top()['bidder_id'] == 'a'
+
+
+def test_prepare_auction_results_from_bids_data(auction):
+    auction.mapping.update({'a': 1, 'b': 2})
+    bids_data = BidsData()
+    bids_data.add(bid('b', 480000.0))
+    bids_data.add(dict(bid('a', 450000.0), dutch_winner=True,
+                       bidder_name=1))
+
+    results = prepare_auction_results(auction, bids_data)
+
+    assert [r['bidder_id'] for r in results] == ['a', 'b']
+    assert results[0]['dutch_winner'] is True
+    assert results[0]['label']['en'] == 'Bidder #1'
+    assert results[1]['label']['en'] == 'Bidder #2'
+    assert 'bidder_name' not in bids_data['b'][0]
+
+
+def test_bid_record_dict_protocol():
+    record = Bid(bidder_id='a', amount=Decimal('350'))
+    assert record == {'bidder_id': 'a', 'amount': Decimal('350')}
+    assert {'bidder_id': 'a', 'amount': Decimal('350')} == record
+    assert record != {'bidder_id': 'a'}
+    assert 'time' not in record
+    assert record.get('time', '') == ''
+    assert record.get('keys') is None
+    with pytest.raises(KeyError):
+        record['time']
+    with pytest.raises(KeyError):
+        record['to_dict']
+    record['dutch_winner'] = True
+    assert sorted(record.keys()) == ['amount', 'bidder_id', 'dutch_winner']
+    assert dict(record) == record.to_dict()
+    assert prepare_results_stage(**record)['dutch_winner'] is True
+    with pytest.raises(AttributeError):
+        record['current_stage'] = 1
+
+
+def test_bid_record_shared_with_audit():
+    bids_data = BidsData()
+    result = {'bidder_id': 'b', 'amount': Decimal('351'), 'time': 'time'}
+    turn = {'amount': Decimal('35000'), 'time': 'time'}
+    audit = {'results': {'bids': [result]}, 'timeline': {
+        'dutch': {'bids': [], 'turn_1': turn}, 'sealedbid': {'bids': []},
+        'bestbid': {'bids': []}
+    }}
+    record = bids_data.add(bid('a', Decimal('350.50'), 'time'))
+    audit['timeline']['sealedbid']['bids'].append(record)
+    assert bids_data['a'][0] is record
+
+    normalized = normalize_audit(audit)
+
+    assert audit['timeline']['sealedbid']['bids'][0] is record
+    assert record.amount == Decimal('350.50')
+    assert result['amount'] == Decimal('351')
+    assert turn['amount'] == Decimal('35000')
+    assert yaml.safe_load(yaml.safe_dump(normalized)) == {
+        'results': {'bids': [
+            {'bidder_id': 'b', 'amount': '351', 'time': 'time'}
+        ]},
+        'timeline': {
+            'dutch': {'bids': [],
+                      'turn_1': {'amount': '35000', 'time': 'time'}},
+            'sealedbid': {'bids': [
+                {'bidder_id': 'a', 'amount': '350.50', 'time': 'time'}
+            ]},
+            'bestbid': {'bids': []},
+        }
+    }
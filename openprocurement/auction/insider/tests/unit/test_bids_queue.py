@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import gevent
+import pytest
+
+from gevent.event import Event
+
+from openprocurement.auction.insider.bids_queue import BidsQueue, QueueFull
+from openprocurement.auction.insider.constants import SEALEDBID
+from openprocurement.auction.insider.forms import form_handler
+from openprocurement.auction.insider.server import app as server_app
+from openprocurement.auction.insider.utils import prepare_audit
+
+
+def bid(bidder_id, amount):
+    return {'bidder_id': bidder_id, 'amount': amount,
+            'time': '2017-07-14T05:40:00+03:00'}
+
+
+def test_unbounded_queue_keeps_every_bid():
+    queue = BidsQueue.from_config({})
+    for amount in (1, 2, 3):
+        queue.put(bid('a', amount))
+
+    assert queue.qsize() == 3
+    assert [queue.get()['amount'] for _ in range(3)] == [1, 2, 3]
+    assert queue.empty()
+
+
+def test_bounded_queue_coalesces_and_refuses():
+    clock = [0.0]
+    queue = BidsQueue.from_config({'bids_queue': {'size': 2}})
+    queue.clock = lambda: clock[0]
+
+    queue.put(bid('a', 1))
+    queue.put(bid('b', 1))
+    queue.put(bid('a', 2))  # replaces the pending bid of 'a'
+    with pytest.raises(QueueFull):
+        queue.put(bid('c', 1))
+
+    clock[0] = 2
+    assert [(b['bidder_id'], b['amount']) for b in (queue.get(), queue.get())] \
+        == [('a', 2), ('b', 1)]
+    assert queue.metrics() == {
+        'depth': 0, 'max_depth': 2, 'maxsize': 2, 'accepted': 2,
+        'coalesced': 1, 'rejected': 1, 'mean_wait': 2.0, 'max_wait': 2.0,
+    }
+
+
+def test_queue_size_must_be_positive():
+    for size in (0, -5):
+        with pytest.raises(ValueError):
+            BidsQueue(maxsize=size)
+    with pytest.raises(ValueError):
+        BidsQueue.from_config({'bids_queue': {'size': 0}})
+    assert BidsQueue.from_config({'bids_queue': {'size': None}}).maxsize \
+        is None
+
+
+def test_coalesced_bids_are_recorded(auction, mocker):
+    auction.bids_queue = BidsQueue(maxsize=2, coalesce=True)
+    auction._end_sealedbid = Event()
+    auction.audit = prepare_audit(auction)
+    journal = mocker.patch.object(auction, 'journal')
+    for amount in (1, 2, 3):
+        auction.bids_queue.put(bid('a', amount))
+    auction.bids_queue.put(bid('b', 5))
+
+    worker = gevent.spawn(auction.add_bid)
+    gevent.sleep(0)
+    auction._end_sealedbid.set()
+    auction.bids_queue.put(bid('c', 1))  # wakes the worker up to finish
+    worker.join(timeout=1)
+    assert worker.ready()
+
+    assert [(record['bidder_id'], record['amount']) for record
+            in auction.audit['timeline'][SEALEDBID]['bids']] == [
+        ('a', 1), ('a', 2), ('a', 3), ('b', 5), ('c', 1)
+    ]
+    assert auction._bids_data.latest('a')['amount'] == 3
+    assert journal.bid.call_count == 5
+
+
+def test_get_waits_for_bid():
+    queue = BidsQueue()
+    getter = gevent.spawn(queue.get)
+    gevent.sleep(0)
+    assert not getter.ready()
+
+    queue.put(bid('a', 1))
+    assert getter.get(timeout=1)['bidder_id'] == 'a'
+
+
+def test_form_handler_when_queue_is_full(auction, mocker):
+    auction.auction_document = {'current_phase': SEALEDBID}
+    auction._end_sealedbid = Event()
+    auction.bids_queue = BidsQueue(maxsize=1)
+    auction.bids_queue.put(bid('other', 1))
+    mocker.patch.object(auction.bid_validator, 'validate', return_value=(
+        {'bidder_id': 'test_bidder_id', 'bid': '35000'}, {}, 2
+    ))
+    mocker.patch.dict(server_app.config, {'auction': auction})
+    mocker.patch.object(server_app, 'bids_form', None, create=True)
+
+    with server_app.test_request_context(
+            data='{}', content_type='application/json'):
+        res = form_handler()
+
+    assert res['status'] == 'failed'
+    assert res['retry_after'] == 1
+    assert auction.bids_queue.metrics()['rejected'] == 1
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import time
+
+import gevent
+
+from openprocurement.auction.insider.blocking import BlockDetector
+
+
+def block_hub(seconds):
+    time.sleep(seconds)  # not monkey patched in tests
+
+
+def test_detector_records_block_with_stack_and_context():
+    detector = BlockDetector(
+        threshold=0.05, context=lambda: {'phase': 'sealedbid', 'stage': 3}
+    ).start()
+    gevent.sleep(0.05)
+    block_hub(0.3)
+    gevent.sleep(0.1)
+    detector.stop()
+
+    metrics = detector.metrics()
+    assert metrics['blocks'] == 1
+    assert 0.2 < metrics['worst'] < 0.5
+    block = metrics['worst_blocks'][0]
+    assert block['phase'] == 'sealedbid'
+    assert block['stage'] == 3
+    assert 'block_hub' in ''.join(block['stack'])
+
+
+def test_detector_ignores_short_switches():
+    detector = BlockDetector(threshold=0.2).start()
+    for _ in range(5):
+        block_hub(0.01)
+        gevent.sleep(0.02)
+    detector.stop()
+
+    assert detector.metrics()['blocks'] == 0
+
+
+def test_detector_keeps_worst_blocks():
+    detector = BlockDetector(history=2)
+    for duration in (0.3, 0.1, 0.5):
+        detector.record(duration, None, {})
+
+    metrics = detector.metrics()
+    assert metrics['blocks'] == 3
+    assert metrics['worst'] == 0.5
+    assert [block['duration'] for block in metrics['worst_blocks']] == \
+        [0.5, 0.3]
+
+
+def test_auction_hub_monitor(auction):
+    auction.auction_document = {'current_phase': 'dutch', 'current_stage': 2}
+    auction.worker_defaults['block_detector'] = {'threshold': 0.05}
+
+    auction.generate_request_id()
+    auction.monitor_hub()
+    block_hub(0.2)
+    gevent.sleep(0.1)
+    auction._end_auction_event.set()
+    auction.wait_to_end()
+
+    metrics = auction.hub_metrics()
+    assert metrics['blocks'] == 1
+    assert metrics['worst_blocks'][0]['phase'] == 'dutch'
+    assert not auction.block_detector.running
+
+    auction.worker_defaults['block_detector'] = {'enabled': False}
+    auction.monitor_hub()
+    assert auction.hub_metrics() == {}
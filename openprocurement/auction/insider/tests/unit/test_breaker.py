@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import socket
+
+from decimal import Decimal
+
+from couchdb.http import ResourceConflict
+
+from openprocurement.auction.insider.breaker import CircuitBreaker,\
+    DocumentSpool, CLOSED, OPEN, HALF_OPEN
+from openprocurement.auction.insider.codec import get_codec
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_trips_on_failures_and_recovers():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, latency_threshold=1,
+                             reset_timeout=10, clock=clock)
+    assert breaker.allow()
+    breaker.record(clock(), False)
+    assert breaker.state == CLOSED
+    breaker.record(clock(), False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.record(clock(), False)
+    assert breaker.state == OPEN
+    assert breaker.metrics() == {'state': OPEN, 'failures': 3, 'trips': 2}
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record(clock(), True)
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_breaker_allows_single_trial_call():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10,
+                             clock=clock)
+    breaker.record(clock(), False)
+    clock.now = 10
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.available()
+    assert not breaker.allow()
+
+    # the trial call never recorded its result
+    clock.now = 20
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(clock(), True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_trips_on_latency():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, latency_threshold=1,
+                             clock=clock)
+    clock.now = 2
+    breaker.record(0, True)
+    assert breaker.state == OPEN
+    assert CircuitBreaker.from_config(
+        {'db_breaker': {'failure_threshold': 5}}
+    ).failure_threshold == 5
+
+
+def test_spool_keeps_latest_document(tmpdir):
+    spool = DocumentSpool(str(tmpdir.join('auction.spool')), get_codec())
+    assert not spool
+    assert spool.load() is None
+    spool.put({'current_stage': 1})
+    spool.put({'current_stage': 2, 'amount': Decimal('1.10')})
+    assert spool.metrics() == {'spooled': True, 'spool_size': spool.size}
+
+    restored = DocumentSpool(spool.path, get_codec())
+    assert restored.load() == {'current_stage': 2, 'amount': Decimal('1.10')}
+    restored.clear()
+    assert not restored
+    assert not tmpdir.join('auction.spool').exists()
+    assert DocumentSpool(None, get_codec()).metrics()['spool_size'] == 0
+
+
+def test_save_auction_document_spools_and_replays(auction, mocker):
+    mocker.patch('openprocurement.auction.insider.mixins.sleep')
+    mocker.patch('openprocurement.auction.insider.utils.sleep')
+    spawn = mocker.patch('openprocurement.auction.insider.mixins.spawn')
+    auction.generate_request_id()
+    auction.db = mocker.MagicMock()
+    auction.db.save.side_effect = socket.error(111, 'Connection refused')
+    auction.db.get.side_effect = socket.error(111, 'Connection refused')
+    auction.auction_document = {'_id': 'auction', '_rev': '1',
+                                'current_stage': 3}
+
+    assert auction.save_auction_document() is None
+    assert auction.db_breaker.state == OPEN
+    assert auction.db.save.call_count == 1
+    assert auction.db_spool.document['current_stage'] == 3
+    assert spawn.call_count == 1
+
+    auction.auction_document['current_stage'] = 4
+    auction.save_auction_document()
+    assert auction.db.save.call_count == 1
+    assert auction.db_spool.document['current_stage'] == 4
+    assert auction.get_auction_document() is auction.auction_document
+    assert auction.db_metrics()['spooled'] is True
+
+    auction.db.save.side_effect = [ResourceConflict(), ('auction', '3')]
+    auction.db.get.side_effect = None
+    auction.db.get.return_value = {'_id': 'auction', '_rev': '2'}
+    auction.db_breaker.reset_timeout = 0
+    assert auction.replay_spooled_document(timeout=1) is True
+    assert auction.db.save.call_args[0][0]['_rev'] == '2'
+    assert auction.db.save.call_args[0][0]['current_stage'] == 4
+    assert auction.auction_document['_rev'] == '3'
+    assert auction.db_breaker.state == CLOSED
+    assert auction.db_metrics() == {
+        'state': CLOSED, 'failures': 0, 'trips': 1,
+        'spooled': False, 'spool_size': 0
+    }
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from couchdb.client import Row
+from couchdb.http import ResourceConflict
+
+from openprocurement.auction.insider.bulk import bulk_update, cancel,\
+    reschedule
+from openprocurement.auction.insider.cli import auction_doc_ids
+
+
+class BulkDB(object):
+    """ Auctions database stand-in for _all_docs and _bulk_docs """
+
+    def __init__(self, documents, conflicts=()):
+        self.documents = documents
+        self.conflicts = list(conflicts)
+        self.requests = []
+
+    def view(self, name, keys=(), include_docs=False):
+        self.requests.append((name, list(keys)))
+        rows = []
+        for key in keys:
+            if key in self.documents:
+                rows.append(Row(id=key, key=key,
+                                doc=dict(self.documents[key])))
+            else:
+                rows.append(Row(key=key, error='not_found'))
+        return rows
+
+    def update(self, documents):
+        self.requests.append(('_bulk_docs', [doc['_id'] for doc in documents]))
+        results = []
+        for document in documents:
+            doc_id = document['_id']
+            if doc_id in self.conflicts:
+                self.conflicts.remove(doc_id)
+                results.append((False, doc_id, ResourceConflict()))
+                continue
+            rev = str(int(self.documents[doc_id]['_rev']) + 1)
+            self.documents[doc_id] = dict(document, _rev=rev)
+            results.append((True, doc_id, rev))
+        return results
+
+
+def documents(*doc_ids):
+    return dict((doc_id, {'_id': doc_id, '_rev': '1', 'current_stage': 3})
+                for doc_id in doc_ids)
+
+
+def test_bulk_cancel():
+    db = BulkDB(documents('a', 'b'))
+    assert bulk_update(db, ['a', 'b', 'c'], cancel) == {
+        'a': '2', 'b': '2', 'c': None
+    }
+    assert db.requests == [('_all_docs', ['a', 'b', 'c']),
+                           ('_bulk_docs', ['a', 'b'])]
+    assert db.documents['a']['current_stage'] == -100
+    assert 'endDate' in db.documents['b']
+
+
+def test_bulk_reschedule_retries_conflicts_only():
+    db = BulkDB(documents('a', 'b', 'c'), conflicts=['b', 'b'])
+    assert bulk_update(db, ['a', 'b', 'c'], reschedule) == {
+        'a': '2', 'b': '2', 'c': '2'
+    }
+    assert db.requests[2:] == [
+        ('_all_docs', ['b']), ('_bulk_docs', ['b']),
+        ('_all_docs', ['b']), ('_bulk_docs', ['b'])
+    ]
+    assert db.documents['b']['current_stage'] == -101
+    assert 'endDate' not in db.documents['b']
+
+
+def test_bulk_update_gives_up_after_retries():
+    db = BulkDB(documents('a'), conflicts=['a'] * 3)
+    assert bulk_update(db, ['a'], cancel, retries=3) == {'a': None}
+    assert db.documents['a']['current_stage'] == 3
+
+
+def test_auction_doc_ids():
+    assert auction_doc_ids('a,b,,c') == ['a', 'b', 'c']
+    assert auction_doc_ids('-', iter(['a\n', '\n', 'b\n'])) == ['a', 'b']
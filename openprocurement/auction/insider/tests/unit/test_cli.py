@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+HEAVY_MODULES = ('flask', 'flask_oauthlib', 'wtforms', 'wtforms_json',
+                 'apscheduler', 'openprocurement.auction.insider.server')
+
+# import of cli and the worker stack for a short command, without the
+# interpreter startup (about 0.2 s on a developer machine)
+STARTUP_BUDGET = 1.0
+
+LOADED_MODULES = '''
+import json, sys, time
+sys.argv[1:] = [{cmd!r}]
+started = time.time()
+from openprocurement.auction.insider import cli
+cli.load_worker({cmd!r})
+elapsed = time.time() - started
+from gevent import monkey
+print(json.dumps({{
+    'modules': sorted(sys.modules),
+    'patched': monkey.is_module_patched('socket'),
+    'elapsed': elapsed,
+}}))
+'''
+
+
+def loaded_modules(cmd):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.check_output(
+        [sys.executable, '-c', LOADED_MODULES.format(cmd=cmd)], env=env
+    )
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize('cmd', ['cancel', 'reschedule', 'planning',
+                                 'announce'])
+def test_short_commands_startup(cmd):
+    loaded = loaded_modules(cmd)
+    assert not loaded['patched']
+    assert 'openprocurement.auction.insider.auction' in loaded['modules']
+    assert [name for name in loaded['modules']
+            if name.split('.')[0] in HEAVY_MODULES or
+            name in HEAVY_MODULES] == []
+    assert loaded['elapsed'] < STARTUP_BUDGET
+
+
+def test_import_does_not_patch_gevent():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.check_output([sys.executable, '-c', (
+        'import sys; sys.argv[1:] = ["run"]\n'
+        'from openprocurement.auction.insider import cli\n'
+        'from gevent import monkey\n'
+        'print(monkey.is_module_patched("socket"))'
+    )], env=env)
+    assert output.splitlines()[-1] == 'False'
+
+
+def test_run_command_patches_gevent():
+    assert loaded_modules('run')['patched']
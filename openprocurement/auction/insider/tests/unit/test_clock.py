@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from dateutil.tz import gettz, tzutc
+
+from openprocurement.auction.insider.clock import Clock, VirtualClock
+from openprocurement.auction.insider.utils import prepare_audit
+
+
+KIEV = gettz('Europe/Kiev')
+
+
+def test_clock_isoformat_matches_datetime():
+    # summer time in Kiev starts at 2018-03-25T01:00:00Z
+    clock = VirtualClock(1521939600 - 1.5, KIEV)
+    for _ in range(4):
+        assert clock.isoformat() == clock.now().isoformat() == \
+            datetime.fromtimestamp(clock.time(), KIEV).isoformat()
+        clock.advance(1)
+    assert clock.isoformat() == '2018-03-25T04:00:02.500000+03:00'
+
+
+def test_clock_follows_monotonic_time():
+    wall = [1500000000.0]
+    monotonic = [10.0]
+    clock = Clock(tzutc(), wall=lambda: wall[0],
+                  monotonic=lambda: monotonic[0])
+
+    wall[0] -= 3600  # system time stepped back
+    monotonic[0] += 2
+
+    assert clock.time() == 1500000002.0
+    assert clock.isoformat() == '2017-07-14T02:40:02+00:00'
+
+
+def test_clock_resync_reads_wall_time_again():
+    wall = [1500000000.0]
+    monotonic = [10.0]
+    clock = Clock(tzutc(), wall=lambda: wall[0],
+                  monotonic=lambda: monotonic[0])
+
+    # the zygote ran for a day, system time was corrected meanwhile
+    wall[0] += 86400 + 30
+    monotonic[0] += 86400
+    assert clock.time() == 1500086400.0
+
+    clock.resync()
+    assert clock.time() == 1500086430.0
+
+
+def test_end_auction_has_single_end_time(auction, mocker):
+    mocker.patch('openprocurement.auction.insider.auction.delete_mapping')
+    mocker.patch.object(auction, 'put_auction_data', return_value=False)
+    auction.server = None
+    auction.generate_request_id()
+    auction.clock = VirtualClock(1500000000, tzutc())
+    auction.audit = prepare_audit(auction)
+    auction.auction_document = {
+        'stages': [{}, {}],
+        'results': [{'bidder_id': 'bidder', 'amount': 100,
+                     'time': '2017-07-14T02:30:00+00:00'}],
+    }
+
+    auction.end_auction()
+
+    assert auction.auction_document['endDate'] == \
+        auction.audit['results']['time'] == '2017-07-14T02:40:00+00:00'
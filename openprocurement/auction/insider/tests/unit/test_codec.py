@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+import pytest
+import yaml
+
+from openprocurement.auction.insider import codec as codec_module
+from openprocurement.auction.insider.codec import get_codec, install_codec,\
+    SimpleJSONCodec, DEFAULT_CODEC, AuditDumper
+from openprocurement.auction.insider.bids import Bid
+from openprocurement.auction.insider.money import Money
+
+
+def test_get_codec_default():
+    assert isinstance(get_codec(), SimpleJSONCodec)
+    assert get_codec(None).name == DEFAULT_CODEC
+
+
+def test_get_codec_unknown():
+    with pytest.raises(ValueError):
+        get_codec('unknown')
+
+
+def test_simplejson_codec_keeps_decimal():
+    codec = get_codec('simplejson')
+    data = {'amount': Decimal('35000.01'), 'items': [Decimal('0.10')]}
+    raw = codec.dumps(data)
+    assert codec.dumps({'amount': Decimal('35000.01')}) == \
+        '{"amount": 35000.01}'
+    assert codec.loads(raw) == data
+    assert isinstance(codec.loads(raw)['amount'], Decimal)
+
+
+def test_ujson_codec_falls_back_without_ujson(mocker):
+    mocker.patch.object(codec_module, 'ujson', None)
+    assert get_codec('ujson').name == DEFAULT_CODEC
+
+
+def test_ujson_codec_writes_raw_numbers():
+    pytest.importorskip('ujson')
+    codec = get_codec('ujson')
+    data = {'amount': Decimal('303792770495.73'), 'bids': [
+        {'amount': Decimal('-1')}, {'amount': Decimal('35000.10')}
+    ]}
+    raw = codec.dumps(data)
+    assert '"amount":303792770495.73' in raw
+    assert '"amount":35000.10' in raw
+    decoded = codec.loads(raw)
+    assert decoded == data
+    assert isinstance(decoded['bids'][1]['amount'], Decimal)
+    assert get_codec('simplejson').loads(raw) == decoded
+
+
+def test_ujson_codec_encodes_records():
+    pytest.importorskip('ujson')
+    codec = get_codec('ujson')
+    raw = codec.dumps({'results': [
+        Bid(bidder_id='a', amount=Money(3500010))
+    ]})
+    assert codec.loads(raw) == {
+        'results': [{'bidder_id': 'a', 'amount': Decimal('35000.10')}]
+    }
+
+
+def test_raw_numbers_copies_only_changed_containers():
+    stage = {'type': 'pause', 'start': ''}
+    results = [{'bidder_id': 'a'}]
+    document = {'stages': [stage, {'amount': Decimal('1.10')}],
+                'results': results}
+    raw = codec_module._raw_numbers(document)
+    assert raw is not document
+    assert raw['results'] is results
+    assert raw['stages'][0] is stage
+    assert raw['stages'][1]['amount'].value == Decimal('1.10')
+    assert document['stages'][1]['amount'] == Decimal('1.10')
+    assert codec_module._raw_numbers(results) is results
+
+
+def test_install_codec(mocker):
+    mock_use = mocker.patch.object(codec_module, 'use')
+    codec = install_codec('simplejson')
+    mock_use.assert_called_once_with(encode=codec.dumps, decode=codec.loads)
+
+
+def test_audit_dumper_renders_amounts_as_strings():
+    data = {
+        'decimal': Decimal('35000.01'),
+        'money': Money(3500000, 'UAH'),
+        'bid': Bid(bidder_id='a', amount=Money(-100)),
+    }
+    assert yaml.safe_load(yaml.dump(data, Dumper=AuditDumper)) == {
+        'decimal': '35000.01',
+        'money': '35000.00',
+        'bid': {'bidder_id': 'a', 'amount': '-1.00'},
+    }
+
+
+def test_audit_dumper_leaves_safe_dumper_alone():
+    with pytest.raises(yaml.representer.RepresenterError):
+        yaml.safe_dump({'amount': Decimal('35000.01')})
+
+
+def test_sse_stream_encodes_with_codec():
+    from gevent.queue import Queue
+    from openprocurement.auction.insider.event_source import CodecSseStream
+
+    channel = Queue()
+    channel.put({'event': 'Tick', 'data': {'amount': Decimal('35000.10')}})
+    channel.put({'event': 'StopSSE', 'data': ''})
+    stream = ''.join(CodecSseStream(channel, get_codec('simplejson'),
+                                    bidder_id='a', client_id='c'))
+
+    assert stream.startswith('retry: 2000\n')
+    assert 'event: Tick\ndata: {"amount": 35000.10}\n' in stream
+    assert channel.empty()
@@ -166,3 +166,21 @@ def test_prepare_auction_document(auction, mocker):
     assert mock_save_auction_document.call_count == 2
     assert mock_get_auction_info.call_count == 2
     assert len(auction.auction_document['stages']) == 87
+    assert auction.auction_document['stages'][2]['start'] == \
+        '2017-12-12T00:05:30'
+
+    # time_compression is applied in sandbox_mode only
+    auction.worker_defaults['time_compression'] = '60'
+
+    auction.prepare_auction_document()
+
+    assert auction.auction_document['stages'][2]['start'] == \
+        '2017-12-12T00:05:30'
+
+    auction.worker_defaults['sandbox_mode'] = True
+
+    auction.prepare_auction_document()
+
+    assert len(auction.auction_document['stages']) == 87
+    assert auction.auction_document['stages'][2]['start'] == \
+        '2017-12-12T00:00:05.500000'
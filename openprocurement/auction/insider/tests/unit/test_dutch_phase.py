@@ -156,7 +156,8 @@ def test_add_dutch_winner(auction, logger, mocker):
         **{
             'bidder_name': 'test_bid',
             'bidder_id': 'test_bidder_id',
-            'dutch_winner': True
+            'dutch_winner': True,
+            'labels': auction.bidder_labels
         }
     )
     assert auction.auction_document['stages'][auction.auction_document['current_stage']]['stage_results'] == \
@@ -59,6 +59,7 @@ def test_form_handler_error_on_sealedbid(app, mocker):
     )
     magic_form = mocker.MagicMock()
     magic_form.validate.return_value = True
+    magic_form.data = {'bidder_id': 'test_bidder_id', 'bid': '35000'}
     app.application.config['auction']._end_sealedbid = Event()
     app.application.bids_form = mocker.MagicMock()
     app.application.bids_form.from_json.return_value = magic_form
@@ -80,6 +81,7 @@ def test_form_handler_error_on_bestbid(app, mocker):
     )
     magic_form = mocker.MagicMock()
     magic_form.validate.return_value = True
+    magic_form.data = {'bidder_id': 'test_bidder_id', 'bid': '35000'}
     app.application.bids_form = mocker.MagicMock()
     app.application.bids_form.from_json.return_value = magic_form
     mocker.patch('openprocurement.auction.insider.forms.request', munchify({'json': {}, 'headers': {}}))
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import random
+from copy import deepcopy
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+from openprocurement.auction.insider.money import Money, to_cents,\
+    from_cents, format_cents
+from openprocurement.auction.insider.utils import calculate_next_amount
+
+
+def quantize(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'),
+                                        rounding=ROUND_HALF_UP)
+
+
+@pytest.mark.parametrize('amount', [
+    0, 1, -1, 35000, '35000.01', '35000.010', '-0.05', 0.1, 440000.0,
+    Decimal('33250.55'), Decimal('-1'), Decimal('1E+3'), Decimal('1.5E+1')
+])
+def test_to_cents_matches_quantize(amount):
+    assert from_cents(to_cents(amount)) == quantize(amount)
+
+
+@pytest.mark.parametrize('amount', [
+    '35000.005', '35000.0049', '-0.001', '-0.005', '0.995', '35000.00500',
+    Decimal('33250.555'), Decimal('1E-3'), 0.125
+])
+def test_to_cents_rounds_fraction_of_cent_half_up(amount):
+    assert from_cents(to_cents(amount)) == quantize(amount)
+
+
+@pytest.mark.parametrize('amount', [
+    'NaN', 'Infinity', '-Infinity', '1E+999999', 'abc', float('nan')
+])
+def test_to_cents_rejects_invalid_amounts(amount):
+    with pytest.raises(ValueError):
+        to_cents(amount)
+
+
+def test_to_cents_random_amounts_match_quantize():
+    rnd = random.Random(20171212)
+    for _ in xrange(10000):
+        amount = Decimal(rnd.randint(-10 ** 9, 10 ** 9)).scaleb(
+            -rnd.randint(0, 5)
+        )
+        assert from_cents(to_cents(amount)) == quantize(amount)
+        assert to_cents(str(amount)) == to_cents(amount)
+
+
+def test_calculate_next_amount_random_ladders_match_quantize():
+    rnd = random.Random(20171213)
+    for _ in xrange(500):
+        initial = Decimal(rnd.randint(100, 10 ** 9)).scaleb(
+            -rnd.randint(0, 3)
+        )
+        current = quantize(initial)
+        for _ in xrange(81):
+            expected = (current - initial * Decimal('0.01')).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            )
+            current = calculate_next_amount(initial, current)
+            assert current == expected
+
+
+def test_format_cents():
+    assert format_cents(3500000) == '35000.00'
+    assert format_cents(3500010) == '35000.10'
+    assert format_cents(-100) == '-1.00'
+    assert format_cents(-100, 0) == '-1'
+    assert format_cents(-150, 1) == '-1.5'
+
+
+@pytest.mark.parametrize('amount', [
+    '35000', '35000.00', '35000.1', '-1', 0.1, 440000.0, 35000, '-0.05',
+    Decimal('33250.55')
+])
+def test_money_str_matches_decimal(amount):
+    money = Money.from_amount(amount)
+    assert str(money) == str(Decimal(str(amount)))
+    assert money.for_json() == Decimal(str(amount))
+    assert str(Money.from_amount('35000.005')) == '35000.01'
+
+
+def test_money_compare():
+    money = Money.from_amount('33250.10', 'UAH')
+    assert money.cents == 3325010
+    assert money.currency == 'UAH'
+    assert money == Decimal('33250.1')
+    assert Decimal('33250.1') == money
+    assert money != -1
+    assert Money.from_amount(-1) == -1
+    assert Money(100) < money
+    assert money > Decimal('33250')
+    assert sorted([money, Money(1), Money(200)]) == [
+        Money(1), Money(200), money
+    ]
+    assert not Money(0)
+    assert money.for_json() == Decimal('33250.10')
+    assert str(money) == '33250.10'
+    assert deepcopy({'amount': money})['amount'] is money
+
+
+@pytest.mark.parametrize('money, other', [
+    (Money(3500000), 35000),
+    (Money(3500000), Decimal('35000.00')),
+    (Money(3500010), Decimal('35000.1')),
+    (Money(-100), -1),
+])
+def test_money_hash_matches_equal_numbers(money, other):
+    assert money == other
+    assert hash(money) == hash(other)
+    assert {other: 'amount'}[money] == 'amount'
+
+
+def test_money_is_not_equal_to_fraction_of_cent():
+    assert Money(3500001) != Decimal('35000.005')
+    assert Money(3500001) > Decimal('35000.005')
+    assert Money(10) != 0.1
+
+
+@pytest.mark.parametrize('other', [0.1, '1', None])
+def test_money_is_not_ordered_with_other_types(other):
+    with pytest.raises(TypeError):
+        Money(10) < other
+    with pytest.raises(TypeError):
+        Money(10) >= other
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+from time import time
+
+import iso8601
+import pytest
+
+from couchdb.client import Row
+from mock import MagicMock
+from pytz import timezone
+
+from openprocurement.auction.interfaces import IAuctionDatabridge
+
+from openprocurement.auction.insider import design
+from openprocurement.auction.insider.includeme import dutch
+from openprocurement.auction.insider.planning import InsiderPlanning,\
+    start_date_key
+
+
+TZ = timezone('Europe/Kiev')
+
+
+class PlannedDB(object):
+    """ Auctions database stand-in answering the planned view """
+
+    def __init__(self, planned):
+        self.planned = planned
+        self.view_requests = []
+
+    def view(self, name, wrapper=None, keys=(), **options):
+        self.view_requests.append((name, keys))
+        return [Row(id=key, key=key, value=list(self.planned[key]))
+                for key in keys if key in self.planned]
+
+
+@pytest.fixture
+def bridge():
+    bridge = MagicMock()
+    bridge.tz = TZ
+    bridge.re_planning = False
+    bridge.db = PlannedDB({})
+    return bridge
+
+
+def item(auction_id, status='active.auction', start=None):
+    start = start or datetime.now(TZ) + timedelta(days=1)
+    return {'id': auction_id, 'status': status,
+            'auctionPeriod': {'startDate': start.isoformat()}}
+
+
+def planned_at(start):
+    start_date = iso8601.parse_date(start.isoformat()).astimezone(TZ)
+    return (start_date_key(start_date), start_date_key(start_date))
+
+
+def test_plan_new_auction(bridge):
+    assert list(InsiderPlanning(bridge, item('a' * 32))) == [
+        ('planning', 'a' * 32, '')
+    ]
+    assert bridge.db.view_requests == [('insider/planned', ['a' * 32])]
+
+
+def test_skip_already_planned(bridge):
+    start = datetime.now(TZ) + timedelta(days=1)
+    bridge.db.planned['a' * 32] = planned_at(start)
+    bridge.db.planned['b' * 32] = planned_at(start + timedelta(hours=1))
+    assert list(InsiderPlanning(bridge, item('a' * 32, start=start))) == []
+    assert list(InsiderPlanning(bridge, item('b' * 32, start=start))) == [
+        ('planning', 'b' * 32, '')
+    ]
+    bridge.re_planning = True
+    assert list(InsiderPlanning(bridge, item('a' * 32, start=start))) == [
+        ('planning', 'a' * 32, '')
+    ]
+
+
+def test_skip_start_date_in_past(bridge):
+    start = datetime.now(TZ) - timedelta(minutes=1)
+    assert list(InsiderPlanning(bridge, item('a' * 32, start=start))) == []
+
+
+def test_no_lookup_without_start_date(bridge):
+    feed_item = {'id': 'a' * 32, 'status': 'active.qualification'}
+    assert list(InsiderPlanning(bridge, feed_item)) == []
+    feed_item = item('a' * 32)
+    feed_item['auctionPeriod']['endDate'] = datetime.now(TZ).isoformat()
+    assert list(InsiderPlanning(bridge, feed_item)) == []
+    assert bridge.db.view_requests == []
+
+
+def test_cancel_only_future_auctions(bridge):
+    now = time() * 1000
+    bridge.db.planned['a' * 32] = (now + 60000, now + 60000)
+    bridge.db.planned['b' * 32] = (now - 60000, now - 60000)
+    assert list(InsiderPlanning(bridge, item('a' * 32, 'cancelled'))) == [
+        ('cancel', 'a' * 32, '')
+    ]
+    assert list(InsiderPlanning(bridge, item('b' * 32, 'cancelled'))) == []
+    assert list(InsiderPlanning(bridge, item('c' * 32, 'cancelled'))) == []
+
+
+def test_plugin_syncs_view_on_bridge_start(bridge, mocker):
+    sync_many = mocker.patch.object(design.ViewDefinition, 'sync_many')
+    components = MagicMock()
+    components.queryUtility.side_effect = lambda interface: \
+        bridge if interface is IAuctionDatabridge else None
+    mocker.patch('openprocurement.auction.insider.includeme._includeme')
+
+    dutch(components, ['dgfInsider'])
+    sync_many.assert_called_once_with(bridge.db, [design.planned_view])
+
+    components.queryUtility.side_effect = lambda interface: None
+    dutch(components, ['dgfInsider'])
+    assert sync_many.call_count == 1
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import gevent
+
+from gevent.queue import Queue
+
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.profiler import SamplingProfiler,\
+    greenlet_stacks, memory_report, deep_size
+from openprocurement.auction.insider.server import app as server_app,\
+    prepare_admin_token
+
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+
+
+def busy_loop(seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        sum(range(100))
+
+
+def test_sampling_profiler_sees_busy_function():
+    profiler = SamplingProfiler(interval=0.001).start(5)
+    busy_loop(0.2)
+    profiler.stop()
+
+    # every frame of the stack has the same count, don't cut ties off
+    report = profiler.report(limit=None)
+    assert report['samples'] > 0
+    assert any(label.startswith('busy_loop ')
+               for label, _ in report['cumulative'])
+
+
+def test_greenlet_stacks_show_waiting_greenlets():
+    def waiting_for_event():
+        gevent.sleep(10)
+
+    greenlet = gevent.spawn(waiting_for_event)
+    gevent.sleep(0)
+    try:
+        stacks = greenlet_stacks()
+    finally:
+        greenlet.kill()
+
+    assert any('waiting_for_event' in ''.join(entry['stack'])
+               for entry in stacks)
+
+
+def test_memory_report(auction, mocker):
+    mocker.patch.object(server_app, 'auction_bidders', {
+        'bidder': {'clients': {}, 'channels': {'a': Queue(), 'b': Queue()}}
+    })
+    mocker.patch.object(server_app, 'logins_cache', {'token': 'bidder'})
+    server_app.auction_bidders['bidder']['channels']['a'].put('event')
+    auction.auction_document = {'stages': [{'type': 'pause'}]}
+    auction._bids_data = BidsData()
+    auction._bids_data.add({'bidder_id': 'bidder', 'amount': 100,
+                            'time': '2017-07-14T05:40:00+03:00'})
+
+    report = memory_report(auction, server_app)
+
+    assert report['lengths'] == {'_bids_data': 1, 'logins_cache': 1,
+                                 'sse_channels': 2, 'sse_queued': 1}
+    assert report['sizes']['auction_document'] == \
+        deep_size(auction.auction_document) > 0
+    assert report['sizes']['_bids_data'] > 0
+    assert report['allocations'] is None
+    assert 'dict' in dict(report['objects'])
+
+
+def test_admin_endpoints_need_local_token(mocker):
+    auction = mocker.MagicMock()
+    auction.codec.dumps = json.dumps
+    mocker.patch.dict(server_app.config, {'auction': auction,
+                                          'admin_token': 'secret'})
+    mocker.patch.object(server_app, 'profiler', None)
+    client = server_app.test_client()
+    admin = {'X-Admin-Token': 'secret'}
+
+    for path in ('/admin/profile', '/admin/stacks', '/admin/memory'):
+        res = client.get(path, environ_base={'REMOTE_ADDR': '10.0.0.8'},
+                         headers=admin)
+        assert res.status_code == 403
+        # the shared proxy runs on the worker host
+        assert client.get(path, environ_base=LOCAL).status_code == 403
+        res = client.get(path, environ_base=LOCAL,
+                         headers={'X-Admin-Token': 'guess'})
+        assert res.status_code == 403
+
+    res = client.get('/admin/profile', environ_base=LOCAL, headers=admin)
+    assert res.status_code == 404
+
+    res = client.post('/admin/profile?seconds=5', environ_base=LOCAL,
+                      headers=admin)
+    assert res.status_code == 202
+    res = client.post('/admin/profile?seconds=5', environ_base=LOCAL,
+                      headers=admin)
+    assert res.status_code == 409
+    res = client.delete('/admin/profile', environ_base=LOCAL, headers=admin)
+    assert res.status_code == 200
+    assert 'samples' in json.loads(res.data)
+
+    res = client.get('/admin/stacks', environ_base=LOCAL, headers=admin)
+    assert res.status_code == 200
+    assert json.loads(res.data)['greenlets']
+
+
+def test_prepare_admin_token(mocker, tmpdir):
+    auction = mocker.MagicMock()
+    auction.auction_doc_id = 'UA-1'
+    auction.worker_defaults = {'admin_token': 'configured'}
+    assert prepare_admin_token(auction) == 'configured'
+
+    auction.worker_defaults = {'journal_dir': str(tmpdir)}
+    token = prepare_admin_token(auction)
+    token_file = tmpdir.join('UA-1.admin')
+    assert token_file.read() == token
+    assert token_file.stat().mode & 0o777 == 0o600
+    assert prepare_admin_token(auction) != token
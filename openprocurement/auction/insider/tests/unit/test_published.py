@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import json
+
+from openprocurement.auction.insider.server import app as server_app
+
+
+def test_saved_document_is_served_from_memory(auction, mocker):
+    auction.generate_request_id()
+    auction.db = mocker.MagicMock()
+    auction.db.save.return_value = ('auction', '2-a')
+    auction.auction_document = {'_id': 'auction', '_rev': '1-a',
+                                'current_stage': 3}
+    mocker.patch.dict(server_app.config, {'auction': auction})
+    client = server_app.test_client()
+
+    assert client.get('/auction').status_code == 404
+
+    dumps = mocker.spy(auction.published.codec, 'dumps')
+    auction.save_auction_document()
+    auction.save_auction_document()
+    assert not dumps.called  # serialized when it is asked for
+    res = client.get('/auction')
+    assert res.status_code == 200
+    assert dumps.call_count == 1
+    assert json.loads(res.data) == {'_id': 'auction', '_rev': '2-a',
+                                    'current_stage': 3}
+    etag = res.headers['ETag']
+    assert etag == '"2-a-2"'
+
+    res = client.get('/auction', headers={'If-None-Match': etag})
+    assert res.status_code == 304
+    assert res.data == ''
+    client.get('/auction')
+    assert dumps.call_count == 1
+    assert auction.db.get.call_count == 0
+
+    auction.auction_document['current_stage'] = 4
+    auction.db.save.return_value = ('auction', '3-a')
+    auction.save_auction_document()
+    res = client.get('/auction', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert json.loads(res.data)['current_stage'] == 4
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+
+from openprocurement.auction.insider.constants import DUTCH, SEALEDBID
+from openprocurement.auction.insider.ratelimit import RateLimiter,\
+    POSTBID, EVENT_SOURCE, RATE_LIMITS
+from openprocurement.auction.insider.server import app as server_app
+
+
+def limiter(limits):
+    clock = [0.0]
+    return RateLimiter(limits, clock=lambda: clock[0]), clock
+
+
+def test_budgets_depend_on_phase():
+    rate_limiter, clock = limiter({POSTBID: {'default': (1.0, 1),
+                                             DUTCH: (10.0, 3)}})
+
+    assert [rate_limiter.take(POSTBID, DUTCH, 'b', 'c')
+            for _ in range(4)] == [0, 0, 0, 0.1]
+    # a bucket of its own in every phase
+    assert rate_limiter.take(POSTBID, SEALEDBID, 'b', 'c') == 0
+    assert rate_limiter.take(POSTBID, SEALEDBID, 'b', 'c') == 1.0
+    clock[0] += 1
+    assert rate_limiter.take(POSTBID, SEALEDBID, 'b', 'c') == 0
+
+    assert rate_limiter.metrics() == {
+        'allowed': {POSTBID: 5}, 'rejected': {POSTBID: 2}, 'buckets': 2
+    }
+
+
+def test_limiter_from_config():
+    rate_limiter = RateLimiter.from_config(
+        {'rate_limits': {EVENT_SOURCE: {'default': [1, 10]}}}
+    )
+    assert rate_limiter.budget(EVENT_SOURCE, DUTCH) == (1, 10)
+    assert rate_limiter.budget(POSTBID, DUTCH) == RATE_LIMITS[POSTBID][DUTCH]
+    assert RateLimiter.from_config({}).limits == RATE_LIMITS
+
+    assert RateLimiter.from_config(
+        {'rate_limits': {'enabled': False}}
+    ) is None
+
+
+def test_endpoints_short_circuit(mocker):
+    auction = mocker.MagicMock()
+    auction.codec.dumps = json.dumps
+    auction.snapshot = {'current_phase': SEALEDBID}
+    mocker.patch.dict(server_app.config, {'auction': auction})
+    form_handler = mocker.patch.object(server_app, 'form_handler',
+                                       create=True)
+    get_bidder_id = mocker.patch(
+        'openprocurement.auction.insider.event_source.get_bidder_id'
+    )
+    rate_limiter, clock = limiter({POSTBID: {'default': (1.0, 1)},
+                                   EVENT_SOURCE: {'default': (0.5, 1)}})
+    mocker.patch.object(server_app, 'rate_limiter', rate_limiter)
+    client = server_app.test_client()
+    with client.session_transaction() as session:
+        session['login_bidder_id'] = 'bidder'
+        session['client_id'] = 'client'
+
+    assert client.post('/postbid', data='{}').status_code == 401
+    res = client.post('/postbid', data='{}')
+    assert res.status_code == 429
+    assert res.headers['Retry-After'] == '1'
+    assert json.loads(res.data)['status'] == 'failed'
+    assert not form_handler.called
+
+    client.get('/event_source')
+    res = client.get('/event_source')
+    assert res.status_code == 200
+    assert res.data == 'retry: 2000\n\n'
+    assert not get_bidder_id.called
+
+    assert rate_limiter.rejected == {POSTBID: 1, EVENT_SOURCE: 1}
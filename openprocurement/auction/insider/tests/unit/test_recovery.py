@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+from copy import deepcopy
+from decimal import Decimal
+
+from dateutil.tz import tzutc
+
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.clock import VirtualClock
+from openprocurement.auction.insider.codec import get_codec
+from openprocurement.auction.insider.constants import DUTCH, SEALEDBID,\
+    BESTBID, PRESEALEDBID, PREBESTBID, END
+from openprocurement.auction.insider.money import Money
+from openprocurement.auction.insider.recovery import AuctionJournal,\
+    restore_state
+from openprocurement.auction.insider.utils import prepare_audit
+
+
+def journal_for(tmpdir, **kwargs):
+    return AuctionJournal(str(tmpdir.join('auction.journal')),
+                          get_codec(), **kwargs)
+
+
+def simulated_auction():
+    """ Journal records written by a worker during an auction """
+    records = [{'op': 'mapping', 'value': {'a' * 32: 1, 'b' * 32: 2}},
+               {'op': 'set', 'path': ['timeline', 'auction_start', 'time'],
+                'value': 'start'}]
+    for turn in range(1, 6):
+        records.append({
+            'op': 'set', 'path': ['timeline', DUTCH, 'turn_{}'.format(turn)],
+            'value': {'amount': Decimal(35000 - turn * 350), 'time': 'turn'}
+        })
+    records.append({'op': 'bid', 'phase': DUTCH, 'bid': {
+        'bidder_id': 'a' * 32, 'amount': Money(3325000, 'UAH'),
+        'time': 'dutch', 'dutch_winner': True
+    }})
+    for index in range(20):
+        records.append({'op': 'bid', 'phase': SEALEDBID, 'bid': {
+            'bidder_id': 'b' * 32, 'amount': Money(3400000 + index, 'UAH'),
+            'time': 'sealedbid {}'.format(index)
+        }})
+    records.append({'op': 'set',
+                    'path': ['timeline', SEALEDBID, 'timeline', 'end'],
+                    'value': 'end'})
+    records.append({'op': 'bid', 'phase': BESTBID, 'bid': {
+        'bidder_id': 'a' * 32, 'amount': Money(3500000, 'UAH'),
+        'time': 'bestbid', 'dutch_winner': True
+    }})
+    return records
+
+
+def restored(auction, records):
+    auction.auction_document = {'value': {'currency': 'UAH'}}
+    auction.audit = prepare_audit(auction)
+    auction.mapping = {}
+    auction._bids_data = BidsData()
+    restore_state(auction, records)
+    return auction.audit, auction.mapping, auction._bids_data
+
+
+def test_disabled_journal(auction, tmpdir):
+    journal = AuctionJournal(None, get_codec())
+    journal.open(reset=True)
+    journal.bid(SEALEDBID, {'bidder_id': 'a'})
+    journal.close()
+    assert not journal.enabled
+    assert journal.records() == []
+    assert AuctionJournal.for_auction(
+        {'journal_dir': str(tmpdir)}, 'UA-1', get_codec()
+    ).path == os.path.join(str(tmpdir), 'UA-1.journal')
+
+
+def test_journal_keeps_records(auction, tmpdir):
+    records = simulated_auction()
+    journal = journal_for(tmpdir, sync_every=4)
+    journal.open(reset=True)
+    for record in records:
+        journal.write(record)
+    journal.close()
+
+    restored_records = journal.records()
+    assert len(restored_records) == len(records)
+    audit, mapping, bids_data = restored(auction, restored_records)
+    assert mapping == {'a' * 32: 1, 'b' * 32: 2}
+    assert audit['timeline']['auction_start']['time'] == 'start'
+    assert audit['timeline'][DUTCH]['turn_5']['amount'] == Decimal('33250')
+    assert audit['timeline'][SEALEDBID]['timeline']['end'] == 'end'
+    assert len(audit['timeline'][SEALEDBID]['bids']) == 20
+    assert audit['timeline'][BESTBID]['bids'][0]['dutch_winner'] is True
+    assert bids_data.top().amount == Money(3500000, 'UAH')
+    assert bids_data.top().amount.currency == 'UAH'
+    assert bids_data.latest('b' * 32)['amount'] == Decimal('34000.19')
+
+    journal.open(reset=True)
+    journal.close()
+    assert journal.records() == []
+
+
+def test_crash_at_random_points(auction, tmpdir):
+    """
+    Worker is killed at random byte of the journal. Restored state is the
+    state after the last complete record, and writing can go on.
+    """
+    records = simulated_auction()
+    journal = journal_for(tmpdir)
+    journal.open(reset=True)
+    ends = []
+    for record in records:
+        journal.write(record)
+        ends.append(os.path.getsize(journal.path))
+    journal.close()
+    with open(journal.path, 'rb') as stream:
+        data = stream.read()
+
+    generator = random.Random(31)
+    for cut in [0, len(data)] + [generator.randint(1, len(data) - 1)
+                                 for _ in range(30)]:
+        with open(journal.path, 'wb') as stream:
+            stream.write(data[:cut])
+        complete = len([end for end in ends if end <= cut])
+
+        assert restored(auction, journal.records()) == \
+            deepcopy(restored(auction, records[:complete]))
+
+        journal.open()
+        journal.write(records[-1])
+        journal.close()
+        assert len(journal.records()) == complete + 1
+
+
+# 2017-01-01T12:00:00+02:00, start of the auction below
+AUCTION_START = 1483264800
+
+
+def resumable_stages():
+    stages = [{'type': 'pause', 'start': '2017-01-01T12:00:00+02:00'}]
+    stages += [{'type': DUTCH + '_{}'.format(i), 'amount': Decimal(1),
+                'start': '2017-01-01T12:0{}:00+02:00'.format(i)}
+               for i in range(1, 4)]
+    stages += [{'type': stage_type, 'start': '2017-01-01T12:30:00+02:00'}
+               for stage_type in (PRESEALEDBID, SEALEDBID, PREBESTBID,
+                                  BESTBID, END)]
+    return stages
+
+
+def test_resume_auction_schedules_remaining_stages(auction, mocker, tmpdir):
+    stages = resumable_stages()
+    auction.clock = VirtualClock(AUCTION_START + 600, tzutc())
+    document = {'_rev': '1', 'current_stage': 5, 'current_phase': SEALEDBID,
+                'value': {'currency': 'UAH'}, 'stages': stages,
+                'results': [], 'test_auction_data': auction._auction_data}
+    mocker.patch.object(auction, 'get_auction_document',
+                        return_value=document)
+    auction.auction_document = document
+    auction.journal = journal_for(tmpdir)
+    auction.journal.open(reset=True)
+    for record in simulated_auction()[:-3]:
+        auction.journal.write(record)
+    auction.journal.close()
+    add_job = mocker.patch(
+        'openprocurement.auction.insider.auction.SCHEDULER.add_job'
+    )
+    run_server = mocker.patch(
+        'openprocurement.auction.insider.server.run_server'
+    )
+    spawn = mocker.patch('openprocurement.auction.insider.auction.spawn')
+
+    assert auction.resume_auction() is True
+
+    assert [call[1]['id'] for call in add_job.call_args_list] == [
+        'auction:{}'.format(PREBESTBID), 'auction:{}'.format(BESTBID),
+        'auction:{}'.format(END)
+    ]
+    assert run_server.called
+    spawn.assert_called_once_with(auction.add_bid)
+    assert not auction._end_sealedbid.is_set()
+    assert len(auction.audit['timeline'][SEALEDBID]['bids']) == 19
+    assert auction._bids_data.latest('a' * 32)['dutch_winner'] is True
+    assert auction.bid_validator.phase == SEALEDBID
+    auction.journal.close()
+
+
+def test_resume_auction_jumps_to_due_dutch_stage(auction, mocker):
+    document = {'current_stage': 0, 'current_phase': 'pre-started',
+                'stages': resumable_stages()}
+    auction.auction_document = document
+    auction.clock = VirtualClock(AUCTION_START + 200, tzutc())
+    mocker.patch.object(auction, 'get_auction_document',
+                        return_value=document)
+    save = mocker.patch.object(auction, 'save_auction_document')
+    next_stage = mocker.patch.object(auction, 'next_stage')
+
+    assert auction.due_stage(0) == 3
+    assert auction.catch_up_stages(0) == 3
+
+    # the first step starts the dutch phase, the second one is skipped
+    assert next_stage.call_args_list == [
+        mocker.call(document['stages'][1]), mocker.call(document['stages'][3])
+    ]
+    assert document['current_stage'] == 2
+    assert document['stages'][1]['passed'] is True
+    assert save.called
+
+
+def test_resume_auction_runs_missed_phases(auction, mocker):
+    document = {'current_stage': 3, 'current_phase': DUTCH,
+                'stages': resumable_stages()}
+    auction.auction_document = document
+    auction.clock = VirtualClock(AUCTION_START + 1800, tzutc())
+    calls = []
+    for name in ('end_dutch', 'switch_to_sealedbid', 'end_sealedbid',
+                 'switch_to_bestbid', 'end_bestbid'):
+        mocker.patch.object(auction, name, side_effect=(
+            lambda stage, name=name: calls.append((name, stage['type']))
+        ))
+
+    assert auction.catch_up_stages(3) == 8
+    assert calls == [
+        ('end_dutch', PRESEALEDBID), ('switch_to_sealedbid', SEALEDBID),
+        ('end_sealedbid', PREBESTBID), ('switch_to_bestbid', BESTBID),
+        ('end_bestbid', END)
+    ]
+
+
+def test_resume_finished_auction(auction, mocker):
+    mocker.patch.object(auction, 'get_auction_document', return_value={
+        'current_stage': -100, 'current_phase': DUTCH
+    })
+    auction.auction_document = auction.get_auction_document()
+    add_job = mocker.patch(
+        'openprocurement.auction.insider.auction.SCHEDULER.add_job'
+    )
+    assert auction.resume_auction() is False
+    assert not add_job.called
@@ -4,11 +4,13 @@ from gevent.event import Event
 
 import pytest
 
+from openprocurement.auction.insider.bids import BidsData
+from openprocurement.auction.insider.bids_queue import BidsQueue
 from openprocurement.auction.insider.constants import SEALEDBID, PREBESTBID
 
 
 def test_add_bid(auction, logger, mocker):
-    auction.bids_queue = Queue()
+    auction.bids_queue = BidsQueue()
     auction._end_sealedbid = Event()
 
     mock_bids_queue = mocker.patch.object(auction, 'bids_queue', autospec=True)
@@ -17,11 +19,12 @@ def test_add_bid(auction, logger, mocker):
     mock_bids_queue.empty.side_effect = (_ for _ in range(4))
     mock_end_sealedbid.is_set.side_effect = [False, False, True]
 
-    mock_bids_queue.get.return_value = {  # TODO: change to side_effect!!!!
+    bid = {
         'bidder_id': 'test_bid_id',
         'amount': 440000.0,
         'time': 'test_time_value'
     }
+    mock_bids_queue.get_bids.return_value = [bid]
 
     auction.audit = {
         'timeline':
@@ -49,7 +52,7 @@ def test_add_bid(auction, logger, mocker):
     """
 
     assert log_strings[0] == 'Started bids worker'
-    assert mock_bids_queue.get.call_count == 3
+    assert mock_bids_queue.get_bids.call_count == 3
     assert log_strings[1:4] == [
         'Adding bid test_bid_id with value 440000.0 on test_time_value',
         'Adding bid test_bid_id with value 440000.0 on test_time_value',
@@ -71,13 +74,11 @@ def test_add_bid(auction, logger, mocker):
         {'bidder_id': 'test_bid_id', 'amount': 440000.0, 'time': 'test_time_value'}
     ]
 
-    assert mock_sleep.call_count == 3
-    assert mock_sleep.call_args_list[0][0] == (0.1,)
-    assert mock_sleep.call_args_list[1][0] == (0.1,)
-    assert mock_sleep.call_args_list[2][0] == (0.1,)
+    # the worker waits in get_bids only, not between bids
+    assert not mock_sleep.called
     assert log_strings[-2] == "Bids queue done. Breaking worker"
 
-    mock_bids_queue.get.return_value['amount'] = -1
+    bid['amount'] = -1
     mock_bids_queue.empty.side_effect = (_ for _ in range(4))
     mock_end_sealedbid.is_set.side_effect = [False, False, True]
     auction.add_bid()
@@ -96,11 +97,12 @@ def test_add_bid(auction, logger, mocker):
     assert mock_bids_queue.empty.call_count == 8
     assert mock_end_sealedbid.is_set.call_count == 6
 
+    # bids are stored as records, so earlier bids keep their amount
     assert auction._bids_data == {
         'test_bid_id': [
-            {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'},
-            {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'},
-            {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'},
+            {'bidder_id': 'test_bid_id', 'amount': 440000.0, 'time': 'test_time_value'},
+            {'bidder_id': 'test_bid_id', 'amount': 440000.0, 'time': 'test_time_value'},
+            {'bidder_id': 'test_bid_id', 'amount': 440000.0, 'time': 'test_time_value'},
             {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'},
             {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'},
             {'bidder_id': 'test_bid_id', 'amount': -1, 'time': 'test_time_value'}
@@ -110,18 +112,15 @@ def test_add_bid(auction, logger, mocker):
     assert len(auction.audit['timeline'][SEALEDBID]['bids']) == 6
 
     assert auction.audit['timeline'][SEALEDBID]['bids'] == [
-        {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
-        {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
-        {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
+        {'amount': 440000.0, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
+        {'amount': 440000.0, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
+        {'amount': 440000.0, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
         {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
         {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'},
         {'amount': -1, 'bidder_id': 'test_bid_id', 'time': 'test_time_value'}
     ]
 
-    assert mock_sleep.call_count == 6
-    assert mock_sleep.call_args_list[3][0] == (0.1,)
-    assert mock_sleep.call_args_list[4][0] == (0.1,)
-    assert mock_sleep.call_args_list[5][0] == (0.1,)
+    assert not mock_sleep.called
 
 
 def test_switch_to_sealedbid(auction, logger, mocker):
@@ -200,13 +199,13 @@ def test_end_sealedbid(auction, mocker, logger):
     mock_bids_queue.empty = mocker.MagicMock()
     mock_bids_queue.empty.side_effect = [False, True]
 
-    auction._bids_data = {'test_bidder_id': [{
+    auction._bids_data = BidsData({'test_bidder_id': [{
             'bidder_name': 'test_bid',
             'bidder_id': 'test_bidder_id',
             'time': 0,
             'amount': 450000.0,
             'dutch_winner': True}]
-    }
+    })
     mock_end_auction = mocker.patch.object(auction, 'end_auction', autospec=True)
 
     # No bids on sealedbid phase
@@ -225,19 +224,17 @@ def test_end_sealedbid(auction, mocker, logger):
     assert log_strings[-2] == "No bids on sealedbid phase. End auction now!"
     assert mock_end_auction.call_count == 1
 
-    auction._bids_data.update({'test_bidder_id_2': [{
+    auction._bids_data.add({
         'bidder_name': 'test_bid_2',
         'bidder_id': 'test_bidder_id_2',
         'time': 0,
-        'amount': 500001.0}
-    ]})
+        'amount': 500001.0})
 
-    auction._bids_data.update({'test_bidder_id_3': [{
+    auction._bids_data.add({
         'bidder_name': 'test_bid_3',
         'bidder_id': 'test_bidder_id_3',
         'time': 0,
-        'amount': 500000.0}
-    ]})
+        'amount': 500000.0})
 
     auction.auction_document = {
         'initial_value': 'initial_value',
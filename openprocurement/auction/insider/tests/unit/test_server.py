@@ -501,3 +501,28 @@ def test_server_kickclient(app):
     assert res.status == '200 OK'
     assert res.status_code == 200
     assert json.loads(res.data)['status'] == 'ok'
+
+
+def test_server_health_is_local_only(mocker):
+    from openprocurement.auction.insider.server import app
+    auction = mocker.MagicMock()
+    auction.codec.dumps = json.dumps
+    auction.db_metrics.return_value = {'state': 'closed'}
+    auction.hub_metrics.return_value = {'blocks': 0}
+    auction.bids_queue.metrics.return_value = {'depth': 0}
+    mocker.patch.dict(app.config, {'auction': auction})
+    mocker.patch.object(app, 'rate_limiter', None)
+    client = app.test_client()
+
+    res = client.get('/health', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert res.status_code == 200
+    assert json.loads(res.data) == {'db': {'state': 'closed'},
+                                    'hub': {'blocks': 0},
+                                    'rate_limits': {},
+                                    'bids_queue': {'depth': 0}}
+
+    res = client.get('/health', environ_base={'REMOTE_ADDR': '10.0.0.8'})
+    assert res.status_code == 403
+    res = client.get('/health', environ_base={'REMOTE_ADDR': '127.0.0.1'},
+                     headers={'X-Forwarded-For': '10.0.0.8'})
+    assert res.status_code == 403
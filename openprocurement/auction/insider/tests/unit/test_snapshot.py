@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from copy import deepcopy
+from decimal import Decimal
+
+import pytest
+
+from openprocurement.auction.insider.codec import CODECS, get_codec
+from openprocurement.auction.insider.constants import DUTCH, PRESEALEDBID
+from openprocurement.auction.insider.ratelimit import check_rate_limit,\
+    POSTBID
+from openprocurement.auction.insider.snapshot import snapshot, FrozenDict,\
+    FrozenList
+
+
+DOCUMENT = {
+    '_id': 'auction',
+    'current_stage': 1,
+    'stages': [{'type': 'pause'}, {'type': 'dutch_0',
+                                   'amount': Decimal('35000.00')}],
+    'results': [],
+    'value': {'amount': Decimal('35000.00'), 'currency': 'UAH'},
+}
+
+
+def test_snapshot_is_read_only():
+    frozen = snapshot(DOCUMENT)
+
+    with pytest.raises(TypeError):
+        frozen['current_stage'] = 2
+    with pytest.raises(TypeError):
+        frozen['stages'].append({})
+    with pytest.raises(TypeError):
+        frozen['value'].update(amount=1)
+
+    copied = deepcopy(frozen)
+    copied['stages'][0]['time'] = 'now'
+    assert type(copied['stages']) is list
+    assert frozen['stages'][0] == {'type': 'pause'}
+
+
+def test_snapshot_shares_unchanged_values():
+    document = deepcopy(DOCUMENT)
+    first = snapshot(document)
+
+    document['stages'][1]['passed'] = True
+    document['results'].append({'bidder_id': 'bidder'})
+    second = snapshot(document, first)
+
+    assert second == document
+    assert second['stages'][0] is first['stages'][0]
+    assert second['stages'][1] is not first['stages'][1]
+    assert second['value'] is first['value']
+    assert isinstance(second['results'], FrozenList)
+    assert isinstance(second['results'][0], FrozenDict)
+    # the live document is not shared
+    document['stages'][0]['time'] = 'now'
+    assert 'time' not in second['stages'][0]
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+def test_snapshot_is_encoded_as_document(name):
+    codec = get_codec(name)
+    encoded = codec.dumps(dict(snapshot(DOCUMENT)))
+    assert codec.loads(encoded) == DOCUMENT
+    assert '35000.00' in encoded
+
+
+def test_save_auction_document_saves_snapshot(auction, mocker):
+    auction.generate_request_id()
+    auction.db = mocker.MagicMock()
+    auction.db.save.return_value = ('auction', '2-a')
+    auction.auction_document = deepcopy(DOCUMENT)
+    deepcopy_ = mocker.patch('openprocurement.auction.insider.mixins.deepcopy')
+
+    auction.save_auction_document()
+    first = auction.snapshot
+    saved = auction.db.save.call_args[0][0]
+    assert saved == DOCUMENT
+    assert saved['stages'] is first['stages']
+
+    auction.auction_document['current_stage'] = 2
+    auction.save_auction_document()
+    assert auction.snapshot['current_stage'] == 2
+    assert auction.snapshot['stages'] is not first['stages']
+    assert auction.snapshot['stages'][1] is first['stages'][1]
+    assert not deepcopy_.called
+
+
+def test_readers_use_snapshot(auction, mocker):
+    auction.auction_document = deepcopy(DOCUMENT)
+    auction.auction_document['current_phase'] = DUTCH
+    auction.update_bid_validator()
+    validated = auction.snapshot
+
+    # changes of the live document under the lock are not seen
+    # until the next stage switch or save
+    auction.auction_document['current_phase'] = PRESEALEDBID
+    auction.auction_document['stages'][1]['amount'] = Decimal('1')
+    assert auction.bid_validator.threshold == 3500000
+    app = mocker.MagicMock()
+    app.config = {'auction': auction}
+    check_rate_limit(app, {'client_id': 'c'}, POSTBID)
+    assert app.rate_limiter.take.call_args[0][1] == DUTCH
+
+    auction.update_bid_validator()
+    assert auction.bid_validator.phase == PRESEALEDBID
+    assert auction.snapshot['stages'][0] is validated['stages'][0]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from copy import deepcopy
+
+from iso8601 import parse_date
+
+from openprocurement.auction.insider.constants import DUTCH, DUTCH_ROUNDS,\
+    PRESEALEDBID, SEALEDBID, END
+from openprocurement.auction.insider.tests.data.data import tender_data
+from openprocurement.auction.insider.timeline import Timeline, PAUSE,\
+    to_timestamp
+from openprocurement.auction.insider.utils import prepare_auction_document
+
+
+def prepared(auction):
+    auction._auction_data = deepcopy(tender_data)
+    auction.startDate = parse_date('2017-07-14T05:40:00+03:00')
+    auction.auction_document = {}
+    prepare_auction_document(auction)
+    return auction.auction_document
+
+
+def test_timeline_indexes_stages(auction):
+    document = prepared(auction)
+
+    timeline = Timeline(document['stages'])
+
+    assert len(timeline) == DUTCH_ROUNDS + 6
+    assert timeline.kinds[0] == PAUSE
+    assert timeline.dutch_steps == range(1, DUTCH_ROUNDS + 1)
+    assert timeline.index(PRESEALEDBID) == DUTCH_ROUNDS + 1
+    assert timeline.stage(END) is document['stages'][-1]
+    assert timeline.index('unknown') is None
+    assert timeline.starts[0] == 1500000000
+    assert timeline.starts[-1] == to_timestamp(document['stages'][-1]['start'])
+
+
+def test_auction_timeline_follows_document(auction):
+    document = prepared(auction)
+
+    timeline = auction.timeline
+    assert auction.timeline is timeline
+
+    document['stages'] = document['stages'][:3]
+    assert auction.timeline is not timeline
+    assert len(auction.timeline) == 3
+
+
+def test_schedule_stages_from_timeline(auction, mocker):
+    document = prepared(auction)
+    add_job = mocker.patch(
+        'openprocurement.auction.insider.auction.SCHEDULER.add_job'
+    )
+
+    auction.schedule_stages(DUTCH_ROUNDS)
+
+    calls = add_job.call_args_list
+    assert [call[1]['id'] for call in calls] == [
+        'auction:{}-{}'.format(DUTCH, DUTCH_ROUNDS),
+        'auction:{}'.format(PRESEALEDBID), 'auction:{}'.format(SEALEDBID),
+        'auction:pre-bestbid', 'auction:bestbid', 'auction:announcement'
+    ]
+    assert calls[1][0][0] == auction.end_dutch
+    for call, stage in zip(calls, document['stages'][DUTCH_ROUNDS:]):
+        assert call[1]['run_date'] == parse_date(stage['start'])
+        assert call[1]['args'] == (stage,)
+
+
+def test_end_dutch_moves_to_presealedbid(auction, mocker):
+    document = prepared(auction)
+    mocker.patch('openprocurement.auction.insider.mixins.spawn')
+    document['current_stage'] = 5
+    document['results'] = [{'bidder_id': 'bidder', 'amount': 100}]
+    auction.audit = {'timeline': {DUTCH: {'timeline': {}}}}
+
+    auction.end_dutch()
+
+    assert document['stages'][5]['passed'] is True
+    assert document['current_stage'] == DUTCH_ROUNDS + 1
+    assert document['current_phase'] == PRESEALEDBID
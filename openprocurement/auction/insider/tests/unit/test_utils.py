@@ -3,20 +3,23 @@ from copy import deepcopy
 from datetime import timedelta
 from decimal import Decimal
 
-from dateutil.tz import tzlocal
+from dateutil.tz import tzutc
 from iso8601 import iso8601
 
+import gevent
 import pytest
 
 from openprocurement.auction.insider.constants import (
-    DUTCH, SEALEDBID, BESTBID, DUTCH_TIMEDELTA, DUTCH_ROUNDS
+    DUTCH, SEALEDBID, BESTBID, DUTCH_TIMEDELTA, DUTCH_ROUNDS, FIRST_PAUSE,
+    END_PHASE_PAUSE, SEALEDBID_TIMEDELTA, BESTBID_TIMEDELTA
 )
+from openprocurement.auction.insider.clock import VirtualClock
 from openprocurement.auction.insider.tests.data.data import tender_data
 from openprocurement.auction.insider.utils import (
     prepare_results_stage, calculate_next_amount,
     prepare_timeline_stage, prepare_audit, get_dutch_winner,
     announce_results_data, post_results_data, update_auction_document,
-    lock_bids, update_stage, prepare_auction_document
+    lock_bids, update_stage, prepare_auction_document, retry_sleep
 )
 
 
@@ -60,6 +63,17 @@ def test_prepare_results_stage(bidder_id,
     assert result == expected
 
 
+def test_prepare_results_stage_shares_bidder_label():
+    labels = {}
+    first = prepare_results_stage('a', 1, 100, labels=labels)
+    second = prepare_results_stage('a', 1, 200, labels=labels)
+    other = prepare_results_stage('b', 2, 100, labels=labels)
+
+    assert first['label'] is second['label'] is labels['a']
+    assert other['label']['en'] == 'Bidder #2'
+    assert sorted(labels) == ['a', 'b']
+
+
 @pytest.mark.parametrize(
     'initial_value, current_value, expected',
     [
@@ -632,8 +646,26 @@ def test_lock_bids(auction, mocker):
         # TODO: write proper asserts
 
 
-@pytest.mark.parametrize('run_time', ['run_time_value', 12345, '12345', '2014-11-19T12:00:00+00:00'])
-def test_update_stage(auction, mocker, run_time):
+def test_retry_sleep_releases_bids_lock(auction):
+    def stage_switch():
+        with lock_bids(auction):
+            retry_sleep(auction, 1)
+            assert auction.bids_lock_owner is switch
+
+    switch = gevent.spawn(stage_switch)
+    gevent.sleep(0)
+    # a bid gets the lock while the stage switch waits for the retry
+    assert auction.bids_actions.acquire(timeout=0.05)
+    auction.bids_actions.release()
+    switch.get(timeout=1)
+    assert not auction.bids_actions.locked()
+
+    # without the lock it is a plain sleep
+    retry_sleep(auction, 1)
+    assert not auction.bids_actions.locked()
+
+
+def test_update_stage(auction):
     auction.auction_document = {
         'initial_value': 'initial_value',
         'current_stage': 1,
@@ -643,25 +675,14 @@ def test_update_stage(auction, mocker, run_time):
             {}
         ]
     }
-
-    mock_datetime = mocker.MagicMock()
-    mock_datetime.now = mocker.MagicMock()
-    mock_datetime_now = mocker.MagicMock()
-    mock_datetime.now.return_value = mock_datetime_now
-    mock_isoformat = mocker.MagicMock()
-    mock_datetime_now.isoformat = mock_isoformat
-    mock_isoformat.return_value = run_time
-
-    mocker.patch('openprocurement.auction.insider.utils.datetime', mock_datetime)
+    auction.clock = VirtualClock(1416398400, tzutc())
 
     result = update_stage(auction)
 
-    assert result == run_time
+    assert result == '2014-11-19T12:00:00+00:00'
     assert auction.auction_document['current_stage'] == 2
-    assert auction.auction_document['stages'][2]['time'] == run_time
-
-    mock_datetime.now.assert_called_once_with(tzlocal())
-    assert mock_isoformat.call_count == 1
+    assert auction.auction_document['stages'][2]['time'] == result
+    assert auction.bid_validator.stage == 2
 
 
 def test_prepare_auction_document(auction, mocker, logger):
@@ -718,3 +739,40 @@ def test_prepare_auction_document(auction, mocker, logger):
             delta = iso8601.parse_date(stage['start']) - \
                     iso8601.parse_date(auction.auction_document['stages'][index - 1]['start'])
             assert delta == dutch_step_duration
+
+
+@pytest.mark.parametrize('time_compression, dutch_rounds', [
+    (60, DUTCH_ROUNDS),
+    (600, 40),
+])
+def test_prepare_auction_document_time_compression(auction, time_compression,
+                                                   dutch_rounds):
+    auction._auction_data = deepcopy(tender_data)
+    auction.startDate = iso8601.parse_date('2014-11-19T12:00:00+00:00')
+    auction.auction_document = {}
+
+    prepare_auction_document(auction, time_compression=time_compression)
+
+    stages = auction.auction_document['stages']
+    assert len(stages) == dutch_rounds + 6
+    starts = [iso8601.parse_date(stage['start']) for stage in stages]
+    durations = [end - start for start, end in zip(starts, starts[1:])]
+    full = [FIRST_PAUSE] + \
+        [DUTCH_TIMEDELTA / dutch_rounds] * dutch_rounds + \
+        [END_PHASE_PAUSE, SEALEDBID_TIMEDELTA, END_PHASE_PAUSE,
+         BESTBID_TIMEDELTA]
+    for duration, expected in zip(durations, full):
+        assert abs(duration.total_seconds() * time_compression -
+                   expected.total_seconds()) < 0.001
+    assert [stage['type'] for stage in stages[-5:]] == [
+        'pre-sealedbid', 'sealedbid', 'pre-bestbid', 'bestbid', 'announcement'
+    ]
+
+
+def test_prepare_auction_document_invalid_time_compression(auction):
+    auction._auction_data = deepcopy(tender_data)
+    auction.startDate = iso8601.parse_date('2014-11-19T12:00:00+00:00')
+    auction.auction_document = {}
+
+    with pytest.raises(ValueError):
+        prepare_auction_document(auction, time_compression=0)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+import pytest
+
+from openprocurement.auction.insider.constants import DUTCH, SEALEDBID,\
+    BESTBID, PRESTARTED
+from openprocurement.auction.insider.validators import BidValidator,\
+    parse_bid
+
+
+DUTCH_WINNER = 'a' * 32
+BIDDER = 'b' * 32
+
+
+def document(phase, with_winner=True):
+    results = []
+    if with_winner:
+        results.append({'bidder_id': DUTCH_WINNER, 'amount': Decimal('350'),
+                        'dutch_winner': True})
+    return {
+        'current_phase': phase,
+        'current_stage': 1,
+        'value': {'currency': 'UAH'},
+        'stages': [{'type': 'pause'},
+                   {'type': 'dutch_0', 'amount': Decimal('35000')}],
+        'results': results
+    }
+
+
+def test_parse_bid():
+    assert parse_bid(None) is None
+    assert parse_bid('abc') is None
+    assert parse_bid(35000) == Decimal('35000')
+    assert parse_bid(350.5) == Decimal('350.5')
+    for value in ('NaN', 'sNaN', 'Infinity', '-Infinity', float('inf'),
+                  float('nan')):
+        assert parse_bid(value) is None
+    assert parse_bid('1E+999999') == Decimal('1E+999999')
+
+
+@pytest.mark.parametrize('doc, raw_data, errors', [
+    ({}, {}, {
+        'bid': [u'Bid amount is required'],
+        'bidder_id': [u'No bidder id']
+    }),
+    (document(PRESTARTED), {'bidder_id': BIDDER, 'bid': 9010}, {
+        'bid': [u'Not allowed to post bid on current (pre-started) phase'],
+        'bidder_id': [
+            u'Not allowed to post bid on current (pre-started) phase'
+        ]
+    }),
+    (document(DUTCH, False), {'bidder_id': BIDDER, 'bid': 10}, {
+        'bid': [u"Passed value doesn't match current amount=35000"]
+    }),
+    (document(DUTCH, False), {'bidder_id': BIDDER, 'bid': '35000.00'}, {}),
+    (document(DUTCH), {'bidder_id': BIDDER, 'bid': 35000}, {
+        'bid': [u"The same bid has already been submitted."]
+    }),
+    (document(SEALEDBID), {'bidder_id': BIDDER, 'bid': -5}, {
+        'bid': [u'To low value']
+    }),
+    (document(SEALEDBID), {'bidder_id': BIDDER, 'bid': 350}, {
+        'bid': [u'Bid value can\'t be less or equal current amount']
+    }),
+    (document(SEALEDBID), {'bidder_id': BIDDER, 'bid': -1}, {}),
+    (document(SEALEDBID), {'bidder_id': DUTCH_WINNER, 'bid': 351}, {
+        'bidder_id': [u'Not allowed to post bid for dutch winner']
+    }),
+    (document(BESTBID), {'bidder_id': BIDDER, 'bid': 351}, {
+        'bidder_id': [u'bidder_id don\'t match with dutchWinner.bidder_id']
+    }),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': 350}, {
+        'bid': [u'Bid value can\'t be less or equal current amount']
+    }),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': 350.01}, {}),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': '350.005'}, {}),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': '350.004'}, {
+        'bid': [u'Bid value can\'t be less or equal current amount']
+    }),
+    (document(SEALEDBID), {'bidder_id': BIDDER, 'bid': 'NaN'}, {
+        'bid': [u'Bid amount is required']
+    }),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': 'Infinity'}, {
+        'bid': [u'Bid amount is required']
+    }),
+    (document(BESTBID), {'bidder_id': DUTCH_WINNER, 'bid': float('inf')}, {
+        'bid': [u'Bid amount is required']
+    }),
+    (document(SEALEDBID), {'bidder_id': BIDDER, 'bid': '1E+999999'}, {
+        'bid': [u'Invalid amount: 1E+999999']
+    }),
+    (document(DUTCH, False), {'bidder_id': BIDDER, 'bid': '35000.001'}, {}),
+])
+def test_bid_validator_errors(doc, raw_data, errors):
+    data, result, stage = BidValidator(doc).validate(raw_data)
+    assert result == errors
+    assert stage == doc.get('current_stage')
+    assert data['bidder_id'] == raw_data.get('bidder_id')
+
+
+def test_bid_validator_snapshot_of_document():
+    doc = document(DUTCH, False)
+    validator = BidValidator(doc)
+    doc['current_stage'] = 0
+    assert validator.threshold == 3500000
+    assert validator.currency == 'UAH'
+    assert validator.validate({'bidder_id': BIDDER, 'bid': 35000})[1] == {}
+
+
+def test_update_bid_validator(auction):
+    auction.auction_document = document(SEALEDBID)
+    auction.update_bid_validator()
+    assert auction.bid_validator.phase == SEALEDBID
+    assert auction.bid_validator.dutch_winner_id == DUTCH_WINNER
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import json
+import socket
+
+import pytest
+
+from flask import Flask
+
+from openprocurement.auction.insider.views import MappingCache, includeme
+
+
+class Redis(object):
+
+    def __init__(self, mappings):
+        self.mappings = mappings
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        return self.mappings.get(key)
+
+
+def test_mapping_cache_ttl():
+    clock = [0.0]
+    redis = Redis({'UA-1': 'http://127.0.0.1:9000/'})
+    cache = MappingCache(redis.get, ttl=30, negative_ttl=5,
+                         clock=lambda: clock[0])
+
+    assert cache.get('UA-1') == 'http://127.0.0.1:9000/'
+    assert cache.get('UA-1') == 'http://127.0.0.1:9000/'
+    assert cache.get('UA-2') is None
+    clock[0] = 10
+    assert cache.get('UA-1') == 'http://127.0.0.1:9000/'
+    assert cache.get('UA-2') is None  # negative entry expired
+    assert redis.calls == 3
+
+    cache.invalidate('UA-1')
+    assert cache.get('UA-1') == 'http://127.0.0.1:9000/'
+    assert cache.metrics() == {'hits': 2, 'misses': 4, 'invalidations': 1,
+                               'hit_rate': 2 / 6.0, 'size': 2}
+
+
+def test_mapping_cache_without_negative_entries():
+    redis = Redis({})
+    cache = MappingCache(redis.get, clock=lambda: 0.0)
+
+    assert cache.get('UA-1') is None
+    # the auction is started: a negative entry is not used...
+    redis.mappings['UA-1'] = 'http://127.0.0.1:9000/'
+    assert cache.get('UA-1', negative=False) == 'http://127.0.0.1:9000/'
+    # ...nor stored
+    assert cache.get('UA-2', negative=False) is None
+    assert 'UA-2' not in cache.entries
+    assert redis.calls == 3
+
+
+class Upstream(object):
+    """ WSGI app in place of StreamProxy """
+
+    def __init__(self):
+        self.status = '200 OK'
+        self.error = None
+        self.paths = []
+
+    def __call__(self, environ, start_response):
+        self.paths.append(environ['PATH_INFO'])
+        if self.error is not None:
+            raise self.error
+        start_response(self.status, [('Content-Type', 'text/plain')])
+        return ['proxied']
+
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+
+
+@pytest.fixture
+def proxy_app(mocker):
+    app = Flask(__name__)
+    app.testing = True
+    app.redis = Redis({'UA-1': 'http://127.0.0.1:9000/'})
+    app.event_sources_pool = mocker.sentinel.event_sources_pool
+    app.proxy_connection_pool = mocker.sentinel.proxy_connection_pool
+    app.config['event_source_connection_limit'] = 10
+    includeme(app)
+    upstream = Upstream()
+    stream_proxy = mocker.patch(
+        'openprocurement.auction.insider.views.StreamProxy',
+        return_value=upstream
+    )
+    proxy = mocker.patch(
+        'openprocurement.auction.insider.views.auctions_proxy',
+        return_value=app.response_class('fallback')
+    )
+    return app, upstream, stream_proxy, proxy
+
+
+def test_proxy_route_uses_cached_mapping(proxy_app):
+    app, upstream, stream_proxy, proxy = proxy_app
+    client = app.test_client()
+
+    for _ in range(3):
+        assert client.get('/insider-auctions/UA-1/event_source').data == \
+            'proxied'
+    assert app.redis.calls == 1
+    assert upstream.paths == ['/event_source'] * 3
+    stream_proxy.assert_called_with(
+        'http://127.0.0.1:9000/', auction_doc_id='UA-1',
+        event_sources_pool=app.event_sources_pool,
+        event_source_connection_limit=10,
+        pool=app.proxy_connection_pool, backend='gevent'
+    )
+    assert not proxy.called
+
+    # unknown auction: 404 without a lookup by the shared proxy,
+    # fallback paths are answered by it
+    assert client.post('/insider-auctions/UA-2/postbid').status_code == 404
+    assert client.get('/insider-auctions/UA-2/login').data == 'fallback'
+    assert proxy.call_count == 1
+    assert app.redis.calls == 3
+
+    metrics = json.loads(
+        client.get('/insider-auctions/mappings', environ_base=LOCAL).data
+    )
+    assert metrics['hits'] == 2
+    assert metrics['misses'] == 3
+
+
+def test_proxy_route_sees_started_auction(proxy_app):
+    app, upstream, stream_proxy, proxy = proxy_app
+    client = app.test_client()
+
+    assert client.post('/insider-auctions/UA-2/postbid').status_code == 404
+    app.redis.mappings['UA-2'] = 'http://127.0.0.1:9001/'
+    assert client.get('/insider-auctions/UA-2/login').data == 'proxied'
+    assert not proxy.called
+
+
+def test_proxy_route_invalidates_unreachable_worker(proxy_app):
+    app, upstream, stream_proxy, proxy = proxy_app
+    client = app.test_client()
+    client.get('/insider-auctions/UA-1/event_source')
+
+    upstream.status = '502 Bad Gateway'
+    assert client.get('/insider-auctions/UA-1/event_source').status_code \
+        == 502
+    assert 'UA-1' not in app.insider_mappings.entries
+
+    upstream.error = socket.error(111, 'Connection refused')
+    with pytest.raises(socket.error):
+        client.get('/insider-auctions/UA-1/event_source')
+    assert app.insider_mappings.metrics()['invalidations'] == 2
+
+
+def test_proxy_route_refuses_service_paths(proxy_app):
+    app, upstream, stream_proxy, proxy = proxy_app
+    client = app.test_client()
+
+    for path in ('admin/stacks', 'admin/profile', 'health'):
+        res = client.get('/insider-auctions/UA-1/{}'.format(path))
+        assert res.status_code == 404
+    assert not stream_proxy.called
+
+
+def test_mappings_metrics_are_local(proxy_app):
+    app = proxy_app[0]
+    client = app.test_client()
+
+    assert client.get('/insider-auctions/mappings',
+                      environ_base={'REMOTE_ADDR': '10.0.0.1'}
+                      ).status_code == 403
+    assert client.get('/insider-auctions/mappings', environ_base=LOCAL,
+                      headers={'X-Forwarded-For': '10.0.0.1'}
+                      ).status_code == 403
+    assert client.get('/insider-auctions/mappings',
+                      environ_base=LOCAL).status_code == 200
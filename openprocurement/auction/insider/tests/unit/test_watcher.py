@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import gevent
+
+from gevent.queue import Queue
+
+from openprocurement.auction.insider.server import close_event_sources,\
+    app as server_app
+from openprocurement.auction.insider.watcher import ChangesWatcher
+
+
+class LocalChanges(object):
+    """ CouchDB continuous _changes stand-in, changes are put by the test """
+
+    def __init__(self):
+        self.queue = Queue()
+        self.requests = []
+
+    def put(self, seq, document):
+        self.queue.put({'seq': seq, 'id': document['_id'], 'doc': document})
+
+    def break_feed(self):
+        self.queue.put(IOError('Connection reset'))
+
+    def changes(self, **options):
+        self.requests.append(options)
+        while True:
+            change = self.queue.get()
+            if isinstance(change, Exception):
+                raise change
+            yield change
+
+
+def test_watcher_follows_auction_document():
+    feed = LocalChanges()
+    documents = []
+    watcher = ChangesWatcher(feed, 'UA-1', documents.append,
+                             retry_delay=0).start()
+
+    feed.put(1, {'_id': 'UA-1', 'current_stage': 3})
+    feed.break_feed()
+    feed.put(2, {'_id': 'UA-1', 'current_stage': -100})
+    gevent.sleep(0.01)
+    watcher.stop()
+
+    assert [document['current_stage'] for document in documents] == [3, -100]
+    assert feed.requests[0]['since'] == 'now'
+    assert feed.requests[0]['filter'] == '_doc_ids'
+    assert feed.requests[0]['doc_ids'] == '["UA-1"]'
+    # reopened after the break from the last seen change
+    assert feed.requests[1]['since'] == 1
+    assert watcher.since == 2
+
+
+def test_watcher_stops_from_callback():
+    feed = LocalChanges()
+    watcher = ChangesWatcher(feed, 'UA-1', lambda document: watcher.stop())
+    watcher.start()
+
+    feed.put(1, {'_id': 'UA-1', 'current_stage': -101})
+    gevent.sleep(0.01)
+
+    assert watcher._greenlet.ready()
+    assert len(feed.requests) == 1
+
+
+def test_external_cancel_stops_auction(auction, mocker):
+    remove_all_jobs = mocker.patch(
+        'openprocurement.auction.insider.auction.SCHEDULER.remove_all_jobs'
+    )
+    delete_mapping = mocker.patch(
+        'openprocurement.auction.insider.auction.delete_mapping'
+    )
+    close = mocker.patch(
+        'openprocurement.auction.insider.server.close_event_sources'
+    )
+    auction.generate_request_id()
+    auction.server = mocker.MagicMock()
+    auction.auction_document = {'_rev': '1', 'current_stage': 5}
+    feed = LocalChanges()
+    auction.db = feed
+
+    auction.watch_changes()
+    feed.put(1, {'_id': 'other', 'current_stage': -100})
+    feed.put(2, {'_id': auction.auction_doc_id, '_rev': '2',
+                 'current_stage': 6})
+    gevent.sleep(0.01)
+    assert not auction._end_auction_event.is_set()
+
+    feed.put(3, {'_id': auction.auction_doc_id, '_rev': '3',
+                 'current_stage': -100})
+    auction.wait_to_end()
+
+    assert auction.auction_document['_rev'] == '3'
+    assert remove_all_jobs.called
+    assert close.called
+    assert auction.server.stop.called
+    assert delete_mapping.called
+    assert not auction.changes_watcher.running
+
+
+def test_close_event_sources(mocker):
+    send_event_to_client = mocker.patch(
+        'openprocurement.auction.insider.server.send_event_to_client'
+    )
+    mocker.patch.object(server_app, 'auction_bidders', {
+        'bidder': {'clients': {}, 'channels': {'client': Queue()}}
+    })
+
+    close_event_sources()
+
+    send_event_to_client.assert_called_once_with(
+        'bidder', 'client', '', event='StopSSE'
+    )
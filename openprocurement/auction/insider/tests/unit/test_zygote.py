@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from openprocurement.auction.insider.zygote import request
+
+
+SERVE = '''
+from gevent import monkey
+monkey.patch_all()
+from openprocurement.auction.insider.tests.unit.test_zygote import\\
+    report_handler
+from openprocurement.auction.insider.zygote import Zygote
+Zygote({socket_path!r}, handler=report_handler).serve()
+'''
+
+
+def report_handler(zygote, argv):
+    """ Worker of the test zygote: reports its state and exits """
+    report, status = argv
+    with open(report, 'w') as stream:
+        json.dump({
+            'pid': os.getpid(),
+            'warmed': 'openprocurement.auction.insider.server' in
+            sys.modules,
+        }, stream)
+    sys.exit(int(status))
+
+
+@pytest.yield_fixture
+def zygote(tmpdir):
+    socket_path = str(tmpdir.join('zygote.sock'))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVE.format(socket_path=socket_path)],
+        env=env
+    )
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.05)
+    yield socket_path
+    process.kill()
+    process.wait()
+
+
+def test_zygote_forks_warmed_workers(zygote, tmpdir):
+    report = str(tmpdir.join('report.json'))
+
+    assert request(zygote, [report, '0']) == 0
+    with open(report) as stream:
+        first = json.load(stream)
+    assert first['warmed'] is True
+
+    assert request(zygote, [report, '3']) == 3
+    with open(report) as stream:
+        assert json.load(stream)['pid'] != first['pid']
+
+    pid = request(zygote, [report, '0'], wait=False)
+    assert isinstance(pid, int)
+
+
+def test_zygote_socket_is_private(zygote):
+    assert stat.S_IMODE(os.stat(zygote).st_mode) == 0o600
+
+
+def test_zygote_rejects_bad_request(zygote):
+    with pytest.raises(RuntimeError):
+        request(zygote, None)
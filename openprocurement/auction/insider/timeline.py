@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Stages of the auction document indexed by kind.
+
+The document keeps stages as a list of dicts with type strings
+(pause, dutch_0 ... dutch_N, pre-sealedbid, ...). Timeline is built once
+for a stages list and answers which stage has a kind, which stages are
+dutch steps and when a stage starts, without scans over the list.
+"""
+import calendar
+
+from iso8601 import parse_date
+
+from openprocurement.auction.insider.constants import DUTCH, PRESEALEDBID,\
+    SEALEDBID, PREBESTBID, BESTBID, END
+
+
+PAUSE = 'pause'
+KINDS = (PAUSE, DUTCH, PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END)
+
+
+def stage_kind(stage_type):
+    """
+    >>> stage_kind('dutch_12')
+    'dutch'
+    >>> stage_kind('pre-bestbid')
+    'pre-bestbid'
+    """
+    if stage_type.startswith(DUTCH):
+        return DUTCH
+    return stage_type
+
+
+def to_timestamp(value):
+    """
+    Seconds since the epoch of an ISO date, None for empty value
+
+    >>> to_timestamp('2017-07-14T05:40:00.5+03:00')
+    1500000000.5
+    """
+    if not value:
+        return None
+    date = parse_date(value)
+    return calendar.timegm(date.utctimetuple()) + date.microsecond / 1e6
+
+
+class Timeline(object):
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.size = len(stages)
+        self.kinds = [stage_kind(stage.get('type', '')) for stage in stages]
+        self._starts = None
+        self.dutch_steps = []
+        self._index = {}
+        for index, kind in enumerate(self.kinds):
+            self._index.setdefault(kind, index)
+            if kind == DUTCH:
+                self.dutch_steps.append(index)
+
+    @classmethod
+    def for_document(cls, document, timeline=None):
+        """ Timeline of the document, `timeline` when it is still valid """
+        stages = document.get('stages', [])
+        if timeline is not None and timeline.stages is stages and \
+                timeline.size == len(stages):
+            return timeline
+        return cls(stages)
+
+    @property
+    def starts(self):
+        """ Start of every stage, parsed when asked first """
+        if self._starts is None:
+            self._starts = [to_timestamp(stage.get('start'))
+                            for stage in self.stages]
+        return self._starts
+
+    def __len__(self):
+        return self.size
+
+    def index(self, kind):
+        """ Index of the first stage of the kind, None if there is none """
+        return self._index.get(kind)
+
+    def stage(self, kind):
+        index = self._index.get(kind)
+        return self.stages[index] if index is not None else None
@@ -1,42 +1,62 @@
 # -*- coding: utf-8 -*-
 import logging
 from contextlib import contextmanager
-from copy import deepcopy
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+from gevent import getcurrent, sleep
 
-from dateutil.tz import tzlocal
 from openprocurement.auction.utils import get_latest_bid_for_bidder,\
-    make_request, get_tender_data, sorting_by_amount
+    make_request, get_tender_data
 from openprocurement.auction.worker.journal import AUCTION_WORKER_API_APPROVED_DATA,\
     AUCTION_WORKER_API_AUCTION_CANCEL, AUCTION_WORKER_API_AUCTION_NOT_EXIST, AUCTION_WORKER_SERVICE_NUMBER_OF_BIDS
 from openprocurement.auction.worker.utils import prepare_service_stage
 from openprocurement.auction.insider.constants import PRESTARTED, DUTCH,\
     PRESEALEDBID, SEALEDBID, PREBESTBID, BESTBID, END
+from openprocurement.auction.insider.bids import Bid, BidsData
+from openprocurement.auction.insider.money import CENTS_IN_UNIT, to_cents,\
+    from_cents
 from openprocurement.auction.insider.constants import MULTILINGUAL_FIELDS,\
     ADDITIONAL_LANGUAGES, DUTCH_DOWN_STEP, SEALEDBID_TIMEDELTA,\
-    BESTBID_TIMEDELTA, END_PHASE_PAUSE
+    BESTBID_TIMEDELTA, END_PHASE_PAUSE, DB_RETRY_BACKOFF,\
+    DB_RETRY_MAX_BACKOFF, MIN_DUTCH_STEP
 
 
 LOGGER = logging.getLogger("Auction Worker Insider")
 
 
+def prepare_bidder_label(bidder_name):
+    return dict(
+        en="Bidder #{}".format(bidder_name),
+        uk="Учасник №{}".format(bidder_name),
+        ru="Участник №{}".format(bidder_name)
+    )
+
+
 def prepare_results_stage(
         bidder_id="",
         bidder_name="",
         amount="",
         time="",
         dutch_winner="",
-        sealedbid_winner=""):
+        sealedbid_winner="",
+        labels=None):
+    """
+    Results stage of the bid. `labels` is a cache of bidder labels by
+    bidder_id (Auction.bidder_labels), stages of the same bidder share
+    the cached label.
+    """
+    if labels is None:
+        label = prepare_bidder_label(bidder_name)
+    else:
+        label = labels.get(bidder_id)
+        if label is None:
+            label = labels[bidder_id] = prepare_bidder_label(bidder_name)
     stage = dict(
         bidder_id=bidder_id,
         time=str(time),
         amount=amount or 0,
-        label=dict(
-            en="Bidder #{}".format(bidder_name),
-            uk="Учасник №{}".format(bidder_name),
-            ru="Участник №{}".format(bidder_name)
-        )
+        label=label
     )
     if dutch_winner:
         stage['dutch_winner'] = True
@@ -126,14 +146,23 @@ def announce_results_data(auction, results=None):
     return bids_information
 
 
-def calculate_next_amount(initial_value, current_value):
-    if not isinstance(current_value, Decimal):
-        current_value = Decimal(str(current_value))
+def calculate_dutch_step(initial_value):
+    """ Dutch step in cents, may contain a fraction of a cent """
     if not isinstance(initial_value, Decimal):
         initial_value = Decimal(str(initial_value))
-    return (current_value - (initial_value * DUTCH_DOWN_STEP)).quantize(
-        Decimal('0.01'), rounding=ROUND_HALF_UP
-    )
+    return initial_value * DUTCH_DOWN_STEP * CENTS_IN_UNIT
+
+
+def calculate_next_cents(current_cents, dutch_step):
+    return int((current_cents - dutch_step).to_integral_value(
+        rounding=ROUND_HALF_UP
+    ))
+
+
+def calculate_next_amount(initial_value, current_value):
+    return from_cents(calculate_next_cents(
+        to_cents(current_value), calculate_dutch_step(initial_value)
+    ))
 
 
 def prepare_timeline_stage():
@@ -175,21 +204,59 @@ def get_dutch_winner(auction_document):
 def update_auction_document(auction):
     yield auction.get_auction_document()
     if auction.auction_document:
+        auction.update_bid_validator()
         auction.save_auction_document()
 
 
+def retry_backoff(attempt):
+    """
+    Exponential delay before retry of the CouchDB call
+
+    >>> [retry_backoff(attempt) for attempt in range(1, 7)]
+    [0.1, 0.2, 0.4, 0.8, 1.6, 2.0]
+    """
+    return min(DB_RETRY_BACKOFF * 2 ** (attempt - 1), DB_RETRY_MAX_BACKOFF)
+
+
+def retry_sleep(auction, attempt):
+    """
+    Wait before retry of the CouchDB call. The bids lock is released while
+    waiting when the current greenlet holds it, so bids are not held up
+    by CouchDB retries.
+    """
+    delay = retry_backoff(attempt)
+    if getattr(auction, 'bids_lock_owner', None) is not getcurrent():
+        sleep(delay)
+        return
+    auction.bids_lock_owner = None
+    auction.bids_actions.release()
+    try:
+        sleep(delay)
+    finally:
+        auction.bids_actions.acquire()
+        auction.bids_lock_owner = getcurrent()
+
+
 @contextmanager
 def lock_bids(auction):
     auction.bids_actions.acquire()
+    auction.bids_lock_owner = getcurrent()
     yield
+    auction.bids_lock_owner = None
     auction.bids_actions.release()
 
 
 def update_stage(auction):
+    """
+    Switch the document to the next stage. Callers set the phase first:
+    the bid validator is rebuilt here, before any I/O of the caller, so
+    bids are never checked against the previous stage.
+    """
     auction.auction_document['current_stage'] += 1
     current_stage = auction.auction_document['current_stage']
-    run_time = datetime.now(tzlocal()).isoformat()
+    run_time = auction.clock.isoformat()
     auction.auction_document['stages'][current_stage]['time'] = run_time
+    auction.update_bid_validator()
     return run_time
 
 
@@ -210,7 +277,38 @@ def prepare_auction_data(data):
     }
 
 
-def prepare_auction_document(auction, fast_forward=False):
+def compress_time(delta, time_compression):
+    """
+    Duration of the stage in an auction running `time_compression` times
+    faster
+
+    >>> compress_time(timedelta(minutes=10), 60)
+    datetime.timedelta(0, 10)
+    >>> compress_time(timedelta(seconds=20), 1.5)
+    datetime.timedelta(0, 13, 333333)
+    """
+    if time_compression == 1:
+        return delta
+    return timedelta(seconds=delta.total_seconds() / time_compression)
+
+
+def fit_dutch_rounds(dutch_timedelta, dutch_rounds):
+    """
+    Dutch rounds which fit the phase with steps of at least MIN_DUTCH_STEP
+
+    >>> fit_dutch_rounds(timedelta(minutes=405), 81)
+    81
+    >>> fit_dutch_rounds(timedelta(seconds=40.5), 81)
+    40
+    >>> fit_dutch_rounds(timedelta(seconds=0.1), 81)
+    1
+    """
+    fit = int(dutch_timedelta.total_seconds() //
+              MIN_DUTCH_STEP.total_seconds())
+    return max(1, min(dutch_rounds, fit))
+
+
+def prepare_auction_document(auction, fast_forward=False, time_compression=1):
     auction.auction_document.update({
         "_id": auction.auction_doc_id,
         "stages": [],
@@ -248,9 +346,19 @@ def prepare_auction_document(auction, fast_forward=False):
     else:
         from openprocurement.auction.insider.constants import DUTCH_TIMEDELTA,\
             DUTCH_ROUNDS, FIRST_PAUSE
+    if time_compression <= 0:
+        raise ValueError(
+            "Invalid time compression: {}".format(time_compression))
+    FIRST_PAUSE = compress_time(FIRST_PAUSE, time_compression)
+    DUTCH_TIMEDELTA = compress_time(DUTCH_TIMEDELTA, time_compression)
+    DUTCH_ROUNDS = fit_dutch_rounds(DUTCH_TIMEDELTA, DUTCH_ROUNDS)
     dutch_step_duration = DUTCH_TIMEDELTA / DUTCH_ROUNDS
     next_stage_timedelta = auction.startDate
     amount = auction.auction_document['value']['amount']
+    cents = to_cents(amount)
+    dutch_step = calculate_dutch_step(
+        auction.auction_document['initial_value']
+    )
     auction.auction_document['stages'] = [prepare_service_stage(
         start=auction.startDate.isoformat(),
         type="pause"
@@ -271,10 +379,8 @@ def prepare_auction_document(auction, fast_forward=False):
                 'time': ''
             }
         auction.auction_document['stages'].append(stage)
-        amount = calculate_next_amount(
-            auction.auction_document['initial_value'],
-            amount
-        )
+        cents = calculate_next_cents(cents, dutch_step)
+        amount = from_cents(cents)
         if index != DUTCH_ROUNDS:
             next_stage_timedelta += dutch_step_duration
 
@@ -292,7 +398,7 @@ def prepare_auction_document(auction, fast_forward=False):
                 BESTBID,
                 END,
             ]):
-        next_stage_timedelta += delta
+        next_stage_timedelta += compress_time(delta, time_compression)
         auction.auction_document['stages'].append({
             'start': next_stage_timedelta.isoformat(),
             'type': name,
@@ -302,47 +408,45 @@ def prepare_auction_document(auction, fast_forward=False):
 
 
 def prepare_auction_results(auction, bids_data):
-    all_bids = deepcopy(bids_data)
-    max_bids = []
-    for bid_id in all_bids.keys():
-        bid = get_latest_bid_for_bidder(all_bids[bid_id], bid_id)
-        bid['bidder_name'] = auction.mapping[bid['bidder_id']]
-        max_bids.append(
-            prepare_results_stage(**bid)
-        )
-    return sorting_by_amount(max_bids)
+    """ Results stages of latest bids, in leaderboard order """
+    if not isinstance(bids_data, BidsData):
+        bids_data = BidsData(bids_data)
+    return [
+        prepare_results_stage(labels=auction.bidder_labels, **dict(
+            bid, bidder_name=auction.mapping[bid['bidder_id']]
+        ))
+        for bid in bids_data.latest_bids()
+    ]
 
 
 def normalize_audit(audit):
+    """
+    Audit with amounts rendered as strings, ready for yaml.safe_dump.
+    Only bids and dutch turns are copied, the live audit, the auction
+    document results added to it and bid records stay untouched.
+    """
     def normalize_bid(bid):
+        if isinstance(bid, Bid):
+            bid = bid.to_dict()
+        elif 'amount' in bid:
+            bid = dict(bid)
         if 'amount' in bid:
             bid['amount'] = str(bid['amount'])
         return bid
 
-    new = deepcopy(audit)
-    audit['results']['bids'] = map(
-        normalize_bid,
-        audit.get('results', {}).get('bids', [])
-    )
+    normalized = dict(audit)
+    if 'results' in audit:
+        normalized['results'] = dict(audit['results'], bids=map(
+            normalize_bid, audit['results'].get('bids', [])
+        ))
+    timeline = normalized['timeline'] = dict(audit['timeline'])
     for phase in [DUTCH, SEALEDBID, BESTBID]:
-        bids = audit['timeline'][phase].get('bids', [])
-        audit['timeline'][phase]['bids'] = map(
-            normalize_bid,
-            bids
-        )
-    for k in audit['timeline'][DUTCH].keys():
-        if k.startswith('turn'):
-            audit['timeline'][DUTCH][k]['amount'] = str(
-                audit['timeline'][DUTCH][k]['amount']
+        timeline[phase] = dict(timeline[phase])
+        if 'bids' in timeline[phase]:
+            timeline[phase]['bids'] = map(
+                normalize_bid, timeline[phase]['bids']
             )
-    return audit
-
-
-def normalize_document(document):
-    normalized = deepcopy(document)
-    for field in ['results', 'stages']:
-        for index, stage in enumerate(document[field]):
-            if isinstance(stage.get('amount'), Decimal):
-                normalized[field][index]['amount'] = str(stage['amount'])
+    for k, turn in timeline[DUTCH].items():
+        if k.startswith('turn'):
+            timeline[DUTCH][k] = normalize_bid(turn)
     return normalized
-
@@ -1,7 +1,140 @@
+import socket
+
+from time import time
+
+from flask import abort, current_app, jsonify, request
+
 from openprocurement.auction.auctions_server import auctions_proxy
+from openprocurement.auction.proxy import StreamProxy
+from openprocurement.auction.insider.access import local_only
+
+
+MAPPING_TTL = 30
+NEGATIVE_MAPPING_TTL = 5
+# paths the shared proxy answers for auctions without a running worker
+FALLBACK_PATHS = ('login', 'event_source')
+# service endpoints of the worker, not for the public proxy
+SERVICE_PATHS = ('admin', 'health')
+# upstream statuses of a worker which is not reachable
+UNREACHABLE_STATUSES = ('502', '503', '504')
+
+
+class MappingCache(object):
+    """
+    Worker URLs of running auctions by auction doc id, as create_mapping
+    stores them. Unknown auctions are remembered for a shorter time, an
+    entry is dropped when its worker is not reachable. Lookups with
+    negative=False neither use nor store entries of unknown auctions.
+    """
+
+    def __init__(self, lookup, ttl=MAPPING_TTL,
+                 negative_ttl=NEGATIVE_MAPPING_TTL, clock=time):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, auction_doc_id, negative=True):
+        now = self.clock()
+        entry = self.entries.get(auction_doc_id)
+        if entry is not None and entry[1] > now and (entry[0] or negative):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        url = self.lookup(auction_doc_id)
+        if url:
+            self.entries[auction_doc_id] = (url, now + self.ttl)
+        elif negative:
+            self.entries[auction_doc_id] = (url, now + self.negative_ttl)
+        else:
+            self.entries.pop(auction_doc_id, None)
+        return url
+
+    def invalidate(self, auction_doc_id):
+        if self.entries.pop(auction_doc_id, None) is not None:
+            self.invalidations += 1
+
+    def metrics(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': float(self.hits) / requests if requests else 0.0,
+            'size': len(self.entries),
+        }
+
+
+class InvalidatingProxy(object):
+    """
+    WSGI app around the proxy to a worker. The proxy connects to the
+    worker only when the response is run, so the mapping is dropped from
+    there: on connection errors and on 502, 503 and 504 of the upstream.
+    """
+
+    def __init__(self, app, mappings, auction_doc_id):
+        self.app = app
+        self.mappings = mappings
+        self.auction_doc_id = auction_doc_id
+
+    def __call__(self, environ, start_response):
+        def checked_start_response(status, headers, *args):
+            if status[:3] in UNREACHABLE_STATUSES:
+                self.mappings.invalidate(self.auction_doc_id)
+            return start_response(status, headers, *args)
+
+        try:
+            return self.app(environ, checked_start_response)
+        except (socket.error, IOError):
+            self.mappings.invalidate(self.auction_doc_id)
+            raise
+
+
+def insider_auctions_proxy(auction_doc_id, path):
+    if path.split('/', 1)[0] in SERVICE_PATHS:
+        abort(404)
+    mappings = current_app.insider_mappings
+    # login and event_source of an auction which is just started must
+    # not wait for its negative entry to expire
+    fallback = path in FALLBACK_PATHS
+    proxy_path = mappings.get(auction_doc_id, negative=not fallback)
+    if not proxy_path:
+        if not fallback:
+            abort(404)
+        return auctions_proxy(auction_doc_id, path)
+    request.environ['PATH_INFO'] = '/' + path
+    return InvalidatingProxy(
+        StreamProxy(
+            proxy_path,
+            auction_doc_id=str(auction_doc_id),
+            event_sources_pool=current_app.event_sources_pool,
+            event_source_connection_limit=current_app.config[
+                'event_source_connection_limit'],
+            pool=current_app.proxy_connection_pool,
+            backend="gevent"
+        ),
+        mappings, auction_doc_id
+    )
+
+
+@local_only
+def insider_mappings_metrics():
+    return jsonify(current_app.insider_mappings.metrics())
 
 
 def includeme(app):
+    app.insider_mappings = MappingCache(
+        lambda auction_doc_id: app.redis.get(str(auction_doc_id)),
+        ttl=app.config.get('insider_mapping_ttl', MAPPING_TTL),
+        negative_ttl=app.config.get('insider_negative_mapping_ttl',
+                                    NEGATIVE_MAPPING_TTL)
+    )
     app.add_url_rule('/insider-auctions/<auction_doc_id>/<path:path>', 'insider-auctions',
-                     auctions_proxy,
+                     insider_auctions_proxy,
                      methods=['GET', 'POST'])
+    app.add_url_rule('/insider-auctions/mappings', 'insider-auctions-mappings',
+                     insider_mappings_metrics)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Watcher of the auction document in CouchDB.
+
+A running worker follows the continuous _changes feed filtered to its own
+auction document, so cancel and reschedule commands run by the chronograph
+or an operator reach it at once. A broken feed is opened again from the
+last seen sequence.
+"""
+import json
+import logging
+
+from gevent import spawn, sleep, getcurrent
+
+
+LOGGER = logging.getLogger("Auction Worker Insider")
+
+CHANGES_HEARTBEAT = 10000  # ms
+CHANGES_RETRY_DELAY = 1.0
+
+
+class ChangesWatcher(object):
+
+    def __init__(self, db, auction_doc_id, callback,
+                 heartbeat=CHANGES_HEARTBEAT,
+                 retry_delay=CHANGES_RETRY_DELAY):
+        self.db = db
+        self.auction_doc_id = auction_doc_id
+        self.callback = callback
+        self.heartbeat = heartbeat
+        self.retry_delay = retry_delay
+        self.since = 'now'
+        self.running = False
+        self._greenlet = None
+
+    def start(self):
+        self.running = True
+        self._greenlet = spawn(self.watch)
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._greenlet is not None and \
+                self._greenlet is not getcurrent():
+            self._greenlet.kill(block=False)
+
+    def changes(self):
+        return self.db.changes(
+            feed='continuous',
+            since=self.since,
+            heartbeat=self.heartbeat,
+            include_docs='true',
+            filter='_doc_ids',
+            doc_ids=json.dumps([self.auction_doc_id])
+        )
+
+    def watch(self):
+        while self.running:
+            try:
+                for change in self.changes():
+                    if 'last_seq' in change:  # feed closed by CouchDB
+                        self.since = change['last_seq']
+                        break
+                    self.since = change.get('seq', self.since)
+                    document = change.get('doc')
+                    if document is not None and \
+                            change.get('id') == self.auction_doc_id:
+                        self.callback(document)
+                    if not self.running:
+                        return
+            except Exception as e:
+                LOGGER.warning("Changes feed of auction {} is broken: "
+                               "{}".format(self.auction_doc_id, e))
+            if self.running:
+                sleep(self.retry_delay)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Zygote launcher of auction workers.
+
+A long-lived parent imports the insider stack and parses worker configs
+once, then forks a worker per request received on a local unix socket, so
+workers start with warmed modules instead of a fresh interpreter.
+
+    auction_insider_zygote serve /run/auction_insider.sock
+    auction_insider_zygote run /run/auction_insider.sock \\
+        run <auction_doc_id> <auction_worker_config> [options]
+
+`run` takes the same arguments as auction_insider and exits with the
+status of the worker, `spawn` prints worker pid and returns at once. The
+client imports only the standard library. The socket is created with mode
+0600 (zygote_socket_mode environment variable overrides it, e.g. 0660 to
+share it with the chronograph group).
+"""
+import json
+import logging
+import os
+import socket
+import sys
+import traceback
+
+from copy import deepcopy
+
+
+LOGGER = logging.getLogger('Auction Insider Zygote')
+
+BACKLOG = 256
+SOCKET_MODE = 0o600
+
+
+def request(socket_path, argv, wait=True):
+    """
+    Ask the zygote to fork a worker with auction_insider arguments.
+    Returns exit status of the worker when wait, its pid otherwise.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        stream = client.makefile('rwb')
+        stream.write(json.dumps({'argv': argv, 'wait': wait}) + '\n')
+        stream.flush()
+        response = json.loads(stream.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        if not wait:
+            return response['pid']
+        return json.loads(stream.readline())['status']
+    finally:
+        client.close()
+
+
+def run_worker(zygote, argv):
+    """ Run auction_insider command in the forked worker """
+    from openprocurement.auction.insider import cli
+    args = cli.parse_args(argv)
+    worker_defaults = cli.configure(
+        args, zygote.worker_defaults(args.auction_worker_config)
+    )
+    cli.run_command(args, worker_defaults)
+
+
+class Zygote(object):
+
+    def __init__(self, socket_path, handler=run_worker,
+                 socket_mode=SOCKET_MODE):
+        self.socket_path = socket_path
+        self.handler = handler
+        self.socket_mode = socket_mode
+        self.server = None
+        self._configs = {}
+
+    def preload(self):
+        from openprocurement.auction.insider import cli
+        cli.load_worker('run')
+        from openprocurement.auction.insider import server  # noqa
+
+    def worker_defaults(self, path):
+        """ Parsed worker config, read once per path """
+        if path not in self._configs:
+            from openprocurement.auction.insider import cli
+            self._configs[path] = cli.read_worker_defaults(path)
+        return deepcopy(self._configs[path])
+
+    def serve(self):
+        from gevent.server import StreamServer
+        self.preload()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # anyone who can connect runs auction_insider commands under the
+        # zygote account, so the socket is never accessible to others
+        umask = os.umask(0o777 & ~self.socket_mode)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, self.socket_mode)
+        listener.listen(BACKLOG)
+        self.server = StreamServer(listener, self.handle)
+        LOGGER.info("Zygote is ready on {}".format(self.socket_path))
+        self.server.serve_forever()
+
+    def handle(self, connection, address):
+        stream = connection.makefile('rwb')
+        try:
+            job = json.loads(stream.readline())
+            argv = [str(arg) for arg in job['argv']]
+        except (ValueError, KeyError, TypeError) as e:
+            self.respond(stream, {'error': 'Bad request: {}'.format(e)})
+            return
+        pid = os.fork()
+        if pid == 0:
+            self.server.close()
+            connection.close()
+            os._exit(self.run_child(argv))
+        LOGGER.info("Forked worker {} for {}".format(pid, ' '.join(argv)))
+        self.respond(stream, {'pid': pid})
+        _, status = os.waitpid(pid, 0)
+        if job.get('wait', True):
+            self.respond(stream, {'status': os.WEXITSTATUS(status)
+                                  if os.WIFEXITED(status) else 1})
+
+    def respond(self, stream, data):
+        try:
+            stream.write(json.dumps(data) + '\n')
+            stream.flush()
+        except socket.error:
+            LOGGER.warning("Client has gone before response {}".format(data))
+
+    def run_child(self, argv):
+        from openprocurement.auction.insider.clock import CLOCK
+        # wall time of the clock was read when the zygote imported it
+        CLOCK.resync()
+        try:
+            self.handler(self, argv)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else int(bool(e.code))
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('serve', 'run', 'spawn'):
+        print("Usage: {} serve|run|spawn <socket> [auction_insider "
+              "arguments]".format(sys.argv[0]))
+        sys.exit(2)
+    cmd, socket_path = sys.argv[1:3]
+    if cmd == 'serve':
+        from gevent import monkey
+        monkey.patch_all()
+        logging.basicConfig(level=logging.INFO)
+        Zygote(socket_path, socket_mode=int(
+            os.environ.get('zygote_socket_mode', '0600'), 8
+        )).serve()
+    elif cmd == 'run':
+        sys.exit(request(socket_path, sys.argv[3:]))
+    else:
+        print(request(socket_path, sys.argv[3:], wait=False))
+
+
+if __name__ == "__main__":
+    main()
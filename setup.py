@@ -12,11 +12,18 @@ EXTRAS_REQUIRE = {
     'test': [
         'pytest',
         'pytest-cov'
+    ],
+    'fast_json': [
+        'ujson'
+    ],
+    'clock': [
+        'monotonic'
     ]
 }
 ENTRY_POINTS = {
     'console_scripts': [
         'auction_insider = openprocurement.auction.insider.cli:main',
+        'auction_insider_zygote = openprocurement.auction.insider.zygote:main',
     ],
     'openprocurement.auction.auctions': [
         'dutch = openprocurement.auction.insider.includeme:dutch'